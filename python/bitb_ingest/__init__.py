@@ -0,0 +1,32 @@
+"""
+BiTB ingestion support library.
+
+Shared building blocks used by both ingestion workers
+(``ingest_worker.py`` and ``ingest-worker.py``):
+
+- async_crawl: asyncio crawl engine with bounded in-flight fetches
+- distributed: SQLite lease/ack frontier shared by crawl worker processes
+- fetch: pooled keep-alive HTTP client (DNS cache, retries, counters)
+- warc: WARC recording of crawl responses and offline replay fetcher
+- checkpoint: crawl journal + frontier snapshots for resuming after a crash
+- crawl_cache: ETag/Last-Modified revalidation cache for recrawls
+- ratelimit: adaptive per-host token buckets (AIMD on latency, 429/503, Retry-After)
+- robots: shared robots.txt cache, compiled rules and Crawl-delay
+- sitemap: streaming robots.txt/sitemap index discovery
+- frontier: URL canonicalization, dedup-at-enqueue frontier, compact seen sets
+- priority: best-first frontier scored on depth, URL path, anchor text, sitemap priority
+- url_rules: tenant include/exclude URL rules compiled to one regex per list, with hit counts
+- traps: crawler trap detection (URL template caps, pagination/calendar walks, session ids, loops)
+- dedup: SimHash near-duplicate page filter run before chunking
+- boilerplate: cross-page template line removal from hashed line counts
+- html_parse: single-pass title/text/links extraction, lxml or html.parser
+- parse_pool: process pool running html_parse for crawl fetch threads
+- pdf_extract: page-parallel PDF text extraction in worker processes
+- documents: streaming page/paragraph segment extractors (PDF, DOCX, text) for the chunkers
+- extract_cache: content-hash keyed, compressed, LRU-evicted cache of extracted upload text
+- file_batch: lazy dir/glob expansion, up-front size checks, ordered bounded parallel file processing
+- records: streaming JSON array / JSONL / CSV record reader and field mapping for the records source
+- content: readability-style text/link density main-content extraction
+- timing: per-stage wall/CPU timers for the pipeline summaries
+- synthetic_site: generated localhost site for crawl benchmarks (crawl_benchmark.py)
+"""
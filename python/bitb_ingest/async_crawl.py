@@ -0,0 +1,134 @@
+"""
+Asyncio crawl engine.
+
+Runs a crawler's blocking per-URL fetch function with a bounded number of
+in-flight requests and a per-host concurrency limit, so crawl time is bound
+by bandwidth rather than by pages x round-trip time.
+
+The engine knows nothing about HTML: each worker supplies a
+``fetch_page(url, depth) -> (page | None, links)`` callable, an
+``allow(url) -> bool`` filter and a seeded Frontier, and gets back the same
+page dicts its serial ``crawl()`` would have produced. With a
+CrawlCheckpoint, every finished URL is journaled and the frontier is
+snapshotted (in-flight URLs included) as the crawl goes.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from .checkpoint import CrawlCheckpoint
+from .frontier import Frontier
+
+logger = logging.getLogger(__name__)
+
+FetchPage = Callable[[str, int], Tuple[Optional[Dict], List[str]]]
+
+
+class AsyncCrawlEngine:
+    """Breadth-first crawl with concurrent fetches and per-host limits."""
+
+    def __init__(
+        self,
+        fetch_page: FetchPage,
+        allow: Callable[[str], bool],
+        max_depth: int,
+        max_pages: Optional[int] = None,
+        concurrency: int = 8,
+        per_host: int = 2,
+        host_delay: float = 0.0,
+        checkpoint: Optional[CrawlCheckpoint] = None,
+    ):
+        self.fetch_page = fetch_page
+        self.allow = allow
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.host_delay = host_delay
+        self.checkpoint = checkpoint
+        self.fetched = 0
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def run(self, frontier: Frontier, pages: Optional[List[Dict]] = None) -> List[Dict]:
+        """Crawl from a seeded frontier and return extracted pages.
+
+        pages carries pages already extracted by a resumed crawl.
+        """
+        return asyncio.run(self._crawl(frontier, list(pages or [])))
+
+    def _budget_left(self, pages: List[Dict], in_flight: int = 0) -> bool:
+        """Whether more fetches may be scheduled without exceeding max_pages."""
+        if self.max_pages is None:
+            return True
+        return len(pages) + in_flight < self.max_pages
+
+    async def _crawl(self, frontier: Frontier, pages: List[Dict]) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        in_flight: Set[asyncio.Task] = set()
+        task_urls: Dict[asyncio.Task, Tuple[str, int]] = {}
+
+        try:
+            while (frontier or in_flight) and self._budget_left(pages):
+                # Fill free slots from the frontier
+                while (frontier and len(in_flight) < self.concurrency
+                       and self._budget_left(pages, len(in_flight))):
+                    url, depth = frontier.pop()
+                    if depth > self.max_depth:
+                        continue
+                    if not self.allow(url):
+                        continue
+                    self.fetched += 1
+                    task = asyncio.create_task(self._fetch(loop, executor, url, depth))
+                    task_urls[task] = (url, depth)
+                    in_flight.add(task)
+
+                if not in_flight:
+                    break
+
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    url, _ = task_urls.pop(task)
+                    page, links, depth = task.result()
+                    if page:
+                        pages.append(page)
+                    for link in links:
+                        frontier.push(link, depth + 1)
+                    if self.checkpoint:
+                        self.checkpoint.record(url, depth, page, links)
+
+                if self.checkpoint:
+                    self.checkpoint.maybe_snapshot(frontier, task_urls.values())
+        finally:
+            for task in in_flight:
+                task.cancel()
+            # Cancelling a task does not stop its thread: let in-flight fetches finish before returning
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if self.max_pages is not None:
+            pages = pages[:self.max_pages]
+        logger.info(f"Async crawl finished: {len(pages)} pages, {self.fetched} URLs fetched")
+        return pages
+
+    async def _fetch(self, loop, executor, url: str, depth: int):
+        """Fetch one URL inside its host's concurrency slot."""
+        host = urlparse(url).netloc
+        slot = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+
+        async with slot:
+            try:
+                page, links = await loop.run_in_executor(executor, self.fetch_page, url, depth)
+            except Exception as e:
+                logger.error(f"Failed to crawl {url}: {e}")
+                page, links = None, []
+
+            # Hold the host slot for the politeness delay
+            if self.host_delay:
+                await asyncio.sleep(self.host_delay)
+
+        return page, links, depth
@@ -0,0 +1,125 @@
+"""
+Cross-page template removal.
+
+Site chrome that the HTML extraction cannot recognise (headers, CTAs,
+footers and menus not wrapped in semantic tags) repeats on nearly every
+crawled page. TemplateFilter counts, for every normalised line, how many
+pages contain it, and strips the lines found on at least ``threshold`` of
+the pages before the text is chunked. Lines are reduced to hashes, so the
+pass is two linear scans with one counter per distinct line.
+
+Page text without line breaks (ingest-worker.py's space-joined text) is
+handled the same way with overlapping word shingles in place of lines:
+every run of words covered by frequent shingles is removed.
+
+Years are folded before hashing, so "(c) 2023" and "(c) 2024" count as
+the same line.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_YEAR_RE = re.compile(r'\b(19|20)\d\d\b')
+
+
+@dataclass
+class TemplateReport:
+    """What the template filter removed"""
+    pages_in: int = 0
+    template_lines: int = 0  # Distinct lines/shingles judged to be template
+    lines_removed: int = 0
+    words_removed: int = 0
+    chars_removed: int = 0
+    pages_emptied: int = 0  # Pages that were nothing but template (dropped)
+    chunks_avoided: int = 0  # Estimated by the pipeline from its chunk stride
+
+    def estimate_chunks(self, words_per_chunk: float):
+        """Fill in chunks_avoided for a chunker advancing words_per_chunk per chunk."""
+        self.chunks_avoided = int(self.words_removed / max(words_per_chunk, 1))
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _normalize(text: str) -> str:
+    return _YEAR_RE.sub('0000', ' '.join(text.lower().split()))
+
+
+class TemplateFilter:
+    """Strip lines repeated on a large fraction of the pages."""
+
+    def __init__(self, threshold: float = 0.5, min_pages: int = 5, shingle_words: int = 6):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Invalid template threshold: {threshold}")
+        self.threshold = threshold  # Fraction of pages a line must appear on
+        self.min_pages = min_pages  # Below this, repetition says nothing about templates
+        self.shingle_words = shingle_words
+
+    def _lines(self, text: str) -> Tuple[List[str], List[int]]:
+        lines = [line for line in text.splitlines() if line.strip()]
+        return lines, [hash(_normalize(line)) for line in lines]
+
+    def _shingles(self, text: str) -> Tuple[List[str], List[int]]:
+        words = text.split()
+        normalized = _normalize(text).split()
+        size = self.shingle_words
+        if len(normalized) != len(words) or len(words) < size:
+            return words, []
+        return words, [hash(' '.join(normalized[i:i + size])) for i in range(len(words) - size + 1)]
+
+    def filter(self, pages: List[Dict]) -> Tuple[List[Dict], TemplateReport]:
+        """Return (pages with template text removed, report); pages left empty are dropped."""
+        report = TemplateReport(pages_in=len(pages))
+        if len(pages) < self.min_pages:
+            return pages, report
+
+        # Pass 1: hash every line (or shingle) and count the pages it appears on
+        segmented = []
+        page_counts: Counter = Counter()
+        for page in pages:
+            text = page.get('text', '')
+            by_line = '\n' in text
+            pieces, hashes = self._lines(text) if by_line else self._shingles(text)
+            segmented.append((by_line, pieces, hashes))
+            page_counts.update(set(hashes))
+
+        cutoff = max(2, math.ceil(self.threshold * len(pages)))
+        template = {key for key, count in page_counts.items() if count >= cutoff}
+        report.template_lines = len(template)
+        if not template:
+            return pages, report
+
+        # Pass 2: rebuild each page without its template lines
+        kept = []
+        for page, (by_line, pieces, hashes) in zip(pages, segmented):
+            if by_line:
+                remaining = [line for line, key in zip(pieces, hashes) if key not in template]
+                removed = [line for line, key in zip(pieces, hashes) if key in template]
+                text = '\n'.join(remaining)
+            else:
+                covered = bytearray(len(pieces))
+                for start, key in enumerate(hashes):
+                    if key in template:
+                        covered[start:start + self.shingle_words] = b'\x01' * self.shingle_words
+                removed = [word for word, flag in zip(pieces, covered) if flag]
+                text = ' '.join(word for word, flag in zip(pieces, covered) if not flag)
+
+            if not removed:
+                kept.append(page)
+                continue
+            report.lines_removed += len(removed) if by_line else 0
+            report.words_removed += sum(len(piece.split()) for piece in removed)
+            report.chars_removed += len(page.get('text', '')) - len(text)
+            if not text.strip():
+                report.pages_emptied += 1
+                logger.info(f"Only template text on {page.get('url') or page.get('source', '')}")
+                continue
+            kept.append(dict(page, text=text))
+
+        return kept, report
@@ -0,0 +1,176 @@
+"""
+Crawl checkpoint journal for resuming interrupted crawls.
+
+A checkpoint directory holds two files:
+
+    journal.bin - append-only log, one zlib-compressed record per finished
+                  URL: {url, depth, page, links}. Written as each fetch
+                  completes, so a crash loses at most the in-flight fetches.
+    state.bin   - periodic snapshot of the frontier (queued + in-flight
+                  URLs), the visited set and the journal offset it covers,
+                  replaced atomically.
+
+Resuming loads the snapshot, collects every extracted page from the journal,
+and replays the records written after the snapshot (dropping those URLs from
+the frontier and re-queueing their outlinks). A torn record at the end of
+the journal is truncated away.
+"""
+
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .frontier import Frontier
+
+logger = logging.getLogger(__name__)
+
+_FRAME = struct.Struct('>I')  # Length prefix of each compressed record
+
+
+def _write_frame(f, payload: bytes):
+    data = zlib.compress(payload)
+    f.write(_FRAME.pack(len(data)) + data)
+
+
+def _read_frames(f) -> Iterator[Tuple[bytes, int]]:
+    """Yield (payload, end offset) until EOF or the first torn frame."""
+    while True:
+        header = f.read(_FRAME.size)
+        if len(header) < _FRAME.size:
+            return
+        (length,) = _FRAME.unpack(header)
+        data = f.read(length)
+        if len(data) < length:
+            return
+        try:
+            payload = zlib.decompress(data)
+        except zlib.error:
+            return
+        yield payload, f.tell()
+
+
+class CrawlCheckpoint:
+    """On-disk journal + snapshot of one crawl."""
+
+    JOURNAL = 'journal.bin'
+    STATE = 'state.bin'
+
+    def __init__(self, checkpoint_dir: str, key: str, interval: float = 30.0, every: int = 200):
+        safe_key = ''.join(c if c.isalnum() or c in '.-' else '_' for c in key)
+        self.path = Path(checkpoint_dir) / safe_key
+        self.interval = interval  # Max seconds between snapshots
+        self.every = every  # Max journal records between snapshots
+        self._journal = None
+        self._since_snapshot = 0
+        self._last_snapshot = time.time()
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return (self.path / self.STATE).exists()
+
+    def clear(self):
+        """Delete the checkpoint (fresh crawl, or job finished)."""
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _open_journal(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._journal = open(self.path / self.JOURNAL, 'ab')
+
+    def start(self, frontier: Frontier):
+        """Begin a fresh checkpoint for a newly seeded frontier."""
+        self.clear()
+        self._open_journal()
+        self.snapshot(frontier)
+
+    def restore(self, frontier: Frontier) -> List[Dict]:
+        """Refill an empty frontier (and its visited set) from disk; returns pages extracted so far."""
+        visited = frontier.seen
+        with open(self.path / self.STATE, 'rb') as f:
+            frames = [payload for payload, _ in _read_frames(f)]
+        if len(frames) != 2:
+            raise ValueError(f"Corrupt crawl checkpoint: {self.path / self.STATE}")
+        state = json.loads(frames[0])
+        visited.load({'mode': state['visited_mode'], 'count': state['visited_count'], 'data': frames[1]})
+
+        pages: List[Dict] = []
+        replay: List[Dict] = []
+        good_end = 0
+        journal_path = self.path / self.JOURNAL
+        if journal_path.exists():
+            with open(journal_path, 'rb') as f:
+                for payload, end in _read_frames(f):
+                    record = json.loads(payload)
+                    if record['page']:
+                        pages.append(record['page'])
+                    if end > state['offset']:
+                        replay.append(record)
+                    good_end = end
+            if good_end < journal_path.stat().st_size:
+                logger.warning(f"Dropping torn record at end of {journal_path}")
+                os.truncate(journal_path, good_end)
+
+        # Finished after the snapshot: not pending any more, but their links are
+        done = {record['url'] for record in replay}
+        for url, depth in state['pending']:
+            if url not in done:
+                frontier.requeue(url, depth)
+        for record in replay:
+            for link in record['links']:
+                frontier.push(link, record['depth'] + 1)
+
+        self._open_journal()
+        logger.info(f"Resumed crawl checkpoint: {len(pages)} pages, {len(frontier)} URLs queued")
+        return pages
+
+    def record(self, url: str, depth: int, page: Optional[Dict], links: List[str]):
+        """Journal a finished URL (page may be None)."""
+        payload = json.dumps({'url': url, 'depth': depth, 'page': page, 'links': links})
+        with self._lock:
+            _write_frame(self._journal, payload.encode('utf-8'))
+            self._journal.flush()
+            self._since_snapshot += 1
+
+    def maybe_snapshot(self, frontier: Frontier, in_flight: Iterable[Tuple[str, int]] = ()):
+        """Snapshot when enough records or time have passed since the last one.
+
+        Call only after the links of every recorded URL have been pushed.
+        """
+        if (self._since_snapshot >= self.every
+                or time.time() - self._last_snapshot >= self.interval):
+            self.snapshot(frontier, in_flight)
+
+    def snapshot(self, frontier: Frontier, in_flight: Iterable[Tuple[str, int]] = ()):
+        """Atomically write the frontier, in-flight URLs and visited set."""
+        visited = frontier.seen.dump()
+        with self._lock:
+            self._journal.flush()
+            state = {
+                'offset': self._journal.tell(),
+                'pending': list(in_flight) + frontier.pending(),
+                'visited_mode': visited['mode'],
+                'visited_count': visited['count'],
+                'saved_at': time.time()
+            }
+            tmp_path = self.path / (self.STATE + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                _write_frame(f, json.dumps(state).encode('utf-8'))
+                _write_frame(f, visited['data'])
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path / self.STATE)
+            self._since_snapshot = 0
+            self._last_snapshot = time.time()
+
+    def close(self):
+        with self._lock:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
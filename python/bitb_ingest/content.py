@@ -0,0 +1,267 @@
+"""
+Readability-style main-content extraction.
+
+Both parser backends convert the page into a light block tree (tag,
+class/id hint, text pieces, children), and the extraction works on that:
+
+1. mark non-content elements: nav/aside/footer/menus/buttons, hidden
+   elements, and class/id names like cookie, banner, sidebar, share or
+   related unless they also look like content
+2. score every block holding a paragraph of text by its length and
+   commas, and credit the score to its parent (full) and grandparent
+   (half), starting each candidate from its tag and class/id weight
+3. scale candidates by (1 - link density), keep the best one plus the
+   siblings that score close to it or hold a long low-link paragraph
+4. emit the kept blocks one line per block, skipping link-dense blocks
+   inside them (menus, tag clouds, "related posts" lists)
+
+Pages without a clear candidate fall back to the whole body with only
+steps 1 and 4 applied. removed_chars is measured against the page's full
+visible text rendered the same way.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Invisible or non-text content: never part of the tree
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object',
+             'embed', 'head', 'title', 'meta', 'link'}
+# Page chrome: in the tree (it counts as removed text), never extracted
+CHROME_TAGS = {'nav', 'aside', 'footer', 'menu', 'button', 'select', 'option', 'dialog'}
+BLOCK_TAGS = {'html', 'body', 'main', 'article', 'section', 'div', 'p', 'pre', 'blockquote',
+              'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'table', 'thead', 'tbody', 'tfoot', 'tr', 'td',
+              'th', 'caption', 'figure', 'figcaption', 'header', 'footer', 'nav', 'aside', 'address',
+              'form', 'fieldset', 'details', 'summary', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr',
+              'br', 'center'}
+CONTAINER_TAGS = {'div', 'section', 'ul', 'ol', 'dl', 'table', 'tbody', 'header', 'center'}
+NEVER_UNLIKELY = {'html', 'body', 'main', 'article'}
+
+UNLIKELY = re.compile(
+    r'cookie|consent|gdpr|banner|combx|comment|community|disqus|extra|foot|header|legends|menu|'
+    r'related|remark|replies|rss|shoutbox|sidebar|skyscraper|social|sponsor|ad-break|agegate|'
+    r'pagination|pager|popup|modal|newsletter|subscribe|signup|breadcrumb|share|sharing|promo|'
+    r'widget|masthead|navbar|toolbar|skip-link|outbrain|taboola',
+    re.IGNORECASE
+)
+MAYBE_CONTENT = re.compile(r'and|article|body|column|content|main|shadow|post|entry|story|text',
+                           re.IGNORECASE)
+POSITIVE = re.compile(r'article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story|'
+                      r'prose|markdown|documentation|docs', re.IGNORECASE)
+NEGATIVE = re.compile(r'hidden|banner|combx|comment|com-|contact|foot|footer|footnote|masthead|media|'
+                      r'meta|outbrain|promo|related|scroll|share|shoutbox|sidebar|skyscraper|'
+                      r'sponsor|shopping|tags|tool|widget|cookie|consent|nav|menu', re.IGNORECASE)
+HIDDEN_STYLE = re.compile(r'display\s*:\s*none|visibility\s*:\s*hidden', re.IGNORECASE)
+
+TAG_WEIGHTS = {'div': 5, 'article': 10, 'main': 10, 'section': 3, 'pre': 3, 'td': 3, 'blockquote': 3,
+               'address': -3, 'ol': -3, 'ul': -3, 'dl': -3, 'dd': -3, 'dt': -3, 'li': -3, 'form': -3,
+               'h1': -5, 'h2': -5, 'h3': -5, 'h4': -5, 'h5': -5, 'h6': -5, 'th': -5}
+
+MIN_PARAGRAPH_CHARS = 25  # Shorter blocks don't vote for a content container
+MIN_CONTENT_CHARS = 200  # A best candidate with less text than this is not trusted
+SIBLING_PARAGRAPH_CHARS = 80
+
+
+class Node:
+    """One element of the block tree."""
+
+    __slots__ = ('tag', 'hint', 'items', 'parent', 'chars', 'link_chars', 'commas',
+                 'own_chars', 'own_commas', 'unlikely', 'score', 'candidate')
+
+    def __init__(self, tag: str, hint: str = '', parent: Optional['Node'] = None):
+        self.tag = tag
+        self.hint = hint  # class and id attribute values
+        self.items: List = []  # str and Node, document order
+        self.parent = parent
+        self.chars = 0
+        self.link_chars = 0
+        self.commas = 0
+        self.own_chars = 0  # Text not inside a nested block element
+        self.own_commas = 0
+        self.unlikely = False
+        self.score = 0.0
+        self.candidate = False
+
+    def add(self, tag: str, hint: str = '') -> 'Node':
+        child = Node(tag, hint, self)
+        self.items.append(child)
+        return child
+
+    @property
+    def link_density(self) -> float:
+        return self.link_chars / self.chars if self.chars else 0.0
+
+
+def is_hidden(attrs: Dict[str, str]) -> bool:
+    """hidden / aria-hidden / inline display:none elements."""
+    return ('hidden' in attrs or attrs.get('aria-hidden') == 'true'
+            or bool(HIDDEN_STYLE.search(attrs.get('style') or '')))
+
+
+def _text_length(text: str) -> int:
+    return len(' '.join(text.split()))
+
+
+def _measure(nodes: List[Node]):
+    """Fill in text/link/comma counts bottom-up (nodes listed parents first)."""
+    for node in reversed(nodes):
+        chars = commas = own_chars = own_commas = links = 0
+        for item in node.items:
+            if isinstance(item, str):
+                length = _text_length(item)
+                chars += length
+                own_chars += length
+                count = item.count(',')
+                commas += count
+                own_commas += count
+            elif not item.unlikely:
+                chars += item.chars
+                commas += item.commas
+                links += item.link_chars
+                if item.tag not in BLOCK_TAGS:
+                    own_chars += item.own_chars
+                    own_commas += item.own_commas
+        node.chars, node.commas = chars, commas
+        node.own_chars, node.own_commas = own_chars, own_commas
+        node.link_chars = chars if node.tag == 'a' else links
+
+
+def _class_weight(node: Node) -> int:
+    weight = 0
+    if node.hint:
+        if NEGATIVE.search(node.hint):
+            weight -= 25
+        if POSITIVE.search(node.hint):
+            weight += 25
+    return weight
+
+
+def _credit(node: Optional[Node], score: float, candidates: List[Node]):
+    if node is None or node.unlikely:
+        return
+    if not node.candidate:
+        node.candidate = True
+        node.score = TAG_WEIGHTS.get(node.tag, 0) + _class_weight(node)
+        candidates.append(node)
+    node.score += score
+
+
+def _is_boilerplate(node: Node) -> bool:
+    """Chrome, or a link-dense block inside the content: menu, tag cloud, link list."""
+    if node.unlikely:
+        return True
+    if node.tag not in BLOCK_TAGS:
+        return False  # Inline links are part of their sentence
+    density = node.link_density
+    if density > 0.5:
+        return True
+    return node.tag in CONTAINER_TAGS and density > 0.25 and node.chars < 200
+
+
+def render(root: Node, prune: bool) -> str:
+    """Text of a subtree, one line per block; prune drops boilerplate blocks."""
+    lines: List[str] = []
+    line: List[str] = []
+
+    def flush():
+        text = ' '.join(''.join(line).split())
+        if text:
+            lines.append(text)
+        line.clear()
+
+    stack: List = [root]
+    while stack:
+        item = stack.pop()
+        if item is None:  # End of a block element
+            flush()
+            continue
+        if isinstance(item, str):
+            line.append(item)
+            continue
+        if prune and item is not root and _is_boilerplate(item):
+            continue
+        if item.tag in BLOCK_TAGS:
+            flush()
+            stack.append(None)
+        stack.extend(reversed(item.items))
+    flush()
+    return '\n'.join(lines)
+
+
+def _select(body: Node, nodes: List[Node]) -> List[Node]:
+    """Best content candidate and the siblings that belong with it."""
+    candidates: List[Node] = []
+    for node in nodes:
+        if node.unlikely or node.tag not in BLOCK_TAGS or node.own_chars < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + node.own_commas + min(node.own_chars // 100, 3)
+        _credit(node.parent, score, candidates)
+        if node.parent is not None:
+            _credit(node.parent.parent, score / 2, candidates)
+
+    for candidate in candidates:
+        candidate.score *= 1 - candidate.link_density
+    top = max(candidates, key=lambda candidate: candidate.score, default=None)
+    if top is None or top.chars < MIN_CONTENT_CHARS:
+        return [body]
+
+    parent = top.parent
+    if parent is None or top.tag in ('body', 'html'):
+        return [top]
+    threshold = max(10.0, top.score * 0.2)
+    selected = []
+    for sibling in parent.items:
+        if not isinstance(sibling, Node) or sibling.unlikely:
+            continue
+        if (sibling is top
+                or (sibling.candidate and sibling.score >= threshold)
+                or (sibling.own_chars > SIBLING_PARAGRAPH_CHARS and sibling.link_density < 0.25)):
+            selected.append(sibling)
+    return selected
+
+
+def extract(body: Node, nodes: List[Node]) -> Tuple[str, int]:
+    """Main-content text of a block tree and the characters removed.
+
+    nodes lists every Node of the tree, each parent before its children
+    (as the tree builders produce them).
+    """
+    for node in nodes:
+        if node.tag in CHROME_TAGS or (node.parent is not None and node.parent.unlikely):
+            node.unlikely = True
+        elif (node.hint and node.tag not in NEVER_UNLIKELY
+              and UNLIKELY.search(node.hint) and not MAYBE_CONTENT.search(node.hint)):
+            node.unlikely = True
+    _measure(nodes)
+
+    full_text = render(body, prune=False)
+    text = '\n'.join(filter(None, (render(node, prune=True) for node in _select(body, nodes))))
+    return text, max(0, len(full_text) - len(text))
+
+
+@dataclass
+class ExtractionReport:
+    """Characters kept and removed by the content extractor over a crawl"""
+    mode: str
+    pages: int = 0
+    chars_kept: int = 0
+    chars_removed: int = 0
+
+    @classmethod
+    def from_pages(cls, mode: str, pages: List[Dict]) -> 'ExtractionReport':
+        report = cls(mode)
+        for page in pages:
+            report.pages += 1
+            report.chars_kept += len(page.get('text', ''))
+            report.chars_removed += page.get('chars_removed', 0)
+        return report
+
+    def as_dict(self) -> Dict:
+        total = self.chars_kept + self.chars_removed
+        return {
+            'mode': self.mode,
+            'pages': self.pages,
+            'chars_kept': self.chars_kept,
+            'chars_removed': self.chars_removed,
+            'removed_ratio': round(self.chars_removed / total, 3) if total else 0.0
+        }
@@ -0,0 +1,169 @@
+"""
+Conditional-revalidation crawl cache.
+
+A persistent per-domain SQLite store keyed by canonical URL that keeps the
+HTTP validators (ETag / Last-Modified) and the extracted page + outlinks of
+every fetched page. On recrawl the crawler:
+
+1. skips the request entirely when a sitemap <lastmod> is not newer than
+   the cached copy, or
+2. sends If-None-Match / If-Modified-Since and, on 304, reuses the cached
+   extraction instead of re-parsing.
+
+Each entry records the extractor that produced it (html_parse.extractor_version:
+parser version, backend, text mode). An entry from another extractor is a
+miss, so switching extraction mode re-fetches and re-parses instead of
+serving stale text.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .frontier import url_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """Cached fetch result for one URL"""
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    page: Optional[Dict]
+    links: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CacheStats:
+    """Counters for one CrawlCache"""
+    lookups: int = 0
+    misses: int = 0
+    not_modified: int = 0  # 304 responses served from cache
+    skipped_by_lastmod: int = 0  # No request made at all
+    stored: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Parse a sitemap W3C datetime (date-only or full ISO 8601) to epoch seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class CrawlCache:
+    """Per-domain page cache with HTTP validators."""
+
+    def __init__(self, cache_dir: str, domain: str, extractor: str = ''):
+        path = Path(cache_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        safe_domain = ''.join(c if c.isalnum() or c in '.-' else '_' for c in domain)
+        self.path = path / f"{safe_domain}.sqlite"
+        self.extractor = extractor  # Entries parsed by another extractor are misses
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' url TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' fetched_at REAL NOT NULL,'
+            ' payload BLOB NOT NULL)'
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Cache key for a URL (its canonical dedup key)"""
+        return url_key(url)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached entry for url, if any."""
+        self.stats.add(lookups=1)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT etag, last_modified, fetched_at, payload FROM pages WHERE url = ?',
+                (self.key(url),)
+            ).fetchone()
+        if row is None:
+            self.stats.add(misses=1)
+            return None
+
+        etag, last_modified, fetched_at, payload = row
+        data = json.loads(zlib.decompress(payload))
+        if data.get('extractor', '') != self.extractor:
+            self.stats.add(misses=1)
+            return None
+        return CacheEntry(self.key(url), etag, last_modified, fetched_at, data['page'], data['links'])
+
+    def is_unchanged(self, entry: CacheEntry, lastmod: Optional[str]) -> bool:
+        """True when a sitemap lastmod says the page has not changed since it was cached."""
+        modified_at = parse_lastmod(lastmod)
+        if modified_at is None or modified_at > entry.fetched_at:
+            return False
+        self.stats.add(skipped_by_lastmod=1)
+        return True
+
+    @staticmethod
+    def request_headers(entry: CacheEntry) -> Dict[str, str]:
+        """Conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def revalidated(self, entry: CacheEntry):
+        """Record a 304 for entry and refresh its fetch time."""
+        self.stats.add(not_modified=1)
+        with self._lock:
+            self._db.execute(
+                'UPDATE pages SET fetched_at = ? WHERE url = ?',
+                (time.time(), entry.url)
+            )
+            self._db.commit()
+
+    def store(self, url: str, headers, page: Optional[Dict], links: List[str]):
+        """Store a fresh 200 response's validators and extraction."""
+        payload = zlib.compress(json.dumps({'page': page, 'links': links, 'extractor': self.extractor}).encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, fetched_at, payload)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (self.key(url), headers.get('ETag'), headers.get('Last-Modified'), time.time(), payload)
+            )
+            self._db.commit()
+        self.stats.add(stored=1)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
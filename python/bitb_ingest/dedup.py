@@ -0,0 +1,143 @@
+"""
+Near-duplicate page detection.
+
+Fingerprints each page's text with a 64-bit SimHash over word shingles and
+drops pages whose fingerprint is within a Hamming distance of a page kept
+earlier (print views, paginated listings, locale mirrors, ...). Candidate
+pairs are found with band indexing: with k allowed differing bits the
+fingerprint is split into k + 1 bands, and by pigeonhole any near-duplicate
+shares at least one band exactly, so the filter stays near-linear.
+
+Dropped pages are merged into the page they duplicate: their URL is added
+to that page's ``duplicate_urls`` list.
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+@dataclass
+class DedupReport:
+    """What the near-duplicate filter removed"""
+    pages_in: int = 0
+    pages_dropped: int = 0
+    exact_duplicates: int = 0
+    words_dropped: int = 0  # Text that would otherwise have been chunked and embedded
+    chunks_avoided: int = 0  # Estimated by the pipeline from its chunk stride
+
+    def estimate_chunks(self, words_per_chunk: float):
+        """Fill in chunks_avoided for a chunker advancing words_per_chunk per chunk."""
+        self.chunks_avoided = int(self.words_dropped / max(words_per_chunk, 1))
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+# Per-byte lookup spreading each of the 8 bits into its own 24-bit counter
+# field, so a shingle's 64 bit-votes are added with 8 big-int additions
+_FIELD_BITS = 24
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+_BYTE_SPREAD = [
+    sum(((value >> bit) & 1) << (bit * _FIELD_BITS) for bit in range(8))
+    for value in range(256)
+]
+
+
+def simhash(words: List[str], shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles."""
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = (' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+    counts = 0  # 64 packed per-bit counters
+    total = 0
+    for shingle in shingles:
+        total += 1
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        for index, value in enumerate(digest):
+            counts += _BYTE_SPREAD[value] << (index * 8 * _FIELD_BITS)
+
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if 2 * ((counts >> (bit * _FIELD_BITS)) & _FIELD_MASK) > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def _location(page: Dict) -> str:
+    """URL of a crawled page, or file name of an uploaded one."""
+    return page.get('url') or page.get('source', '')
+
+
+class NearDuplicateFilter:
+    """Drop pages whose SimHash similarity to an earlier page meets a threshold."""
+
+    def __init__(self, threshold: float = 0.95, shingle_size: int = 3):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Invalid similarity threshold: {threshold}")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        # Similarity = 1 - hamming / 64, so 0.95 allows 3 differing bits
+        self.max_distance = int((1 - threshold) * FINGERPRINT_BITS + 1e-9)
+        self.band_count = self.max_distance + 1
+        self._band_bits = FINGERPRINT_BITS // self.band_count
+
+    def _bands(self, fingerprint: int) -> List[Tuple[int, int]]:
+        bands = []
+        for band in range(self.band_count):
+            shift = band * self._band_bits
+            width = self._band_bits if band < self.band_count - 1 else FINGERPRINT_BITS - shift
+            bands.append((band, (fingerprint >> shift) & ((1 << width) - 1)))
+        return bands
+
+    def filter(self, pages: List[Dict]) -> Tuple[List[Dict], DedupReport]:
+        """Return (kept pages in original order, report)."""
+        report = DedupReport(pages_in=len(pages))
+        kept: List[Dict] = []
+        fingerprints: List[int] = []
+        exact: Dict[bytes, int] = {}
+        band_index: Dict[Tuple[int, int], List[int]] = {}
+
+        for page in pages:
+            words = _WORD_RE.findall(page.get('text', '').lower())
+            digest = hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=16).digest()
+
+            original = exact.get(digest)
+            if original is None:
+                fingerprint = simhash(words, self.shingle_size)
+                bands = self._bands(fingerprint)
+                for key in bands:
+                    for candidate in band_index.get(key, ()):
+                        if bin(fingerprint ^ fingerprints[candidate]).count('1') <= self.max_distance:
+                            original = candidate
+                            break
+                    if original is not None:
+                        break
+            else:
+                report.exact_duplicates += 1
+
+            if original is not None:
+                kept_page = kept[original]
+                kept_page.setdefault('duplicate_urls', []).append(_location(page))
+                report.pages_dropped += 1
+                report.words_dropped += len(words)
+                logger.info(f"Near-duplicate of {_location(kept_page)}: {_location(page)}")
+                continue
+
+            position = len(kept)
+            kept.append(page)
+            fingerprints.append(fingerprint)
+            exact[digest] = position
+            for key in bands:
+                band_index.setdefault(key, []).append(position)
+
+        return kept, report
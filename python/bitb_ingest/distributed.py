@@ -0,0 +1,415 @@
+"""
+Multi-process crawling over a shared SQLite frontier.
+
+SharedFrontier is the coordination store: crawl worker processes lease one
+URL at a time, fetch and parse it with their own crawler, and ack the
+result, which stores the extracted page and enqueues its outlinks (deduped
+by canonical URL key). A lease that is not acked within lease_seconds (a
+crashed or stuck worker) goes back to the queue.
+
+Per-host politeness holds across processes: each host has ``per_host``
+slots, and a slot stays busy from lease until ``host_delay`` seconds after
+the ack, the same rule AsyncCrawlEngine applies inside one process. A
+worker whose fetcher has an adaptive rate limiter paces it through a
+SharedRateLimiter: one token bucket per host, kept in the same database,
+so adding workers neither multiplies the request rate to a host nor hides
+one worker's 429s and Retry-After from the others.
+Within a host, URLs are leased highest priority first (a crawler's
+score_url, or breadth-first without one).
+
+crawl_distributed() seeds a frontier and forks N local workers; other
+processes (or hosts sharing the file) can join with run_worker(). SQLite in
+WAL mode stands in for a networked queue.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .frontier import canonicalize, has_binary_extension, url_key
+from .ratelimit import AdaptiveRateLimiter, HostRate
+
+logger = logging.getLogger(__name__)
+
+Score = Callable[[str, int], float]  # (canonical url, depth) -> priority, higher first
+Trap = Callable[[str], Optional[str]]  # canonical url -> reason it is a crawler trap, or None
+
+QUEUED, LEASED, DONE, TRAPPED = 0, 1, 2, 3
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS urls ('
+    ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' key TEXT UNIQUE NOT NULL,'
+    ' url TEXT NOT NULL,'
+    ' host TEXT NOT NULL,'
+    ' depth INTEGER NOT NULL,'
+    ' priority REAL NOT NULL,'
+    ' state INTEGER NOT NULL DEFAULT 0,'
+    ' owner TEXT,'
+    ' lease_expires REAL)',
+    'CREATE INDEX IF NOT EXISTS urls_by_host ON urls (host, state, priority DESC, seq)',
+    'CREATE INDEX IF NOT EXISTS urls_by_state ON urls (state, lease_expires)',
+    'CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, queued INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE IF NOT EXISTS slots (key TEXT PRIMARY KEY, host TEXT NOT NULL, busy_until REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS pages (seq INTEGER PRIMARY KEY AUTOINCREMENT, payload BLOB NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS worker_stats (owner TEXT PRIMARY KEY, stats TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS rates (host TEXT PRIMARY KEY, state TEXT NOT NULL)',
+)
+
+
+class SharedFrontier:
+    """SQLite-backed crawl frontier with lease/ack semantics."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        settings = dict(self._db.execute('SELECT name, value FROM meta').fetchall())
+        self.max_depth: Optional[int] = json.loads(settings.get('max_depth', 'null'))
+        self.max_pages: Optional[int] = json.loads(settings.get('max_pages', 'null'))
+        self.per_host: int = json.loads(settings.get('per_host', '2'))
+        self.host_delay: float = json.loads(settings.get('host_delay', '0'))
+        self.lease_seconds: float = json.loads(settings.get('lease_seconds', '120'))
+
+    @classmethod
+    def create(cls, db_path: str, max_depth: Optional[int] = None, max_pages: Optional[int] = None,
+               per_host: int = 2, host_delay: float = 0.0, lease_seconds: float = 120.0) -> 'SharedFrontier':
+        """Start a new crawl, replacing any previous frontier at db_path."""
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        frontier = cls(db_path)
+        settings = {
+            'max_depth': max_depth, 'max_pages': max_pages, 'per_host': max(1, per_host),
+            'host_delay': host_delay, 'lease_seconds': lease_seconds
+        }
+        frontier._db.executemany(
+            'INSERT INTO meta (name, value) VALUES (?, ?)',
+            [(name, json.dumps(value)) for name, value in settings.items()]
+        )
+        for name, value in settings.items():
+            setattr(frontier, name, value)
+        return frontier
+
+    def _insert(self, url: str, depth: int, score: Optional[Score] = None, trap: Optional[Trap] = None) -> bool:
+        canonical = canonicalize(url)
+        if canonical is None or has_binary_extension(canonical):
+            return False
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        host = urlsplit(canonical).netloc
+        key = url_key(canonical)
+        if self._db.execute('SELECT 1 FROM urls WHERE key = ?', (key,)).fetchone():
+            return False  # Seen: don't spend a score on it
+        if trap and trap(canonical):
+            # Kept as seen, so no worker judges or fetches it again
+            self._db.execute('INSERT OR IGNORE INTO urls (key, url, host, depth, priority, state)'
+                             ' VALUES (?, ?, ?, ?, 0, ?)', (key, canonical, host, depth, TRAPPED))
+            return False
+        priority = score(canonical, depth) if score else -depth
+        inserted = self._db.execute(
+            'INSERT OR IGNORE INTO urls (key, url, host, depth, priority) VALUES (?, ?, ?, ?, ?)',
+            (key, canonical, host, depth, priority)
+        ).rowcount
+        if inserted:
+            self._db.execute(
+                'INSERT INTO hosts (host, queued) VALUES (?, 1)'
+                ' ON CONFLICT (host) DO UPDATE SET queued = queued + 1',
+                (host,)
+            )
+        return bool(inserted)
+
+    def push(self, url: str, depth: int, score: Optional[Score] = None, trap: Optional[Trap] = None) -> bool:
+        """Enqueue url unless some worker has seen it before (or trap flags it)."""
+        with self._transaction():
+            return self._insert(url, depth, score, trap)
+
+    def push_all(self, entries: Iterable[Tuple[str, int]], score: Optional[Score] = None,
+                 trap: Optional[Trap] = None) -> int:
+        """Enqueue (url, depth) pairs in one transaction; returns how many were new."""
+        with self._transaction():
+            return sum(self._insert(url, depth, score, trap) for url, depth in entries)
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    def _reclaim_expired(self, now: float):
+        """Return leases of dead or stuck workers to the queue."""
+        expired = self._db.execute(
+            'SELECT key, host FROM urls WHERE state = ? AND lease_expires < ?', (LEASED, now)
+        ).fetchall()
+        for key, host in expired:
+            logger.warning(f"Lease expired, requeueing {key}")
+            self._db.execute('UPDATE urls SET state = ?, owner = NULL WHERE key = ?', (QUEUED, key))
+            self._db.execute('UPDATE hosts SET queued = queued + 1 WHERE host = ?', (host,))
+            self._db.execute('DELETE FROM slots WHERE key = ?', (key,))
+
+    def _active_leases(self, now: float) -> int:
+        return self._db.execute(
+            'SELECT COUNT(*) FROM urls WHERE state = ? AND lease_expires >= ?', (LEASED, now)
+        ).fetchone()[0]
+
+    def _page_count(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+    def lease(self, owner: str) -> Optional[Tuple[str, int]]:
+        """Lease the next URL whose host has a free slot, or None if none is ready now."""
+        now = time.time()
+        with self._transaction():
+            self._reclaim_expired(now)
+            if (self.max_pages is not None
+                    and self._page_count() + self._active_leases(now) >= self.max_pages):
+                return None
+
+            self._db.execute('DELETE FROM slots WHERE busy_until <= ?', (now,))
+            row = self._db.execute(
+                'SELECT host FROM hosts WHERE queued > 0 AND host NOT IN ('
+                '  SELECT host FROM slots GROUP BY host HAVING COUNT(*) >= ?)'
+                ' LIMIT 1',
+                (self.per_host,)
+            ).fetchone()
+            if row is None:
+                return None
+            host = row[0]
+
+            key, url, depth = self._db.execute(
+                'SELECT key, url, depth FROM urls WHERE host = ? AND state = ?'
+                ' ORDER BY priority DESC, seq LIMIT 1',
+                (host, QUEUED)
+            ).fetchone()
+            expires = now + self.lease_seconds
+            self._db.execute(
+                'UPDATE urls SET state = ?, owner = ?, lease_expires = ? WHERE key = ?',
+                (LEASED, owner, expires, key)
+            )
+            self._db.execute('UPDATE hosts SET queued = queued - 1 WHERE host = ?', (host,))
+            self._db.execute('INSERT OR REPLACE INTO slots (key, host, busy_until) VALUES (?, ?, ?)',
+                             (key, host, expires))
+            return url, depth
+
+    def ack(self, url: str, owner: str, page: Optional[Dict], links: List[str], depth: int,
+            score: Optional[Score] = None, trap: Optional[Trap] = None) -> bool:
+        """Complete a lease: store the page and enqueue its links.
+
+        Returns False when the lease had expired and another worker owns the URL.
+        """
+        key = url_key(url)
+        with self._transaction():
+            updated = self._db.execute(
+                'UPDATE urls SET state = ?, lease_expires = NULL WHERE key = ? AND state = ? AND owner = ?',
+                (DONE, key, LEASED, owner)
+            ).rowcount
+            if not updated:
+                return False
+            # Politeness: the host slot stays busy for host_delay after the response
+            self._db.execute('UPDATE slots SET busy_until = ? WHERE key = ?',
+                             (time.time() + self.host_delay, key))
+            if page:
+                self._db.execute('INSERT INTO pages (payload) VALUES (?)',
+                                 (zlib.compress(json.dumps(page).encode('utf-8')),))
+            for link in links:
+                self._insert(link, depth + 1, score, trap)
+            return True
+
+    def finished(self) -> bool:
+        """True when the page budget is spent or nothing is queued or leased."""
+        now = time.time()
+        with self._transaction():
+            if self.max_pages is not None and self._page_count() >= self.max_pages:
+                return True
+            queued = self._db.execute(
+                'SELECT COUNT(*) FROM urls WHERE state = ? OR (state = ? AND lease_expires < ?)',
+                (QUEUED, LEASED, now)
+            ).fetchone()[0]
+            return queued == 0 and self._active_leases(now) == 0
+
+    def pages(self) -> List[Dict]:
+        """Extracted pages in ack order (capped at max_pages)."""
+        rows = self._db.execute('SELECT payload FROM pages ORDER BY seq').fetchall()
+        pages = [json.loads(zlib.decompress(payload)) for (payload,) in rows]
+        return pages[:self.max_pages] if self.max_pages is not None else pages
+
+    def counts(self) -> Dict[str, int]:
+        rows = dict(self._db.execute('SELECT state, COUNT(*) FROM urls GROUP BY state').fetchall())
+        return {
+            'queued': rows.get(QUEUED, 0),
+            'leased': rows.get(LEASED, 0),
+            'done': rows.get(DONE, 0),
+            'trapped': rows.get(TRAPPED, 0),
+            'pages': self._page_count()
+        }
+
+    def report_stats(self, owner: str, stats: Dict):
+        """Record a worker's counters for the coordinator to sum."""
+        self._db.execute('INSERT OR REPLACE INTO worker_stats (owner, stats) VALUES (?, ?)',
+                         (owner, json.dumps(stats)))
+
+    def worker_stats(self) -> List[Dict]:
+        return [json.loads(stats) for (stats,) in self._db.execute('SELECT stats FROM worker_stats')]
+
+    def close(self):
+        self._db.close()
+
+
+class SharedRateLimiter(AdaptiveRateLimiter):
+    """AdaptiveRateLimiter whose host state lives in a shared frontier's database.
+
+    Every process using the frontier draws from the same token bucket per
+    host. Times are wall-clock, which all processes sharing the file agree on.
+    """
+
+    _clock = staticmethod(time.time)
+
+    def __init__(self, db_path: str, limiter: AdaptiveRateLimiter):
+        super().__init__(**limiter.settings())
+        self.db_path = db_path
+        self._db = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+        # Caps the local limiter already holds (Crawl-delay) bind every worker
+        for host, state in limiter._states().items():
+            if state.ceiling < self.max_rate:
+                self.set_ceiling(host, state.ceiling)
+
+    @contextmanager
+    def _state(self, host: str) -> Iterator[HostRate]:
+        with self._lock, _Transaction(self._db):
+            row = self._db.execute('SELECT state FROM rates WHERE host = ?', (host,)).fetchone()
+            state = HostRate(**json.loads(row[0])) if row else self._new_host()
+            yield state
+            self._db.execute('INSERT OR REPLACE INTO rates (host, state) VALUES (?, ?)',
+                             (host, json.dumps(asdict(state))))
+
+    def _states(self) -> Dict[str, HostRate]:
+        with self._lock:
+            rows = self._db.execute('SELECT host, state FROM rates').fetchall()
+        return {host: HostRate(**json.loads(state)) for host, state in rows}
+
+    def clone(self) -> 'SharedRateLimiter':
+        return SharedRateLimiter(self.db_path, self)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK, so leases are atomic across processes."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+
+    def __enter__(self):
+        self._db.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, tb):
+        self._db.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+def run_worker(frontier: SharedFrontier, crawler, owner: str, poll_interval: float = 0.05) -> int:
+    """Lease, fetch and ack until the shared crawl is finished; returns URLs processed.
+
+    crawler needs the workers' usual fetch_page(url, depth), allow(url) and fetcher;
+    its score_url(url, depth), if any, prioritizes the links it finds, and its
+    traps (a TrapDetector), if any, refuses trap URLs among them. While it
+    runs, the fetcher's rate limiter, if any, is swapped for a
+    SharedRateLimiter on the frontier. The worker's fetch stats ('fetch'),
+    URL rule hits ('url_rules') and trap counts ('traps') are left in the
+    frontier's worker_stats.
+    """
+    score = getattr(crawler, 'score_url', None)
+    prioritizer = getattr(crawler, 'prioritizer', None)
+    traps = getattr(crawler, 'traps', None)
+    trap = traps.check if traps is not None else None
+    fetcher = crawler.fetcher
+    limiter = fetcher.limiter
+    if limiter is not None:
+        fetcher.limiter = SharedRateLimiter(frontier.db_path, limiter)
+    processed = 0
+    try:
+        while True:
+            leased = frontier.lease(owner)
+            if leased is None:
+                if frontier.finished():
+                    break
+                time.sleep(poll_interval)  # Every ready host is at its politeness limit
+                continue
+
+            url, depth = leased
+            page, links = None, []
+            if crawler.allow(url):
+                try:
+                    page, links = crawler.fetch_page(url, depth)
+                except Exception as e:
+                    logger.error(f"Failed to crawl {url}: {e}")
+            frontier.ack(url, owner, page, links, depth, score, trap)
+            if prioritizer:
+                # Links the shared frontier refused (another worker saw them) were never scored
+                for link in links:
+                    prioritizer.forget(link)
+            processed += 1
+    finally:
+        if limiter is not None:
+            fetcher.limiter.close()
+            fetcher.limiter = limiter
+
+    stats = {'fetch': fetcher.stats.as_dict()}
+    url_rules = getattr(crawler, 'url_rules', None)
+    if url_rules:
+        stats['url_rules'] = url_rules.as_dict()
+    if traps is not None:
+        stats['traps'] = traps.as_dict()
+    frontier.report_stats(owner, stats)
+    logger.info(f"Worker {owner} done: {processed} URLs")
+    return processed
+
+
+def _worker_main(db_path: str, make_crawler: Callable[[], object], owner: str):
+    frontier = SharedFrontier(db_path)
+    try:
+        run_worker(frontier, make_crawler(), owner)
+    finally:
+        frontier.close()
+
+
+def crawl_distributed(db_path: str, seeds: Iterable[Tuple[str, int]], make_crawler: Callable[[], object],
+                      workers: int = 4, score: Optional[Score] = None,
+                      **settings) -> Tuple[List[Dict], List[Dict]]:
+    """Seed a new shared frontier, run `workers` forked crawl processes, return (pages, worker stats).
+
+    make_crawler runs inside each worker process, so every worker opens its
+    own connections and database handles. settings go to SharedFrontier.create.
+    """
+    frontier = SharedFrontier.create(db_path, **settings)
+    try:
+        frontier.push_all(seeds, score)
+
+        # fork: make_crawler may be a closure, which spawn could not pickle
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=_worker_main, args=(db_path, make_crawler, f"{os.getpid()}-{index}"))
+            for index in range(max(1, workers))
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failed = [process.exitcode for process in processes if process.exitcode]
+        if failed:
+            logger.warning(f"{len(failed)} crawl workers exited abnormally")
+        logger.info(f"Distributed crawl finished: {frontier.counts()}")
+        return frontier.pages(), frontier.worker_stats()
+    finally:
+        frontier.close()
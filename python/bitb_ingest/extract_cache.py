@@ -0,0 +1,156 @@
+"""
+Content-addressed extraction cache for uploaded files.
+
+Trial users upload the same PDFs and DOCX files again and again. The
+ExtractionCache keys a file's extracted segments by the SHA-256 of its
+bytes plus the extractor that produced them (documents.extractor_version:
+extractor kind, EXTRACTOR_VERSION, parser library version and options), so
+an unchanged file is never parsed twice, whatever its name or path, while
+an extractor or library upgrade misses and re-extracts.
+
+Segments are stored zlib-compressed as JSON lines in one SQLite file. On a
+miss they are compressed as they stream past to the chunker; the entry is
+written only once the whole document has been extracted. Entries are
+evicted least-recently-used first whenever the stored payloads exceed
+max_bytes.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator
+
+from .documents import Segment
+
+logger = logging.getLogger(__name__)
+
+_READ_BLOCK = 1 << 20
+
+
+@dataclass
+class ExtractionCacheStats:
+    """Counters for one ExtractionCache"""
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+    bytes_stored: int = 0  # Compressed payload bytes written
+    bytes_served: int = 0  # Compressed payload bytes read back on hits
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Persistent file-hash -> extracted segments store with size-bounded LRU eviction."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        path = Path(cache_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path / 'extractions.sqlite'
+        self.max_bytes = max_bytes
+        self.stats = ExtractionCacheStats()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS extractions ('
+            ' key TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL,'
+            ' last_used REAL NOT NULL,'
+            ' payload BLOB NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS extractions_lru ON extractions (last_used)')
+        self.stats.evicted += self._evict()  # max_bytes may have been lowered since the last run
+        self._db.commit()
+
+    @staticmethod
+    def key(path: str, extractor: str) -> str:
+        return f"{file_digest(path)}:{extractor}"
+
+    def segments(self, path: str, extractor: str, extract: Iterable[Segment]) -> Iterator[Segment]:
+        """The file's segments from the cache, else from `extract` (a lazy extractor), storing them."""
+        key = self.key(path, extractor)
+        with self._lock:
+            row = self._db.execute('SELECT payload FROM extractions WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self._db.execute('UPDATE extractions SET last_used = ? WHERE key = ?', (time.time(), key))
+                self._db.commit()
+        if row is not None:
+            self.stats.add(hits=1, bytes_served=len(row[0]))
+            logger.info(f"Extraction cache hit for {Path(path).name}")
+            yield from self._decode(row[0])
+            return
+
+        self.stats.add(misses=1)
+        compressor = zlib.compressobj(6)
+        parts = []
+        for segment in extract:
+            line = json.dumps([segment.page, segment.paragraph, segment.text]) + '\n'
+            parts.append(compressor.compress(line.encode('utf-8')))
+            yield segment
+        parts.append(compressor.flush())
+        self._store(key, b''.join(parts))
+
+    @staticmethod
+    def _decode(payload: bytes) -> Iterator[Segment]:
+        decompressor = zlib.decompressobj()
+        pending = b''
+        for start in range(0, len(payload), _READ_BLOCK):
+            pending += decompressor.decompress(payload[start:start + _READ_BLOCK])
+            *lines, pending = pending.split(b'\n')
+            for line in lines:
+                page, paragraph, text = json.loads(line)
+                yield Segment(text, page, paragraph)
+
+    def _store(self, key: str, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO extractions (key, size, last_used, payload) VALUES (?, ?, ?, ?)',
+                (key, len(payload), time.time(), payload)
+            )
+            evicted = self._evict()
+            self._db.commit()
+        self.stats.add(stored=1, bytes_stored=len(payload), evicted=evicted)
+
+    def _evict(self) -> int:
+        """Drop least-recently-used entries until the payloads fit max_bytes (caller holds the lock)."""
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM extractions').fetchone()[0]
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+        for key, size in self._db.execute('SELECT key, size FROM extractions ORDER BY last_used').fetchall():
+            self._db.execute('DELETE FROM extractions WHERE key = ?', (key,))
+            evicted += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+        return evicted
+
+    def close(self):
+        with self._lock:
+            self._db.close()
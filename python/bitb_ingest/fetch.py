@@ -0,0 +1,381 @@
+"""
+Pooled HTTP fetch layer shared by the crawlers and the robots.txt cache.
+
+One HttpFetcher owns a persistent requests.Session with:
+- keep-alive connection pools, capped per host
+- gzip/deflate (and brotli when the ``brotli`` package is installed)
+- an in-process DNS cache with a TTL
+- explicit (connect, read) timeouts
+- idempotent retries with exponential backoff, honouring a Retry-After of
+  up to MAX_RETRY_SLEEP seconds; a longer one is not retried but handed
+  back, for the AdaptiveRateLimiter to block the host
+
+FetchStats counts requests, bytes, new vs reused connections and time spent
+in connection setup (DNS + TCP + TLS), so pooling savings can be checked.
+
+fetch_html() streams page bodies: non-HTML is rejected from the
+Content-Type header or by sniffing the first bytes, and bodies over
+max_body_bytes are aborted, before the rest is downloaded. With an
+AdaptiveRateLimiter attached, fetch_html() waits for the host's token bucket
+and reports each response's latency and status back to it. With a
+WarcWriter attached, every response is also recorded for offline replay
+(see warc.py).
+"""
+
+import logging
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from .ratelimit import THROTTLE_STATUSES, AdaptiveRateLimiter, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'BitBBot/2.0 (+https://bitb.ltd)'  # Sent on page, robots.txt and sitemap fetches alike
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_SLEEP = 10.0  # Seconds a fetch thread may sleep on a Retry-After before retrying
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# Types that may carry HTML from misconfigured servers; decided by sniffing
+SNIFF_CONTENT_TYPES = ('', 'text/plain', 'application/octet-stream')
+BINARY_SIGNATURES = (
+    b'%PDF', b'PK\x03\x04', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'\x1f\x8b',
+    b'RIFF', b'ID3', b'OggS', b'Rar!', b'7z\xbc\xaf', b'BZh',
+)
+SNIFF_BYTES = 512
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+@dataclass
+class FetchConfig:
+    """Settings for an HttpFetcher"""
+    user_agent: str = USER_AGENT
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    max_hosts: int = 16  # Number of per-host pools kept alive
+    per_host_connections: int = 4  # Max open connections per host
+    max_retries: int = 3
+    backoff_factor: float = 0.5  # Sleeps 0.5s, 1s, 2s, ... between retries
+    dns_ttl: float = 300.0  # Seconds
+    max_body_bytes: int = 5 * 1024 * 1024  # Page bodies above this are aborted (0 = no limit)
+
+
+@dataclass
+class FetchStats:
+    """Counters for one HttpFetcher"""
+    requests: int = 0
+    retries: int = 0
+    bytes_wire: int = 0  # As received (possibly compressed)
+    bytes_decoded: int = 0  # After content decoding
+    connections_opened: int = 0
+    connections_reused: int = 0
+    handshake_seconds: float = 0.0  # DNS + TCP + TLS for new connections
+    dns_hits: int = 0
+    dns_misses: int = 0
+    rejected_content_type: int = 0  # Non-HTML by header or sniffing
+    rejected_too_large: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        """Thread-safe increment of one or more counters."""
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict:
+        stats = asdict(self)
+        stats['handshake_seconds'] = round(self.handshake_seconds, 3)
+        return stats
+
+
+@dataclass
+class HtmlResponse:
+    """Result of HttpFetcher.fetch_html(); html is None unless a 200 HTML page was read"""
+    url: str
+    status_code: int
+    headers: Mapping[str, str]
+    html: Optional[str] = None
+    rejected: Optional[str] = None  # 'content_type' or 'too_large'
+
+
+def looks_binary(head: bytes) -> bool:
+    """Sniff the first bytes of a body for binary content."""
+    head = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    return head.startswith(BINARY_SIGNATURES) or b'\x00' in head
+
+
+def _declared_charset(content_type: str, head: bytes) -> str:
+    """Charset from the Content-Type header, else <meta charset>, else UTF-8."""
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    match = _META_CHARSET_RE.search(head)
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+
+def decode_body(content_type: str, body: bytes) -> str:
+    """Decode an HTML body with its declared charset (UTF-8 if unknown)."""
+    charset = _declared_charset(content_type, bytes(body[:2048]))
+    try:
+        return body.decode(charset, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
+
+
+class DNSCache:
+    """Thread-safe getaddrinfo cache with a fixed TTL."""
+
+    def __init__(self, ttl: float, stats: FetchStats):
+        self.ttl = ttl
+        self.stats = stats
+        self._entries: Dict[Tuple[str, int], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> str:
+        """Return a cached address for host:port, resolving on miss/expiry."""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self.stats.add(dns_hits=1)
+                return entry[0]
+
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        with self._lock:
+            self._entries[key] = (address, now + self.ttl)
+        self.stats.add(dns_misses=1)
+        return address
+
+
+def _instrumented(connection_cls, dns: DNSCache, stats: FetchStats):
+    """Build a connection class that uses the DNS cache and records setup/reuse."""
+
+    class InstrumentedConnection(connection_cls):
+
+        _opened = False  # connect() ran for the request about to be sent
+
+        def _new_conn(self):
+            # Connect to the cached address; TLS SNI/verification still use self.host
+            hostname = self._dns_host
+            try:
+                self._dns_host = dns.resolve(hostname.rstrip('.'), self.port)
+            except OSError:
+                pass  # Let urllib3 resolve and raise its own error
+            try:
+                return super()._new_conn()
+            finally:
+                self._dns_host = hostname
+
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            self._opened = True
+            stats.add(connections_opened=1, handshake_seconds=time.perf_counter() - started)
+
+        def request(self, *args, **kwargs):
+            # An already-open socket skips the handshake, unless it was just opened for this
+            # request (HTTPS pools connect before request(); plain HTTP connects inside it)
+            if self.sock is not None and not self._opened:
+                stats.add(connections_reused=1)
+            try:
+                return super().request(*args, **kwargs)
+            finally:
+                self._opened = False
+
+    return InstrumentedConnection
+
+
+class _CappedRetry(Retry):
+    """Retry that gives up, returning the response, rather than sleep past MAX_RETRY_SLEEP on a Retry-After."""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > MAX_RETRY_SLEEP:
+                raise MaxRetryError(_pool, url, None)  # Returned as is, since raise_on_status is off
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use instrumented, DNS-cached connections."""
+
+    def __init__(self, dns: DNSCache, stats: FetchStats, **kwargs):
+        self._dns = dns
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        class HTTPPool(HTTPConnectionPool):
+            ConnectionCls = _instrumented(HTTPConnection, self._dns, self._stats)
+
+        class HTTPSPool(HTTPSConnectionPool):
+            ConnectionCls = _instrumented(HTTPSConnection, self._dns, self._stats)
+
+        self.poolmanager.pool_classes_by_scheme = {'http': HTTPPool, 'https': HTTPSPool}
+
+
+class HttpFetcher:
+    """Persistent, pooled HTTP client for crawl fetches."""
+
+    offline = False  # ReplayFetcher serves from an archive instead
+
+    def __init__(self, config: Optional[FetchConfig] = None,
+                 limiter: Optional[AdaptiveRateLimiter] = None, recorder=None):
+        self.config = config or FetchConfig()
+        self.limiter = limiter  # Paces fetch_html() per host when set
+        self.recorder = recorder  # warc.WarcWriter that archives every response
+        self.stats = FetchStats()
+        self.dns = DNSCache(self.config.dns_ttl, self.stats)
+
+        retry = _CappedRetry(
+            total=self.config.max_retries,
+            backoff_factor=self.config.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # Idempotent only
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = _PooledAdapter(
+            self.dns,
+            self.stats,
+            pool_connections=self.config.max_hosts,
+            pool_maxsize=self.config.per_host_connections,
+            pool_block=True,  # Wait for a free connection instead of opening more
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': self.config.user_agent,
+            'Accept-Encoding': ACCEPT_ENCODING  # Includes br when brotli is installed
+        })
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.config.connect_timeout, self.config.read_timeout)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET a URL through the shared pool; the body is read unless stream=True."""
+        response = self._send(url, **kwargs)
+        if self.recorder:
+            # Read now so it can be archived; iter_content() then replays it from memory
+            self.recorder.write_response(url, response.status_code, response.headers,
+                                         response.content, final_url=response.url)
+        return response
+
+    def _send(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        response = self.session.get(url, **kwargs)
+
+        retries = response.raw.retries
+        self.stats.add(
+            requests=1,
+            retries=len(retries.history) if retries else 0
+        )
+        if not kwargs.get('stream'):
+            self.stats.add(bytes_decoded=len(response.content), bytes_wire=response.raw.tell())
+        return response
+
+    def fetch_html(self, url: str, headers: Optional[dict] = None,
+                   max_bytes: Optional[int] = None) -> HtmlResponse:
+        """Stream a page, rejecting non-HTML and oversized bodies as early as possible."""
+        max_bytes = max_bytes or self.config.max_body_bytes
+        host = urlsplit(url).netloc
+        if self.limiter:
+            self.limiter.acquire(host)
+
+        started = time.monotonic()
+        response = self._send(url, headers=headers, stream=True)
+        if self.limiter:
+            retries = response.raw.retries
+            throttled = any(attempt.status in THROTTLE_STATUSES for attempt in (retries.history if retries else ()))
+            retry_after = None
+            if response.status_code in THROTTLE_STATUSES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.limiter.record(host, time.monotonic() - started, response.status_code, throttled, retry_after)
+
+        result = HtmlResponse(response.url, response.status_code, response.headers)
+        body = bytearray()
+
+        try:
+            if response.status_code != 200:
+                return result
+
+            content_type = response.headers.get('Content-Type', '')
+            media_type = content_type.split(';')[0].strip().lower()
+            if media_type not in HTML_CONTENT_TYPES and media_type not in SNIFF_CONTENT_TYPES:
+                result.rejected = 'content_type'
+                return result
+
+            declared = response.headers.get('Content-Length', '')
+            if max_bytes and declared.isdigit() and int(declared) > max_bytes:
+                result.rejected = 'too_large'
+                return result
+
+            for chunk in response.iter_content(64 * 1024):
+                if not body and media_type not in HTML_CONTENT_TYPES and looks_binary(chunk[:SNIFF_BYTES]):
+                    result.rejected = 'content_type'
+                    return result
+                body += chunk
+                if max_bytes and len(body) > max_bytes:
+                    result.rejected = 'too_large'
+                    return result
+
+            result.html = decode_body(content_type, bytes(body))
+            return result
+        finally:
+            if result.rejected == 'content_type':
+                self.stats.add(rejected_content_type=1)
+            elif result.rejected == 'too_large':
+                self.stats.add(rejected_too_large=1)
+            if self.recorder:
+                self.recorder.write_response(url, result.status_code, result.headers,
+                                             b'' if result.html is None else bytes(body),
+                                             final_url=result.url, rejected=result.rejected)
+            self.stats.add(bytes_wire=response.raw.tell(), bytes_decoded=len(body))
+            response.close()  # Drops the connection if the body was abandoned
+
+    def clone(self) -> 'HttpFetcher':
+        """Fetcher with the same settings, rate limiting and archive, for a forked crawl worker."""
+        return HttpFetcher(
+            self.config,
+            limiter=self.limiter.clone() if self.limiter else None,
+            recorder=self.recorder.reopen() if self.recorder else None
+        )
+
+    def close(self):
+        self.session.close()
+
+
+_default_fetcher: Optional[HttpFetcher] = None
+_default_lock = threading.Lock()
+
+
+def get_default_fetcher() -> HttpFetcher:
+    """Process-wide fetcher, so jobs in the same worker share one pool."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = HttpFetcher()
+        return _default_fetcher
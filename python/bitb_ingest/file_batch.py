@@ -0,0 +1,88 @@
+"""
+Parallel processing of uploaded files.
+
+expand_inputs() turns the file, directory and glob inputs of a files job
+into file paths lazily and in a deterministic order (directories are
+walked sorted, glob matches are sorted). plan_files() stats every file up
+front, so oversized or missing files are reported before any extraction
+starts. map_ordered() runs the per-file work on a bounded thread pool and
+hands back the results in input order, each file's exception isolated to
+that file: a slow file delays only its own slot, and a corrupt one only
+its own result.
+
+The pool is threads: extraction is pypdf/python-docx work whose heavy
+part, long PDFs, already fans out to processes in pdf_extract, and the
+rest (reading, hashing, extraction cache lookups) waits on I/O.
+"""
+
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+_GLOB_CHARS = set('*?[')
+
+
+def expand_inputs(inputs: Iterable[str]) -> Iterator[str]:
+    """Files named by inputs: plain paths as given, directories walked, globs matched (recursive **)."""
+    for entry in inputs:
+        if _GLOB_CHARS & set(entry):
+            for match in sorted(glob.iglob(entry, recursive=True)):
+                if os.path.isdir(match):
+                    yield from _walk(match)
+                else:
+                    yield match
+        elif os.path.isdir(entry):
+            yield from _walk(entry)
+        else:
+            yield entry
+
+
+def _walk(directory: str) -> Iterator[str]:
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(files):
+            if not name.startswith('.'):
+                yield os.path.join(root, name)
+
+
+def plan_files(paths: Iterable[str], max_bytes: Optional[int]) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """(files to process, [(file, reason skipped)]) after a stat of every file; duplicates dropped."""
+    accepted, skipped, seen = [], [], set()
+    for path in paths:
+        real = os.path.realpath(path)
+        if real in seen:
+            continue
+        seen.add(real)
+        try:
+            size = os.stat(path).st_size
+        except OSError as e:
+            skipped.append((path, e.strerror or str(e)))
+            continue
+        if max_bytes and size > max_bytes:
+            skipped.append((path, f"too large ({size / (1024 * 1024):.1f}MB)"))
+            continue
+        accepted.append(path)
+    return accepted, skipped
+
+
+def map_ordered(work: Callable[[str], T], paths: List[str],
+                workers: int) -> Iterator[Tuple[str, Optional[T], Optional[Exception]]]:
+    """(path, result, None) or (path, None, exception) for each path, in order, `workers` at a time."""
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            try:
+                yield path, work(path), None
+            except Exception as e:
+                yield path, None, e
+        return
+
+    with ThreadPoolExecutor(min(workers, len(paths)), thread_name_prefix='ingest-file') as executor:
+        futures = [executor.submit(work, path) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
@@ -0,0 +1,253 @@
+"""
+URL canonicalization and crawl frontier.
+
+- canonicalize(): scheme/host case, default ports, dot segments, escape
+  case, sorted query, tracking/session-parameter stripping, fragment removal
+- url_key(): canonical form with the trailing slash folded, for dedup
+- VisitedSet: seen-URL set stored as exact strings, 64-bit hashes or a
+  Bloom filter, so memory stays bounded on 100k-page crawls
+- Frontier: FIFO queue that dedups at enqueue time, so each URL is queued
+  at most once no matter how many pages link to it; URLs with binary file
+  extensions, and new URLs an optional TrapDetector flags, are refused
+  before any request is made
+"""
+
+import hashlib
+import math
+import posixpath
+import re
+import threading
+from array import array
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query parameters that only identify the click, never the content
+TRACKING_PARAMS = {
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'ref_src',
+}
+TRACKING_PREFIXES = ('utm_',)
+# Per-visit session ids: the same page under a new URL on every visit
+SESSION_PARAMS = {'jsessionid', 'phpsessid', 'aspsessionid', 'sessionid', 'session_id', 'cfid', 'cftoken',
+                  'zenid', 'oscsid'}
+_SESSION_PATH_RE = re.compile(r';(jsessionid|phpsessid|sessionid)=[^/?]*', re.IGNORECASE)
+
+# Never HTML: skipped at enqueue time instead of being downloaded
+BINARY_EXTENSIONS = {
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg', 'ico', 'bmp', 'tif', 'tiff', 'avif',
+    'mp3', 'mp4', 'm4a', 'avi', 'mov', 'wmv', 'webm', 'wav', 'ogg', 'flac', 'mkv',
+    'zip', 'tar', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar', 'exe', 'dmg', 'msi', 'iso', 'bin', 'apk',
+    'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'odt', 'ods', 'epub',
+    'css', 'js', 'mjs', 'map', 'woff', 'woff2', 'ttf', 'eot', 'otf', 'json',
+}
+
+_ESCAPE_RE = re.compile(r'%[0-9a-fA-F]{2}')
+
+
+def _normalize_path(path: str) -> str:
+    """Resolve dot segments and duplicate slashes, keeping a trailing slash."""
+    if not path:
+        return '/'
+    trailing = path.endswith('/')
+    path = posixpath.normpath('/' + path.lstrip('/'))
+    if path.startswith('//'):
+        path = path[1:]
+    if trailing and path != '/':
+        path += '/'
+    return _ESCAPE_RE.sub(lambda m: m.group(0).upper(), path)
+
+
+def _is_tracking(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name in SESSION_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Canonical absolute http(s) URL, or None for unsupported/invalid URLs."""
+    if base:
+        url = urljoin(base, url)
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return None  # mailto:, javascript:, tel:, ...
+    host = (parts.hostname or '').rstrip('.')
+    if not host:
+        return None
+    if ':' in host:
+        host = f"[{host}]"  # IPv6 literal
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    query = urlencode(sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    ))
+    path = _SESSION_PATH_RE.sub('', parts.path)  # ;jsessionid=... path parameters
+    return urlunsplit((scheme, netloc, _normalize_path(path), query, ''))
+
+
+def has_binary_extension(url: str) -> bool:
+    """True when the URL path ends in a known non-HTML file extension."""
+    last_segment = urlsplit(url).path.rsplit('/', 1)[-1]
+    _, dot, extension = last_segment.rpartition('.')
+    return bool(dot) and extension.lower() in BINARY_EXTENSIONS
+
+
+def url_key(url: str) -> str:
+    """Dedup key: canonical URL with a non-root trailing slash folded."""
+    canonical = canonicalize(url) or url
+    parts = urlsplit(canonical)
+    if parts.path != '/' and parts.path.endswith('/'):
+        canonical = urlunsplit(parts._replace(path=parts.path.rstrip('/')))
+    return canonical
+
+
+class VisitedSet:
+    """Thread-safe set of seen URL keys.
+
+    Modes:
+        exact  - Python set of strings (default behaviour before this module)
+        hashed - set of 64-bit digests; exact for practical purposes, ~3x smaller
+        bloom  - fixed-size Bloom filter sized for `capacity` at `error_rate`;
+                 memory never grows, false positives skip a few unseen URLs
+    """
+
+    MODES = ('exact', 'hashed', 'bloom')
+
+    def __init__(self, mode: str = 'hashed', capacity: int = 100000, error_rate: float = 0.001):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid visited mode: {mode}")
+        self.mode = mode
+        self._count = 0
+        self._lock = threading.Lock()
+
+        if mode == 'bloom':
+            capacity = max(1, capacity)
+            self._bits_total = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            self._hash_count = max(1, round(self._bits_total / capacity * math.log(2)))
+            self._bits = bytearray((self._bits_total + 7) // 8)
+        else:
+            self._items = set()
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self._bits_total for i in range(self._hash_count)]
+
+    def _item(self, key: str):
+        if self.mode == 'hashed':
+            return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+        return key
+
+    def add(self, url: str) -> bool:
+        """Mark url as seen; returns False if it was already seen."""
+        key = url_key(url)
+        with self._lock:
+            if self.mode == 'bloom':
+                positions = self._positions(key)
+                if all(self._bits[p >> 3] & (1 << (p & 7)) for p in positions):
+                    return False
+                for p in positions:
+                    self._bits[p >> 3] |= 1 << (p & 7)
+            else:
+                item = self._item(key)
+                if item in self._items:
+                    return False
+                self._items.add(item)
+            self._count += 1
+            return True
+
+    def __contains__(self, url: str) -> bool:
+        key = url_key(url)
+        with self._lock:
+            if self.mode == 'bloom':
+                return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+            return self._item(key) in self._items
+
+    def __len__(self) -> int:
+        return self._count
+
+    def dump(self) -> Dict:
+        """Compact snapshot of the set (raw bytes in 'data') for checkpointing."""
+        with self._lock:
+            if self.mode == 'bloom':
+                data = bytes(self._bits)
+            elif self.mode == 'hashed':
+                data = array('Q', self._items).tobytes()
+            else:
+                data = '\n'.join(self._items).encode('utf-8')
+            return {'mode': self.mode, 'count': self._count, 'data': data}
+
+    def load(self, state: Dict):
+        """Replace the contents with a dump() of a set in the same mode."""
+        if state['mode'] != self.mode:
+            raise ValueError(f"Cannot load a {state['mode']} visited set into {self.mode}")
+        with self._lock:
+            if self.mode == 'bloom':
+                if len(state['data']) != len(self._bits):
+                    raise ValueError("Bloom filter size mismatch")
+                self._bits = bytearray(state['data'])
+            elif self.mode == 'hashed':
+                self._items = set(array('Q', state['data']))
+            else:
+                self._items = set(state['data'].decode('utf-8').split('\n')) if state['data'] else set()
+            self._count = state['count']
+
+
+class Frontier:
+    """FIFO crawl queue with canonicalization and dedup at enqueue time."""
+
+    def __init__(self, seen: Optional[VisitedSet] = None, traps=None):
+        self.seen = seen if seen is not None else VisitedSet()
+        self.traps = traps  # TrapDetector (or None): refuses URLs from endless URL spaces
+        self.rejected = Counter()  # URLs refused at enqueue time, by reason
+        self._queue = deque()  # (url, depth)
+
+    def _accept(self, url: str) -> Optional[str]:
+        """Canonical form of url if it is crawlable and was never seen, else None."""
+        canonical = canonicalize(url)
+        if canonical is None:
+            return None
+        if has_binary_extension(canonical):
+            self.rejected['binary_extension'] += 1
+            return None
+        if not self.seen.add(canonical):
+            return None
+        # After the seen check, so each URL is judged once; a trapped URL stays seen
+        if self.traps is not None:
+            reason = self.traps.check(canonical)
+            if reason:
+                self.rejected[reason] += 1
+                return None
+        return canonical
+
+    def push(self, url: str, depth: int) -> bool:
+        """Canonicalize and enqueue url unless it was seen before or is not crawlable."""
+        canonical = self._accept(url)
+        if canonical is None:
+            return False
+        self._queue.append((canonical, depth))
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        return self._queue.popleft()
+
+    def requeue(self, url: str, depth: int):
+        """Enqueue an already-seen canonical URL (restoring a checkpoint)."""
+        self._queue.append((url, depth))
+
+    def pending(self) -> List[Tuple[str, int]]:
+        """Queued (url, depth) pairs in pop order."""
+        return list(self._queue)
+
+    def __len__(self) -> int:
+        return len(self._queue)
@@ -0,0 +1,248 @@
+"""
+Single-pass HTML extraction.
+
+parse_html() parses a page once and returns its title, cleaned text,
+outlinks (with anchor text) and <link rel=canonical> together, instead of re-parsing the same
+HTML for each. The parser backend is picked at runtime:
+
+    lxml         - libxml2 C parser (used when lxml is installed)
+    html.parser  - BeautifulSoup with the pure-Python parser (fallback)
+
+Set HTML_PARSER=lxml|html.parser to force one.
+
+Text modes reproduce the workers' existing extraction:
+    main - drop script/style/nav/footer/header, keep <main>/<article>/
+           div.content/<body>, one text node per line (ingest_worker.py)
+    full - drop script/style/nav/footer, whole-document text joined with
+           single spaces (ingest-worker.py TextExtractor.from_html)
+
+and a boilerplate-removing mode:
+    density - readability-style text/link density extraction (content.py),
+              one block per line; removed_chars says how much page text
+              (menus, sidebars, cookie banners, footers) it dropped
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString, Tag
+
+from . import content
+from .frontier import canonicalize
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('lxml', 'html.parser')
+TEXT_MODES = ('main', 'full', 'density')
+MAX_ANCHOR_CHARS = 100
+
+# Bump when a change alters the text or links parse_html returns (invalidates crawl caches)
+PARSER_VERSION = 1
+
+_DROP_TAGS = {
+    'main': ('script', 'style', 'nav', 'footer', 'header'),
+    'full': ('script', 'style', 'nav', 'footer'),
+    'density': ('script', 'style'),  # Everything else is weighed by content.extract
+}
+
+
+@dataclass
+class ParsedHTML:
+    """Everything the crawlers need from one page"""
+    title: Optional[str] = None
+    text: str = ''
+    links: List[str] = field(default_factory=list)  # Canonical absolute URLs, document order
+    canonical: Optional[str] = None
+    anchors: Dict[str, str] = field(default_factory=dict)  # Link -> first non-empty anchor text
+    removed_chars: int = 0  # Boilerplate text dropped (density mode)
+
+
+def default_backend() -> str:
+    """Backend from HTML_PARSER, else the fastest one installed."""
+    requested = os.getenv('HTML_PARSER', 'auto')
+    if requested in BACKENDS:
+        if requested == 'lxml' and not HAS_LXML:
+            logger.warning("HTML_PARSER=lxml but lxml is not installed; using html.parser")
+            return 'html.parser'
+        return requested
+    return 'lxml' if HAS_LXML else 'html.parser'
+
+
+BACKEND = default_backend()
+
+
+def _clean_lines(text: str) -> str:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return '\n'.join(lines)
+
+
+def _join_phrases(text: str) -> str:
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def _resolve_links(anchors, base_url: str) -> Tuple[List[str], Dict[str, str]]:
+    """Canonical links in document order, and the first non-empty anchor text of each."""
+    links = {}
+    for href, text in anchors:
+        link = canonicalize(href, base_url) if base_url else None
+        if link:
+            text = ' '.join(text.split())[:MAX_ANCHOR_CHARS]
+            if not links.get(link):
+                links[link] = text
+    return list(links), {link: text for link, text in links.items() if text}
+
+
+def _hint(class_value, id_value) -> str:
+    if isinstance(class_value, list):
+        class_value = ' '.join(class_value)
+    return f"{class_value or ''} {id_value or ''}".strip()
+
+
+def _block_tree_bs4(root: Tag) -> Tuple[content.Node, List[content.Node]]:
+    top = content.Node(root.name, _hint(root.get('class'), root.get('id')))
+    nodes, stack = [top], [(root, top)]
+    while stack:
+        tag, node = stack.pop()
+        for child in tag.children:
+            if isinstance(child, Tag):
+                name = child.name.lower()
+                if name not in content.SKIP_TAGS and not content.is_hidden(child.attrs):
+                    child_node = node.add(name, _hint(child.get('class'), child.get('id')))
+                    nodes.append(child_node)
+                    stack.append((child, child_node))
+            elif isinstance(child, NavigableString) and not isinstance(child, PreformattedString):
+                node.items.append(str(child))
+    return top, nodes
+
+
+def _block_tree_lxml(root) -> Tuple[content.Node, List[content.Node]]:
+    top = content.Node(root.tag, _hint(root.get('class'), root.get('id')))
+    nodes, stack = [top], [(root, top)]
+    while stack:
+        element, node = stack.pop()
+        if element.text:
+            node.items.append(element.text)
+        for child in element:
+            name = child.tag.lower() if isinstance(child.tag, str) else None
+            if name and name not in content.SKIP_TAGS and not content.is_hidden(child.attrib):
+                child_node = node.add(name, _hint(child.get('class'), child.get('id')))
+                nodes.append(child_node)
+                stack.append((child, child_node))
+            if child.tail:
+                node.items.append(child.tail)
+    return top, nodes
+
+
+def _parse_bs4(html: str, base_url: str, text_mode: str) -> ParsedHTML:
+    soup = BeautifulSoup(html, 'html.parser')
+
+    title_tag = soup.find('title')
+    canonical_tag = soup.find('link', rel='canonical', href=True)
+    links, anchors = _resolve_links(
+        ((a['href'], a.get_text(' ')) for a in soup.find_all('a', href=True)), base_url
+    )
+    parsed = ParsedHTML(
+        title=title_tag.get_text().strip() if title_tag else None,
+        links=links,
+        canonical=canonicalize(canonical_tag['href'], base_url) if canonical_tag and base_url else None,
+        anchors=anchors
+    )
+
+    for element in soup(list(_DROP_TAGS[text_mode])):
+        element.decompose()
+
+    if text_mode == 'density':
+        parsed.text, parsed.removed_chars = content.extract(*_block_tree_bs4(soup.find('body') or soup))
+    elif text_mode == 'main':
+        main_content = (
+            soup.find('main') or
+            soup.find('article') or
+            soup.find('div', class_='content') or
+            soup.find('body')
+        )
+        parsed.text = _clean_lines((main_content or soup).get_text(separator='\n', strip=True))
+    else:
+        parsed.text = _join_phrases(soup.get_text())
+    return parsed
+
+
+def _parse_lxml(html: str, base_url: str, text_mode: str) -> ParsedHTML:
+    # Bytes + explicit encoding sidesteps lxml's "encoding declaration" error on str input
+    parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+    try:
+        root = lxml.html.document_fromstring(html.encode('utf-8', 'replace'), parser=parser)
+    except (etree.ParserError, ValueError):
+        return ParsedHTML()
+
+    title_tag = root.find('.//title')
+    canonical = None
+    for link_tag in root.iter('link'):
+        href = link_tag.get('href')
+        if href and 'canonical' in (link_tag.get('rel') or '').lower().split():
+            canonical = canonicalize(href, base_url) if base_url else None
+            break
+
+    links, anchors = _resolve_links(
+        ((a.get('href'), a.text_content()) for a in root.iter('a') if a.get('href')), base_url
+    )
+    parsed = ParsedHTML(
+        title=title_tag.text_content().strip() if title_tag is not None else None,
+        links=links,
+        canonical=canonical,
+        anchors=anchors
+    )
+
+    etree.strip_elements(root, *_DROP_TAGS[text_mode], with_tail=False)
+
+    if text_mode == 'density':
+        body = root.find('.//body')
+        parsed.text, parsed.removed_chars = content.extract(*_block_tree_lxml(root if body is None else body))
+    elif text_mode == 'main':
+        main_content = root.find('.//main')
+        if main_content is None:
+            main_content = root.find('.//article')
+        if main_content is None:
+            matches = root.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " content ")]')
+            main_content = matches[0] if matches else None
+        if main_content is None:
+            main_content = root.find('.//body')
+        if main_content is None:
+            main_content = root
+        parsed.text = _clean_lines('\n'.join(s.strip() for s in main_content.itertext() if s.strip()))
+    else:
+        parsed.text = _join_phrases(''.join(root.itertext()))
+    return parsed
+
+
+def extractor_version(text_mode: str, backend: Optional[str] = None) -> str:
+    """What produced a page's text and links: PARSER_VERSION, backend and text mode."""
+    backend = backend or BACKEND
+    if backend == 'lxml' and not HAS_LXML:
+        backend = 'html.parser'
+    return f"html/{PARSER_VERSION}/{backend};text_mode={text_mode}"
+
+
+def parse_html(html: str, base_url: str = '', text_mode: str = 'main',
+               backend: Optional[str] = None) -> ParsedHTML:
+    """Parse a page once and return title, text, links and canonical URL.
+
+    Links and the canonical URL are only resolved when base_url is given.
+    """
+    if text_mode not in TEXT_MODES:
+        raise ValueError(f"Invalid text mode: {text_mode}")
+    backend = backend or BACKEND
+    if backend == 'lxml' and HAS_LXML:
+        return _parse_lxml(html, base_url, text_mode)
+    return _parse_bs4(html, base_url, text_mode)
@@ -0,0 +1,86 @@
+"""
+Process pool for crawl-time HTML parsing.
+
+Parsing (lxml or BeautifulSoup) is CPU-bound and holds the GIL, so with
+AsyncCrawlEngine's fetch threads all parsing in one process, throughput
+stops at one core however many fetches are in flight. ParsePool moves
+parse_html() into worker processes: a fetch thread hands over the raw HTML
+and blocks (GIL released) until the compact ParsedHTML - title, text,
+links, anchors, canonical - comes back, so parsing runs on as many cores
+as there are pool workers while the other threads keep fetching.
+
+The pool is forked when it is created, before the crawl's fetch threads
+start. If it breaks (a worker killed by the OOM killer, say), pages are
+parsed in-process for the rest of the crawl.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+from typing import Dict
+
+from .html_parse import ParsedHTML, parse_html
+
+logger = logging.getLogger(__name__)
+
+
+def _warm():
+    return True
+
+
+@dataclass
+class ParsePoolStats:
+    """Pages parsed by a ParsePool"""
+    workers: int = 0
+    pages: int = 0
+    html_bytes: int = 0  # Raw HTML shipped to the workers
+    fallbacks: int = 0  # Parsed in-process after the pool broke
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        """Thread-safe increment of one or more counters."""
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+class ParsePool:
+    """parse_html() in worker processes; call parse() from any thread."""
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.stats = ParsePoolStats(workers=self.workers)
+        # fork: workers inherit the loaded parser modules; done now, while the crawl is single-threaded
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+        self._executor.submit(_warm).result()
+        self._broken = False
+        logger.info(f"Parsing HTML in {self.workers} worker processes")
+
+    def parse(self, html: str, base_url: str = '', text_mode: str = 'main') -> ParsedHTML:
+        if not self._broken:
+            try:
+                parsed = self._executor.submit(parse_html, html, base_url, text_mode).result()
+                self.stats.add(pages=1, html_bytes=len(html))
+                return parsed
+            except BrokenProcessPool:
+                logger.error("HTML parse pool broke; parsing in-process from now on")
+                self._broken = True
+        self.stats.add(pages=1, fallbacks=1)
+        return parse_html(html, base_url, text_mode=text_mode)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,142 @@
+"""
+Page-parallel PDF text extraction.
+
+pypdf's extract_text() is pure Python and CPU-bound, so a long PDF keeps
+one core busy for seconds to minutes. extract_pdf_pages() splits the page
+list into contiguous ranges and extracts them in worker processes, each
+opening the file itself (no page objects cross process boundaries), then
+puts the pages back in document order. iter_pdf_pages() yields the pages
+as they are ready, keeping at most two ranges per worker in flight, so a
+long document is never held in memory whole.
+
+Small documents, and workers=1, are extracted in-process: every worker
+re-reads the PDF's cross-reference table, which costs more than it saves
+on a few pages. A page that fails to extract is logged and left empty
+rather than failing the whole document.
+
+A files job creates one pool with start_pool() and passes it to every
+iter_pdf_pages() call. The pool is forked and warmed when it is created,
+before file_batch starts its threads: a process forked while other threads
+run can inherit a lock one of them holds and deadlock. Without a pool,
+iter_pdf_pages() forks its own and must then be called single-threaded.
+"""
+
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:
+        PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+MIN_RANGE_PAGES = 8  # Smallest page range handed to a worker
+RANGES_PER_WORKER = 4  # Several ranges per worker even out slow (scanned, table-heavy) pages
+
+
+def _open(path: str):
+    if PdfReader is None:
+        raise ImportError("pypdf not installed")
+    return PdfReader(path)
+
+
+def _extract_range(path: str, start: int, stop: int, reader=None) -> List[str]:
+    """Text of pages start..stop-1 (opens the file unless given a reader)."""
+    reader = reader or _open(path)
+    texts = []
+    for number in range(start, stop):
+        try:
+            texts.append(reader.pages[number].extract_text() or '')
+        except Exception as e:
+            logger.warning(f"{os.path.basename(path)}: page {number + 1} not extracted: {e}")
+            texts.append('')
+    return texts
+
+
+def page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Contiguous (start, stop) ranges covering page_count pages, in order."""
+    size = max(MIN_RANGE_PAGES, -(-page_count // (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def resolve_workers(workers: int) -> int:
+    """0 means one per CPU."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _warm():
+    return True
+
+
+def start_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """Forked, warmed pool of `workers` processes (0 = one per CPU) to share across documents; None for 1."""
+    workers = resolve_workers(workers)
+    if workers <= 1:
+        return None
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    executor.submit(_warm).result()  # A fork pool starts all its processes on the first submit
+    return executor
+
+
+def iter_pdf_pages(path: str, workers: int = 0, max_pages: Optional[int] = None,
+                   pool: Optional[ProcessPoolExecutor] = None) -> Iterator[Tuple[int, str]]:
+    """(1-based page number, text) for each page up to max_pages, in order, from up to `workers` processes.
+
+    With a pool (see start_pool), workers is its size and no processes are started.
+    """
+    reader = _open(path)
+    page_count = len(reader.pages)
+    if max_pages and page_count > max_pages:
+        logger.warning(f"{os.path.basename(path)}: extracting the first {max_pages} of {page_count} pages")
+        page_count = max_pages
+
+    workers = min(resolve_workers(workers), -(-page_count // MIN_RANGE_PAGES))
+    if workers <= 1:
+        for number in range(page_count):
+            yield number + 1, _extract_range(path, number, number + 1, reader)[0]
+        return
+
+    ranges = page_ranges(page_count, workers)
+    logger.info(f"{os.path.basename(path)}: extracting {page_count} pages in {len(ranges)} ranges "
+                f"on {workers} processes")
+    if pool is not None:
+        yield from _extract_ranges(pool, path, ranges, workers)
+        return
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as executor:
+        yield from _extract_ranges(executor, path, ranges, workers)
+
+
+def _extract_ranges(executor: ProcessPoolExecutor, path: str, ranges: List[Tuple[int, int]],
+                    workers: int) -> Iterator[Tuple[int, str]]:
+    """Pages of each range in order, keeping at most two ranges per worker in flight."""
+    pending = deque()
+    try:
+        for start, stop in ranges:
+            pending.append((start, executor.submit(_extract_range, path, start, stop)))
+            if len(pending) >= 2 * workers:
+                yield from _drain(pending.popleft())
+        while pending:
+            yield from _drain(pending.popleft())
+    finally:
+        for _, future in pending:  # Abandoned early (an error, or the caller stopped reading)
+            future.cancel()
+
+
+def _drain(item) -> Iterator[Tuple[int, str]]:
+    start, future = item
+    for offset, text in enumerate(future.result()):
+        yield start + offset + 1, text
+
+
+def extract_pdf_pages(path: str, workers: int = 0, max_pages: Optional[int] = None,
+                      pool: Optional[ProcessPoolExecutor] = None) -> List[str]:
+    """Text of each page (up to max_pages), extracted by up to `workers` processes (0 = one per CPU)."""
+    return [text for _, text in iter_pdf_pages(path, workers, max_pages, pool)]
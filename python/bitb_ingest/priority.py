@@ -0,0 +1,200 @@
+"""
+Best-first crawl ordering.
+
+UrlScorer rates a URL's expected content value from cheap signals that
+are known before it is fetched:
+
+- depth from the start URL (shallower first; sitemap URLs count as depth 1)
+- path heuristics: tag/category/author/date archives, pagination, search,
+  account and legal pages score low; docs/FAQ/guides/product pages high
+- anchor text of the link(s) pointing at it
+- <priority> from the sitemap
+- content density of the page that linked to it (text vs. links)
+
+PriorityFrontier is a Frontier that pops the highest-scoring URL first
+(FIFO among equal scores), so a small max_pages budget is spent on the
+pages most worth embedding. CrawlPrioritizer holds one crawl's scoring
+state (link hints from fetched pages, sitemap priorities).
+"""
+
+import heapq
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from .frontier import Frontier, VisitedSet, url_key
+
+# Listing, navigation and utility pages: little unique content
+LOW_VALUE_PATH = re.compile(
+    r'/(tags?|categor(y|ies)|authors?|archives?|page/\d+|search|login|log-in|signin|sign-in|'
+    r'signup|sign-up|register|account|my-account|cart|basket|checkout|wishlist|compare|'
+    r'feed|rss|atom|print|share|wp-json|wp-admin|calendar|events?/\d{4})(/|$)'
+    r'|/\d{4}/\d{1,2}(/\d{1,2})?/?$',  # Date archives like /2023/05/
+    re.IGNORECASE
+)
+LEGAL_PATH = re.compile(
+    r'(privacy|terms|cookie|legal|disclaimer|gdpr|imprint|impressum|copyright|accessibility-statement)',
+    re.IGNORECASE
+)
+HIGH_VALUE_PATH = re.compile(
+    r'/(docs?|documentation|guides?|faqs?|help|support|kb|knowledge(-base)?|tutorials?|learn|'
+    r'how-to|howto|manual|pricing|plans|products?|features?|services?|solutions?|about(-us)?|'
+    r'api|reference|getting-started|blog/[^/]+)(/|$)',
+    re.IGNORECASE
+)
+PAGINATION_PARAMS = {'page', 'p', 'pg', 'offset', 'start', 'sort', 'order', 'orderby', 'filter',
+                     'replytocom', 'share', 'view', 'lang'}
+WEAK_ANCHORS = {'', 'read more', 'more', 'click here', 'here', 'next', 'previous', 'prev',
+                'older', 'newer', 'older posts', 'newer posts', 'continue reading', 'learn more',
+                'see more', 'view all', 'show more', 'first', 'last', '»', '«', '›', '‹'}
+
+
+class UrlScorer:
+    """Heuristic value score for an unfetched URL (higher = fetch sooner)."""
+
+    DEPTH_WEIGHT = 1.0
+    LOW_VALUE_PENALTY = 2.0
+    LEGAL_PENALTY = 1.5
+    HIGH_VALUE_BONUS = 1.0
+    PAGINATION_PENALTY = 1.0
+    QUERY_PENALTY = 0.3
+    DEEP_PATH_PENALTY = 0.2  # Per path segment beyond DEEP_PATH_SEGMENTS
+    DEEP_PATH_SEGMENTS = 4
+    ANCHOR_WEIGHT = 0.5
+    SITEMAP_WEIGHT = 2.0
+    SITEMAP_DEPTH = 1  # Sitemap URLs score as links from the start page, whatever depth they are queued at
+    DENSITY_WEIGHT = 1.0
+
+    def path_score(self, url: str) -> float:
+        parts = urlsplit(url)
+        path = parts.path
+        score = 0.0
+        if LOW_VALUE_PATH.search(path):
+            score -= self.LOW_VALUE_PENALTY
+        elif HIGH_VALUE_PATH.search(path):
+            score += self.HIGH_VALUE_BONUS
+        if LEGAL_PATH.search(path):
+            score -= self.LEGAL_PENALTY
+
+        if parts.query:
+            names = {name.lower() for name, _ in parse_qsl(parts.query, keep_blank_values=True)}
+            score -= self.PAGINATION_PENALTY if names & PAGINATION_PARAMS else self.QUERY_PENALTY
+
+        segments = [segment for segment in path.split('/') if segment]
+        score -= self.DEEP_PATH_PENALTY * max(0, len(segments) - self.DEEP_PATH_SEGMENTS)
+        return score
+
+    def anchor_score(self, text: str) -> float:
+        """-1..+1: generic or numeric anchors are weak, descriptive ones strong."""
+        text = text.strip().lower()
+        if text in WEAK_ANCHORS or text.isdigit():
+            return -1.0
+        words = len(text.split())
+        score = 0.5 if 2 <= words <= 12 else 0.0
+        if LEGAL_PATH.search(text):
+            score -= 1.0
+        elif HIGH_VALUE_PATH.search('/' + text.replace(' ', '-')):
+            score += 0.5
+        return score
+
+    @staticmethod
+    def content_density(text: str, link_count: int) -> float:
+        """0..1 share of a page that is prose rather than links."""
+        words = len(text.split())
+        return words / (words + 20 * link_count) if words else 0.0
+
+    def link_hint(self, anchor: str, parent_density: float) -> float:
+        """Score contribution known when a link is discovered on a parent page."""
+        return (self.ANCHOR_WEIGHT * self.anchor_score(anchor)
+                + self.DENSITY_WEIGHT * (parent_density - 0.5))
+
+    def score(self, url: str, depth: int, hint: float = 0.0,
+              sitemap_priority: Optional[float] = None) -> float:
+        if sitemap_priority is not None:
+            depth = min(depth, self.SITEMAP_DEPTH)
+        score = -self.DEPTH_WEIGHT * depth + self.path_score(url) + hint
+        if sitemap_priority is not None:
+            score += self.SITEMAP_WEIGHT * (sitemap_priority - 0.5)
+        return score
+
+
+class PriorityFrontier(Frontier):
+    """Best-first crawl queue: highest score pops first, FIFO among ties."""
+
+    def __init__(self, seen: Optional[VisitedSet] = None,
+                 score: Optional[Callable[[str, int], float]] = None, traps=None,
+                 forget: Optional[Callable[[str], None]] = None):
+        super().__init__(seen, traps)
+        self.score = score or (lambda url, depth: -depth)  # Default: breadth-first
+        self.forget = forget  # Called with each refused URL, to drop state kept for scoring it
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._sequence = 0
+
+    def _enqueue(self, url: str, depth: int):
+        self._sequence += 1
+        heapq.heappush(self._heap, (-self.score(url, depth), self._sequence, url, depth))
+
+    def push(self, url: str, depth: int) -> bool:
+        canonical = self._accept(url)
+        if canonical is None:
+            if self.forget:
+                self.forget(url)
+            return False
+        self._enqueue(canonical, depth)
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        _, _, url, depth = heapq.heappop(self._heap)
+        return url, depth
+
+    def requeue(self, url: str, depth: int):
+        self._enqueue(url, depth)
+
+    def pending(self) -> List[Tuple[str, int]]:
+        return [(url, depth) for _, _, url, depth in sorted(self._heap)]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class CrawlPrioritizer:
+    """Scoring state for one crawl: hints from fetched pages and sitemap priorities.
+
+    Thread-safe: fetch threads note links while the scheduler scores and forgets them.
+    """
+
+    def __init__(self, scorer: Optional[UrlScorer] = None):
+        self.scorer = scorer or UrlScorer()
+        self._hints: Dict[str, float] = {}  # Link about to be pushed -> best hint from its parents
+        self._hints_lock = threading.Lock()
+        self._sitemap: Dict[str, float] = {}
+
+    def note_sitemap(self, url: str, priority: Optional[float]):
+        """Record a sitemap URL; without a <priority> it gets the protocol's default, 0.5."""
+        self._sitemap[url_key(url)] = 0.5 if priority is None else priority
+
+    def note_links(self, text: str, links: List[str], anchors: Dict[str, str], seen: VisitedSet):
+        """Record anchor text and parent density for a fetched page's new outlinks."""
+        density = self.scorer.content_density(text, len(links))
+        for link in links:
+            if link in seen:
+                continue  # Already queued or fetched; its score is fixed
+            hint = self.scorer.link_hint(anchors.get(link, ''), density)
+            with self._hints_lock:
+                if hint > self._hints.get(link, float('-inf')):
+                    self._hints[link] = hint
+
+    def score(self, url: str, depth: int) -> float:
+        """Score a canonical URL as it is enqueued (consumes its hint)."""
+        with self._hints_lock:
+            hint = self._hints.pop(url, 0.0)
+        return self.scorer.score(url, depth, hint, self._sitemap.get(url_key(url)))
+
+    def forget(self, url: str):
+        """Drop the hint of a link the frontier refused (seen, binary, trap), which is never scored."""
+        with self._hints_lock:
+            self._hints.pop(url, None)
+
+    def frontier(self, seen: VisitedSet, traps=None) -> PriorityFrontier:
+        return PriorityFrontier(seen, self.score, traps, self.forget)
@@ -0,0 +1,192 @@
+"""
+Adaptive per-host request rate limiting.
+
+AdaptiveRateLimiter keeps a token bucket per host and adjusts its refill
+rate from response feedback (AIMD):
+
+- additive increase while response latency stays near the host's baseline
+- multiplicative decrease when latency climbs well above the baseline, on
+  5xx, and on 429/503 (including ones urllib3 retried internally)
+- Retry-After on a 429/503 blocks the host until that time
+
+A host's rate can be capped (robots.txt Crawl-delay). Current rate, latency
+and throttle counters per host are reported by as_dict() for the job summary.
+
+Host state is read and written through _state(), so a subclass can keep it
+somewhere other processes see it (distributed.SharedRateLimiter).
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+MAX_RETRY_AFTER = 300.0  # Seconds; longer Retry-After values are clamped
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header (delta-seconds or HTTP-date) as seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+@dataclass
+class HostRate:
+    """Token bucket and feedback state for one host"""
+    rate: float  # Requests per second
+    ceiling: float
+    tokens: float = 1.0
+    updated: float = 0.0  # Limiter clock time of the last refill
+    blocked_until: float = 0.0  # Limiter clock time; set by Retry-After
+    latency: Optional[float] = None  # EWMA of time to response headers
+    baseline: Optional[float] = None  # Slowly drifting minimum latency
+    last_decrease: float = 0.0
+    requests: int = 0
+    decreases: int = 0
+    throttled: int = 0  # 429/503 responses seen
+    waited_seconds: float = 0.0
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe per-host token buckets with latency/status-driven rates."""
+
+    _clock = staticmethod(time.monotonic)
+
+    def __init__(self, initial_rate: float = 2.0, min_rate: float = 0.2, max_rate: float = 10.0,
+                 burst: float = 1.0, increase: float = 0.5, decrease: float = 0.5,
+                 latency_decrease: float = 0.8, latency_factor: float = 2.0, min_latency: float = 0.05):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst  # Requests that may go out back to back after an idle spell
+        self.increase = increase  # req/s added per healthy response
+        self.decrease = decrease  # Rate multiplier on 429/503/5xx
+        self.latency_decrease = latency_decrease  # Gentler multiplier for rising latency
+        self.latency_factor = latency_factor  # Back off when latency exceeds baseline x this
+        self.min_latency = min_latency  # Latency below this never counts as "rising"
+        self._hosts: Dict[str, HostRate] = {}
+        self._lock = threading.Lock()
+
+    def _new_host(self) -> HostRate:
+        return HostRate(rate=min(self.initial_rate, self.max_rate), ceiling=self.max_rate,
+                        tokens=self.burst, updated=self._clock())
+
+    @contextmanager
+    def _state(self, host: str) -> Iterator[HostRate]:
+        """Exclusive access to a host's state, created on first use."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = self._new_host()
+            yield state
+
+    def _states(self) -> Dict[str, HostRate]:
+        """Snapshot of every host's state."""
+        with self._lock:
+            return {host: replace(state) for host, state in self._hosts.items()}
+
+    def settings(self) -> Dict[str, float]:
+        """Constructor arguments of this limiter."""
+        return {
+            'initial_rate': self.initial_rate, 'min_rate': self.min_rate, 'max_rate': self.max_rate,
+            'burst': self.burst, 'increase': self.increase, 'decrease': self.decrease,
+            'latency_decrease': self.latency_decrease, 'latency_factor': self.latency_factor,
+            'min_latency': self.min_latency
+        }
+
+    def clone(self) -> 'AdaptiveRateLimiter':
+        """Limiter with the same settings and no host state, for a forked crawl worker."""
+        return AdaptiveRateLimiter(**self.settings())
+
+    def set_ceiling(self, host: str, rate: float):
+        """Cap a host's rate (e.g. 1 / Crawl-delay)."""
+        with self._state(host) as state:
+            state.ceiling = max(min(rate, self.max_rate), 1e-3)
+            state.rate = min(state.rate, state.ceiling)
+
+    def reserve(self, host: str) -> float:
+        """Take a token for host and return how long to wait before sending."""
+        with self._state(host) as state:
+            now = self._clock()
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            state.tokens -= 1  # Negative balance = requests queued behind this one
+            wait = max(-state.tokens / state.rate, state.blocked_until - now, 0.0)
+            state.requests += 1
+            state.waited_seconds += wait
+            return wait
+
+    def acquire(self, host: str) -> float:
+        """Block until a request to host is allowed; returns seconds waited."""
+        wait = self.reserve(host)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, host: str, latency: float, status: int, throttled: bool = False,
+               retry_after: Optional[float] = None):
+        """Feed back one response: latency to headers, final status, and whether
+        any attempt (including internal retries) was throttled."""
+        with self._state(host) as state:
+            now = self._clock()
+            state.latency = latency if state.latency is None else 0.7 * state.latency + 0.3 * latency
+            if state.baseline is None or latency < state.baseline:
+                state.baseline = latency
+            else:
+                state.baseline += 0.02 * (latency - state.baseline)
+
+            throttled = throttled or status in THROTTLE_STATUSES
+            if throttled:
+                state.throttled += 1
+                if retry_after:
+                    state.blocked_until = max(state.blocked_until, now + retry_after)
+                    logger.warning(f"{host} asked to retry after {retry_after:.0f}s")
+
+            slow = (state.latency > self.min_latency
+                    and state.latency > self.latency_factor * state.baseline)
+            if throttled or status >= 500 or slow:
+                # One decrease per second at most: responses to requests sent before the
+                # last decrease (concurrent 429s, a lagging latency average) count once
+                if now - state.last_decrease >= max(1.0, state.latency):
+                    old_rate = state.rate
+                    factor = self.latency_decrease if slow and not (throttled or status >= 500) else self.decrease
+                    state.rate = max(self.min_rate, state.rate * factor)
+                    state.last_decrease = now
+                    state.decreases += 1
+                    logger.info(f"Rate for {host}: {old_rate:.2f} -> {state.rate:.2f} req/s")
+            elif status < 400:
+                state.rate = min(state.ceiling, state.rate + self.increase)
+
+    def rate(self, host: str) -> float:
+        with self._state(host) as state:
+            return state.rate
+
+    def as_dict(self) -> Dict[str, Dict]:
+        """Effective rate and throttle counters per host."""
+        return {
+            host: {
+                'rate': round(state.rate, 2),
+                'ceiling': round(state.ceiling, 2),
+                'latency_ms': round((state.latency or 0) * 1000, 1),
+                'requests': state.requests,
+                'decreases': state.decreases,
+                'throttled': state.throttled,
+                'waited_seconds': round(state.waited_seconds, 2)
+            }
+            for host, state in self._states().items()
+        }
@@ -0,0 +1,209 @@
+"""
+Structured-record sources: JSON arrays, JSON Lines and CSV.
+
+Knowledge-base and help-center exports arrive as records - data/
+bitb-knowledge.json is a JSON array of {url, title, section, content}
+objects - rather than as documents. iter_records() streams the records of
+a file without loading it: JSON arrays through an incremental
+raw_decode() loop over a sliding buffer, JSON Lines line by line and CSV
+through csv.DictReader. RecordMapping turns each record into the text to
+chunk plus a title, URL and metadata for the chunk.
+
+A malformed JSON Lines line or a record with no text is counted and
+skipped; a malformed JSON array ends its file at the error, since there
+is no way to resynchronise inside it.
+"""
+
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RECORD_FORMATS = ('json', 'jsonl', 'csv')
+TEXT_FIELDS = ('content', 'text', 'body', 'answer', 'description')  # First present is the text by default
+TITLE_FIELDS = ('title', 'question', 'name')
+MAX_METADATA_CHARS = 200  # Longer unmapped string fields are text, not metadata
+
+_BLOCK = 1 << 16
+_EXTENSIONS = {'.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.csv': 'csv'}
+
+
+@dataclass
+class RecordStats:
+    """Counters for a records job"""
+    files: int = 0
+    records: int = 0  # Records read
+    ingested: int = 0  # Records with text, passed on to chunking
+    skipped_empty: int = 0  # No text in the mapped fields
+    skipped_invalid: int = 0  # Malformed JSON Lines lines, non-object JSON elements
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def detect_format(path: str) -> str:
+    """'json', 'jsonl' or 'csv' from the extension; a .json file holding one object per line is 'jsonl'."""
+    fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unknown records format for {path} (use .json, .jsonl or .csv, or set the format)")
+    if fmt == 'json':
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for block in iter(lambda: f.read(_BLOCK), ''):
+                stripped = block.lstrip()
+                if stripped:
+                    return 'json' if stripped[0] == '[' else 'jsonl'
+    return fmt
+
+
+def _json_array(f, path: str) -> Iterator:
+    """Elements of the top-level JSON array in f, decoded one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, started = '', 0, False, False
+    want = _BLOCK
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError(f"{path}: {'unterminated JSON array' if started else 'expected a JSON array'}")
+            chunk = f.read(_BLOCK)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        if not started:
+            if buffer[pos] != '[':
+                raise ValueError(f"{path}: expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == ']':
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            complete = eof or end < len(buffer) or isinstance(value, (dict, list))  # A number may continue
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"{path}: invalid JSON: {e}")
+            complete = False
+        if not complete:
+            # The element runs past the buffer: read more, doubling so one huge element stays linear
+            chunk = f.read(want)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            want *= 2
+            continue
+        want = _BLOCK
+        yield value
+        pos = end
+        if pos > _BLOCK:
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_records(path: str, fmt: Optional[str] = None, stats: Optional[RecordStats] = None) -> Iterator[Dict]:
+    """Stream the records (dicts) of a JSON array, JSON Lines or CSV file."""
+    fmt = fmt or detect_format(path)
+    if fmt not in RECORD_FORMATS:
+        raise ValueError(f"Invalid records format: {fmt}")
+    stats = stats or RecordStats()
+    stats.add(files=1)
+
+    if fmt == 'csv':
+        csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))  # Article bodies outgrow the 128 KiB default
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                stats.add(records=1)
+                yield row
+        return
+
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        if fmt == 'json':
+            values = _json_array(f, path)
+        else:
+            values = _json_lines(f, path, stats)
+        for value in values:
+            if not isinstance(value, dict):
+                stats.add(skipped_invalid=1)
+                continue
+            stats.add(records=1)
+            yield value
+
+
+def _json_lines(f, path: str, stats: RecordStats) -> Iterator:
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            if not stats.skipped_invalid:
+                logger.warning(f"{os.path.basename(path)}:{number}: skipping invalid JSON line ({e})")
+            stats.add(skipped_invalid=1)
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return '\n'.join(_as_text(item) for item in value if item is not None)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+@dataclass
+class MappedRecord:
+    """A record as chunk text plus citation fields"""
+    text: str
+    title: str = ''
+    url: str = ''
+    metadata: Dict = field(default_factory=dict)
+
+
+@dataclass
+class RecordMapping:
+    """Which record fields become chunk text, title, URL and metadata
+
+    text_fields are joined with blank lines (default: the first of TEXT_FIELDS the
+    record has); title_field defaults to the first of TITLE_FIELDS present.
+    metadata_fields defaults to every other short scalar field (e.g. 'section').
+    """
+    text_fields: Optional[List[str]] = None
+    title_field: Optional[str] = None
+    url_field: str = 'url'
+    metadata_fields: Optional[List[str]] = None
+
+    def apply(self, record: Dict) -> Optional[MappedRecord]:
+        """The mapped record, or None when it has no text."""
+        text_fields = self.text_fields or [next((name for name in TEXT_FIELDS if record.get(name)), TEXT_FIELDS[0])]
+        text = '\n\n'.join(filter(None, (_as_text(record.get(name)).strip() for name in text_fields)))
+        if not text:
+            return None
+        title_field = self.title_field or next((name for name in TITLE_FIELDS if record.get(name)), None)
+        title = _as_text(record.get(title_field)).strip() if title_field else ''
+        url = _as_text(record.get(self.url_field)).strip()
+
+        if self.metadata_fields is not None:
+            metadata = {name: record[name] for name in self.metadata_fields if record.get(name) not in (None, '')}
+        else:
+            used = set(text_fields) | {title_field, self.url_field}
+            metadata = {
+                name: value for name, value in record.items()
+                if name not in used and isinstance(value, (str, int, float, bool)) and value != ''
+                and not (isinstance(value, str) and len(value) > MAX_METADATA_CHARS)
+            }
+        return MappedRecord(text, title, url, metadata)
@@ -0,0 +1,288 @@
+"""
+Shared robots.txt cache with compiled rule matching.
+
+RobotsCache fetches each origin's robots.txt once per TTL through the
+pooled HttpFetcher with a short read timeout, and shares the result across
+every crawl in the process. With ROBOTS_CACHE_DIR set the raw files are
+also kept on disk, so separate worker runs for the same domain reuse them.
+
+RobotsRules is parsed once per user agent: rules are pre-sorted by
+specificity (longest match wins, Allow wins ties, per RFC 9309) and
+wildcard patterns are compiled to regexes, so checking thousands of URLs
+is a short scan of prefix tests. Crawl-delay and Sitemap lines are exposed
+for the crawlers.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .fetch import HttpFetcher
+
+logger = logging.getLogger(__name__)
+
+MAX_ROBOTS_BYTES = 500 * 1024  # RFC 9309 minimum parse limit
+MAX_CRAWL_DELAY = 30.0  # Seconds; longer declared delays are clamped
+
+_ESCAPE_RE = re.compile(r'%[0-9a-fA-F]{2}')
+
+
+def _normalize_escapes(value: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: m.group(0).upper(), value)
+
+
+class _Rule:
+    """One Allow/Disallow line, compiled."""
+
+    __slots__ = ('pattern', 'allow', 'prefix', 'regex')
+
+    def __init__(self, pattern: str, allow: bool):
+        self.pattern = _normalize_escapes(pattern)
+        self.allow = allow
+        if '*' in self.pattern or self.pattern.endswith('$'):
+            anchored = self.pattern.endswith('$')
+            body = self.pattern[:-1] if anchored else self.pattern
+            regex = '.*'.join(re.escape(part) for part in body.split('*'))
+            self.prefix = None
+            self.regex = re.compile(regex + ('$' if anchored else ''))
+        else:
+            self.prefix = self.pattern
+            self.regex = None
+
+    def matches(self, path: str) -> bool:
+        if self.prefix is not None:
+            return path.startswith(self.prefix)
+        return self.regex.match(path) is not None
+
+
+class RobotsRules:
+    """robots.txt rules for one user agent"""
+
+    def __init__(self, rules: Optional[List[Tuple[str, bool]]] = None,
+                 crawl_delay: Optional[float] = None, sitemaps: Optional[List[str]] = None,
+                 allow_all: bool = False, disallow_all: bool = False):
+        compiled = [_Rule(pattern, allow) for pattern, allow in (rules or [])]
+        # Longest pattern first; Allow before Disallow on ties
+        self.rules = sorted(compiled, key=lambda rule: (-len(rule.pattern), not rule.allow))
+        self.crawl_delay = crawl_delay
+        self.sitemaps = sitemaps or []
+        self.allow_all = allow_all
+        self.disallow_all = disallow_all
+
+    @classmethod
+    def parse(cls, text: str, user_agent: str) -> 'RobotsRules':
+        """Parse robots.txt and keep the group(s) that apply to user_agent."""
+        token = user_agent.split('/')[0].strip().lower()
+        groups = []  # {'agents': [...], 'rules': [...], 'delay': ...}
+        sitemaps = []
+        current = None
+        in_agent_lines = False
+
+        for raw_line in text.splitlines():
+            line = raw_line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = (part.strip() for part in line.split(':', 1))
+            field = field.lower()
+
+            if field == 'user-agent':
+                if current is None or not in_agent_lines:
+                    current = {'agents': [], 'rules': [], 'delay': None}
+                    groups.append(current)
+                current['agents'].append(value.lower())
+                in_agent_lines = True
+                continue
+
+            if field == 'sitemap':
+                if value:
+                    sitemaps.append(value)
+                continue
+
+            in_agent_lines = False
+            if current is None:
+                continue
+            if field in ('allow', 'disallow'):
+                if value:  # Empty Disallow allows everything
+                    current['rules'].append((value, field == 'allow'))
+            elif field == 'crawl-delay':
+                try:
+                    current['delay'] = float(value)
+                except ValueError:
+                    pass
+
+        # Most specific agent token wins; groups naming the same agent are merged
+        best_length, selected = -1, []
+        for group in groups:
+            for agent in group['agents']:
+                if agent == '*':
+                    length = 0
+                elif agent in token:
+                    length = len(agent)
+                else:
+                    continue
+                if length > best_length:
+                    best_length, selected = length, [group]
+                elif length == best_length and group not in selected:
+                    selected.append(group)
+
+        rules = [rule for group in selected for rule in group['rules']]
+        delays = [group['delay'] for group in selected if group['delay'] is not None]
+        crawl_delay = min(max(delays), MAX_CRAWL_DELAY) if delays else None
+        return cls(rules, crawl_delay, sitemaps)
+
+    def can_fetch(self, url: str) -> bool:
+        """Check a URL against the compiled rules."""
+        if self.disallow_all:
+            return False
+        if self.allow_all:
+            return True
+
+        parts = urlsplit(url)
+        path = _normalize_escapes(parts.path or '/')
+        if parts.query:
+            path += '?' + parts.query
+        if path == '/robots.txt':
+            return True
+
+        for rule in self.rules:
+            if rule.matches(path):
+                return rule.allow
+        return True
+
+    def site_maps(self) -> Optional[List[str]]:
+        """Sitemap URLs (same contract as RobotFileParser.site_maps)"""
+        return self.sitemaps or None
+
+
+@dataclass
+class _RobotsFile:
+    """Raw robots.txt fetch result"""
+    status: int  # HTTP status, or 0 for a network error
+    text: str
+    fetched_at: float
+
+
+class RobotsCache:
+    """Process-wide robots.txt cache keyed by origin, with TTL and optional disk copy."""
+
+    def __init__(self, ttl: float = 24 * 3600, error_ttl: float = 600, timeout: float = 5.0,
+                 cache_dir: Optional[str] = None):
+        self.ttl = ttl
+        self.error_ttl = error_ttl  # Retry unreachable robots.txt sooner
+        self.timeout = timeout
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._files: Dict[str, _RobotsFile] = {}
+        self._rules: Dict[Tuple[str, str], RobotsRules] = {}
+        self._origin_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _disk_path(self, origin: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        safe = ''.join(c if c.isalnum() or c in '.-' else '_' for c in origin)
+        return self.cache_dir / f"{safe}.json"
+
+    def _fresh(self, robots_file: Optional[_RobotsFile]) -> bool:
+        if robots_file is None:
+            return False
+        ttl = self.ttl if robots_file.status else self.error_ttl
+        return time.time() - robots_file.fetched_at < ttl
+
+    def _load(self, origin: str) -> Optional[_RobotsFile]:
+        path = self._disk_path(origin)
+        if path and path.exists():
+            try:
+                return _RobotsFile(**json.loads(path.read_text(encoding='utf-8')))
+            except (ValueError, TypeError, OSError):
+                return None
+        return None
+
+    def _fetch(self, origin: str, fetcher: HttpFetcher, user_agent: str) -> _RobotsFile:
+        robots_url = f"{origin}/robots.txt"
+        try:
+            response = fetcher.get(
+                robots_url,
+                headers={'User-Agent': user_agent},
+                timeout=(fetcher.config.connect_timeout, self.timeout),
+                stream=True
+            )
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) >= MAX_ROBOTS_BYTES:
+                    break
+            response.close()
+            robots_file = _RobotsFile(response.status_code, body.decode('utf-8', 'replace'), time.time())
+        except Exception as e:
+            logger.warning(f"Could not fetch {robots_url}: {e}")
+            robots_file = _RobotsFile(0, '', time.time())
+
+        path = self._disk_path(origin)
+        if path and robots_file.status:
+            path.write_text(json.dumps(asdict(robots_file)), encoding='utf-8')
+        return robots_file
+
+    def _file_for(self, origin: str, fetcher: HttpFetcher, user_agent: str) -> _RobotsFile:
+        with self._lock:
+            origin_lock = self._origin_locks.setdefault(origin, threading.Lock())
+
+        # One fetch per origin even when many crawl threads ask at once
+        with origin_lock:
+            robots_file = self._files.get(origin)
+            if self._fresh(robots_file):
+                return robots_file
+            robots_file = self._load(origin)
+            if not self._fresh(robots_file):
+                robots_file = self._fetch(origin, fetcher, user_agent)
+            with self._lock:
+                self._files[origin] = robots_file
+                self._rules = {key: rules for key, rules in self._rules.items() if key[0] != origin}
+            return robots_file
+
+    def rules_for(self, url: str, fetcher: HttpFetcher, user_agent: str) -> RobotsRules:
+        """Rules that apply to user_agent on url's origin."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        robots_file = self._file_for(origin, fetcher, user_agent)
+
+        key = (origin, user_agent)
+        with self._lock:
+            rules = self._rules.get(key)
+        if rules is not None:
+            return rules
+
+        if robots_file.status in (401, 403):
+            rules = RobotsRules(disallow_all=True)
+        elif 400 <= robots_file.status < 500:
+            rules = RobotsRules(allow_all=True)
+        elif robots_file.status == 0 or robots_file.status >= 500:
+            # Unreachable robots.txt: assume complete disallow until error_ttl passes
+            rules = RobotsRules(disallow_all=True)
+        else:
+            rules = RobotsRules.parse(robots_file.text, user_agent)
+
+        with self._lock:
+            self._rules[key] = rules
+        return rules
+
+
+_default_cache: Optional[RobotsCache] = None
+_default_lock = threading.Lock()
+
+
+def get_robots_cache() -> RobotsCache:
+    """Process-wide robots cache (disk-backed when ROBOTS_CACHE_DIR is set)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = RobotsCache(cache_dir=os.getenv('ROBOTS_CACHE_DIR') or None)
+        return _default_cache
@@ -0,0 +1,232 @@
+"""
+Synthetic website for offline crawl benchmarks.
+
+SiteSpec describes the site: page count, link graph shape, page size,
+response latency and injected errors. Pages are generated
+deterministically from the seed, with site-wide header/nav/footer chrome
+around unique prose, plus robots.txt and sitemap.xml.
+
+SyntheticSite serves a spec on 127.0.0.1 from a separate process, so the
+server's CPU time is not charged to the crawler being measured. It speaks
+HTTP/1.1 with keep-alive and counts what it served (GET /__stats).
+
+Link graphs:
+    random - each page links to `links` uniformly random pages
+    tree   - page i links to its children i*links+1 .. i*links+links
+    hub    - every page links back to the home page and `links` random
+             pages; the home page links to the first 100 pages
+"""
+
+import json
+import logging
+import multiprocessing
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+GRAPHS = ('random', 'tree', 'hub')
+
+_WORDS = (
+    'account access analytics answer api assistant automation bandwidth billing browser cache '
+    'channel chatbot checkout cluster config connector context customer dashboard database '
+    'deploy document domain embedding endpoint engine export feature feedback filter gateway '
+    'guide index ingestion insight install integration invoice knowledge latency limit manage '
+    'message metric migrate model monitor network onboarding order pipeline plan platform '
+    'policy pricing privacy query queue quota ranking record refund region release report '
+    'request response retrieval schedule schema search secure server session setting shipping '
+    'storage subscription support sync team template tenant token traffic trial update upload '
+    'usage user vector version webhook widget workflow workspace'
+).split()
+
+
+@dataclass
+class SiteSpec:
+    """Shape of a synthetic site"""
+    pages: int = 200
+    links: int = 8  # Outlinks per page
+    graph: str = 'random'
+    page_kb: float = 20.0  # Approximate HTML size per page
+    latency_ms: float = 20.0  # Added to every response
+    jitter_ms: float = 10.0  # Uniform extra latency, 0..jitter
+    error_rate: float = 0.0  # Fraction of requests answered 500/503 (transient)
+    broken_rate: float = 0.0  # Fraction of pages that are permanently 404
+    seed: int = 42
+
+    def __post_init__(self):
+        if self.graph not in GRAPHS:
+            raise ValueError(f"Invalid link graph: {self.graph}")
+
+
+def _outlinks(spec: SiteSpec, page: int, rng: random.Random) -> List[int]:
+    if spec.graph == 'tree':
+        first = page * spec.links + 1
+        return [child for child in range(first, first + spec.links) if child < spec.pages]
+    if spec.graph == 'hub':
+        if page == 0:
+            return list(range(1, min(spec.pages, 101)))
+        return [0] + [rng.randrange(spec.pages) for _ in range(spec.links)]
+    return [rng.randrange(spec.pages) for _ in range(spec.links)]
+
+
+def page_path(page: int) -> str:
+    return '/' if page == 0 else f"/docs/page-{page}.html"
+
+
+def build_site(spec: SiteSpec) -> Dict[str, bytes]:
+    """path -> HTML body for every page (broken pages are left out)."""
+    rng = random.Random(spec.seed)
+    broken = {page for page in range(1, spec.pages) if rng.random() < spec.broken_rate}
+    chrome_top = (
+        '<div class="top-bar">Free 14-day trial - no credit card required. Start building today.</div>'
+        '<div class="site-links"><a href="/">Home</a> <a href="/docs/page-1.html">Docs</a> '
+        '<a href="/pricing">Pricing</a> <a href="/blog">Blog</a> <a href="/contact">Contact</a></div>'
+    )
+    chrome_bottom = (
+        '<div class="bottom">Copyright 2024 Synthetic Corp. All rights reserved.<br>'
+        '<a href="/privacy">Privacy</a> <a href="/terms">Terms</a></div>'
+    )
+    target_chars = int(spec.page_kb * 1024)
+    site = {}
+    for page in range(spec.pages):
+        if page in broken:
+            continue
+        links = ''.join(f'<li><a href="{page_path(target)}">{rng.choice(_WORDS).title()} '
+                        f'{rng.choice(_WORDS)} guide {target}</a></li>'
+                        for target in _outlinks(spec, page, rng))
+        paragraphs = []
+        size = 0
+        while size < target_chars:
+            sentence_count = rng.randint(3, 6)
+            text = ' '.join(
+                ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(8, 16))).capitalize() + '.'
+                for _ in range(sentence_count)
+            )
+            paragraphs.append(f'<p>{text}</p>')
+            size += len(text) + 7
+        html = (
+            f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Page {page} - Synthetic docs</title>'
+            f'<link rel="canonical" href="{page_path(page)}"></head><body>{chrome_top}'
+            f'<div class="layout"><div class="content"><h1>Synthetic page {page}</h1>{"".join(paragraphs)}</div>'
+            f'<div class="related"><h3>Related</h3><ul>{links}</ul></div></div>{chrome_bottom}</body></html>'
+        )
+        site[page_path(page)] = html.encode('utf-8')
+
+    site['/robots.txt'] = b'User-agent: *\nDisallow: /private/\nSitemap: /sitemap.xml\n'
+    urls = ''.join(f'<url><loc>{{base}}{page_path(page)}</loc></url>' for page in range(spec.pages)
+                   if page not in broken)
+    site['/sitemap.xml'] = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    ).encode('utf-8')
+    return site
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like a real site
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split('?')[0]
+        if path == '/__stats':
+            with server.lock:
+                body = json.dumps(server.counts).encode('utf-8')
+            return self._send(200, body, 'application/json')
+
+        spec = server.spec
+        time.sleep((spec.latency_ms + random.random() * spec.jitter_ms) / 1000)
+        body = server.site.get(path)
+        if path == '/sitemap.xml':
+            body = body.replace(b'{base}', server.base_url.encode('ascii'))
+            return self._send(200, body, 'application/xml')
+        if path == '/robots.txt':
+            return self._send(200, body, 'text/plain')
+
+        # Only page fetches fail: a 5xx robots.txt would block the whole crawl
+        if spec.error_rate and random.random() < spec.error_rate:
+            return self._send(random.choice((500, 503)), b'injected error', 'text/plain', 'errors')
+        if body is None:
+            return self._send(404, b'not found', 'text/plain', 'not_found')
+
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            return self._send(200, compressor.compress(body) + compressor.flush(), 'text/html; charset=utf-8',
+                              'pages', encoding='gzip')
+        return self._send(200, body, 'text/html; charset=utf-8', 'pages')
+
+    def _send(self, status: int, body: bytes, content_type: str, counter: Optional[str] = None,
+              encoding: Optional[str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.counts['requests'] += 1
+            self.server.counts['bytes'] += len(body)
+            if counter:
+                self.server.counts[counter] += 1
+
+
+def _serve(spec: SiteSpec, port_pipe):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    server.spec = spec
+    server.site = build_site(spec)
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.lock = threading.Lock()
+    server.counts = {'requests': 0, 'bytes': 0, 'pages': 0, 'errors': 0, 'not_found': 0}
+    port_pipe.send(server.server_address[1])
+    server.serve_forever()
+
+
+class SyntheticSite:
+    """Serve a SiteSpec on localhost from a child process (use as a context manager)."""
+
+    def __init__(self, spec: SiteSpec):
+        self.spec = spec
+        self.base_url: Optional[str] = None
+        self._process = None
+
+    def start(self) -> str:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.get_context('fork').Process(target=_serve, args=(self.spec, sender),
+                                                                    daemon=True)
+        self._process.start()
+        if not receiver.poll(30):
+            raise RuntimeError("Synthetic site server did not start")
+        self.base_url = f"http://127.0.0.1:{receiver.recv()}"
+        logger.info(f"Serving {self.spec.pages}-page synthetic site at {self.base_url}")
+        return self.base_url
+
+    def counts(self) -> Dict[str, int]:
+        """What the server has answered so far."""
+        return requests.get(f"{self.base_url}/__stats", timeout=5).json()
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(5)
+            self._process = None
+
+    def __enter__(self) -> 'SyntheticSite':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def as_dict(self) -> Dict:
+        return asdict(self.spec)
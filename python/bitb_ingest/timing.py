@@ -0,0 +1,38 @@
+"""
+Per-stage wall-clock and CPU timing for the ingestion pipelines.
+
+    timer = StageTimer()
+    with timer.stage('crawl'):
+        pages = crawl()
+    summary['timings'] = timer.as_dict()
+
+CPU time is this process's (time.process_time), so work done in forked
+crawl workers or a remote embedding API shows up as wall time only.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """Accumulates wall and CPU seconds per named stage."""
+
+    def __init__(self):
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.wall[name] = self.wall.get(name, 0.0) + time.perf_counter() - wall_start
+            self.cpu[name] = self.cpu.get(name, 0.0) + time.process_time() - cpu_start
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {'wall_seconds': round(self.wall[name], 3), 'cpu_seconds': round(self.cpu[name], 3)}
+            for name in self.wall
+        }
@@ -0,0 +1,151 @@
+"""
+Crawler trap detection.
+
+Link-following can walk URL spaces that never end: calendars with a "next
+month" link, ?page=N listings past the last real page, search and filter
+permutations, session tokens minted per visit, and relative-link loops
+that grow /a/b/a/b/... paths. TrapDetector checks each new URL as it is
+enqueued and refuses the ones that look like such a walk:
+
+- repeating_path: a path segment occurring more than max_segment_repeats times
+- session_id: a URL that differs from one already seen only in the opaque
+  value of a session/token parameter
+- sequence: a pagination parameter (?page=, ?offset=, /page/N) or a date
+  (/2024/05/, ?month=2024-05) that has already taken sequence_cap values
+  for the same URL template
+- template_cap: more than template_cap distinct URLs share one template
+  (host + path with digit runs and opaque ids masked + query parameter names)
+
+The first URL refused for each pattern is logged as a warning; all of them
+are counted in the report. The state is per process: distributed crawl
+workers each apply the caps to the URLs they discover.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that page through one listing
+SEQUENCE_PARAMS = {'page', 'p', 'pg', 'paged', 'pagenum', 'page_num', 'pageno', 'offset', 'start',
+                   'from', 'skip', 'month', 'year', 'week', 'day', 'date'}
+SESSION_NAME = re.compile(r'sess|^sid$|_sid$|token|visitor|^vid$', re.IGNORECASE)
+
+_DIGITS = re.compile(r'\d+')
+# Long ids that are not words: hex digests, UUIDs, base64-ish tokens with digits
+_OPAQUE = re.compile(r'^(?=[^/]*\d)[0-9A-Za-z_\-]{16,}$|^[0-9a-fA-F\-]{32,}$')
+_PATH_DATE = re.compile(r'/((?:19|20)\d\d)/(\d\d?)(?:/(\d\d?))?(?=/|$)')
+_PATH_PAGE = re.compile(r'/page/(\d+)(?=/|$)', re.IGNORECASE)
+_DATE_VALUE = re.compile(r'^(?:19|20)\d\d-\d\d?(?:-\d\d?)?$')
+
+
+def url_template(url: str) -> str:
+    """host + path with digits and opaque ids masked + sorted query parameter names."""
+    parts = urlsplit(url)
+    path = '/'.join('*' if _OPAQUE.match(segment) else _DIGITS.sub('#', segment)
+                    for segment in parts.path.split('/'))
+    names = sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    return f"{parts.netloc}{path}" + (f"?{'&'.join(names)}" if names else '')
+
+
+class TrapDetector:
+    """Refuses enqueued URLs that look like an endless URL space."""
+
+    def __init__(self, template_cap: int = 1000, sequence_cap: int = 200, max_segment_repeats: int = 2):
+        self.template_cap = template_cap
+        self.sequence_cap = sequence_cap
+        self.max_segment_repeats = max_segment_repeats
+        self.trapped = Counter()  # Reason -> URLs refused
+        self.patterns = Counter()  # "reason: pattern" -> URLs refused
+        self._templates = Counter()  # Template -> distinct URLs accepted
+        self._sequences: Dict[Tuple[str, str], Set[str]] = {}  # (template, slot) -> values seen
+        self._session_keys: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _loop_prefix(self, path: str) -> Optional[str]:
+        """Path up to the first occurrence of a segment repeated too often, else None."""
+        segments = [segment for segment in path.split('/') if segment]
+        counts = Counter(segment.lower() for segment in segments)
+        for index, segment in enumerate(segments):
+            if counts[segment.lower()] > self.max_segment_repeats:
+                return '/' + ''.join(f"{part}/" for part in segments[:index])
+        return None
+
+    @staticmethod
+    def _session_key(parts, params) -> Optional[str]:
+        masked = [(name, '*' if SESSION_NAME.search(name) and _OPAQUE.match(value) else value)
+                  for name, value in params]
+        if masked == params:
+            return None
+        return f"{parts.netloc}{parts.path}?" + '&'.join(f"{name}={value}" for name, value in masked)
+
+    @staticmethod
+    def _sequence_slots(parts, params):
+        date = _PATH_DATE.search(parts.path)
+        if date:
+            yield 'path-date', '-'.join(filter(None, date.groups()))
+        page = _PATH_PAGE.search(parts.path)
+        if page:
+            yield 'path-page', page.group(1)
+        for name, value in params:
+            if name.lower() in SEQUENCE_PARAMS and (value.isdigit() or _DATE_VALUE.match(value)):
+                yield name, value
+
+    def _trap(self, reason: str, pattern: str, url: str) -> str:
+        key = f"{reason}: {pattern}"
+        if not self.patterns[key]:
+            logger.warning(f"Crawler trap ({reason}) at {pattern}, skipping URLs like {url}")
+        self.patterns[key] += 1
+        self.trapped[reason] += 1
+        return reason
+
+    def check(self, url: str) -> Optional[str]:
+        """Reason url is a trap (and is refused), or None to accept it. Call once per new URL."""
+        parts = urlsplit(url)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        template = url_template(url)
+        with self._lock:
+            loop_prefix = self._loop_prefix(parts.path)
+            if loop_prefix is not None:
+                return self._trap('repeating_path', f"{parts.netloc}{loop_prefix}**", url)
+
+            session_key = self._session_key(parts, params)
+            if session_key is not None:
+                if session_key in self._session_keys:
+                    return self._trap('session_id', template, url)
+                self._session_keys.add(session_key)
+
+            if self.sequence_cap:
+                for slot, value in self._sequence_slots(parts, params):
+                    seen = self._sequences.setdefault((template, slot), set())
+                    if value in seen:
+                        continue
+                    if len(seen) >= self.sequence_cap:
+                        return self._trap('sequence', f"{template} [{slot}]", url)
+                    seen.add(value)
+
+            if self.template_cap and self._templates[template] >= self.template_cap:
+                return self._trap('template_cap', template, url)
+            self._templates[template] += 1
+        return None
+
+    def clone(self) -> 'TrapDetector':
+        """Same limits with empty state (for a forked worker's crawler)."""
+        return TrapDetector(self.template_cap, self.sequence_cap, self.max_segment_repeats)
+
+    def merge(self, counts: Dict):
+        """Add the as_dict() counts of another TrapDetector (a worker process's)."""
+        with self._lock:
+            self.trapped.update(counts.get('trapped', {}))
+            self.patterns.update(counts.get('patterns', {}))
+
+    def as_dict(self, top: int = 20) -> Dict:
+        with self._lock:
+            return {
+                'trapped': dict(self.trapped),
+                'patterns': dict(self.patterns.most_common(top))
+            }
@@ -0,0 +1,168 @@
+"""
+Tenant include/exclude URL rules.
+
+UrlRules decides, before a URL is enqueued, whether the crawl may ever
+request it: a URL must match one include rule (when any are given) and no
+exclude rule. Each rule list is compiled once into a single alternation
+regex, one named group per rule, so a URL is matched against all rules in
+one pass and the group that matched names the rule to credit.
+
+Rule syntax (matched against the canonical URL's path, trailing slash
+folded, and query):
+
+    /docs/**          path glob: * stays within a segment, ** spans segments;
+                      a trailing /** also matches the directory itself
+    /blog/tag/*       exactly one segment below /blog/tag/
+    /cart             exactly this path
+    ?sort             a query parameter, with any value (also ?sort= and ?sort=*)
+    ?lang=en          a query parameter with this value (* globs within it)
+    /search?q=*       path and query parameter together
+    re:^/\\d{4}/       regular expression searched in the path (plus "?query" if any)
+
+Hit counts are per distinct URL, in the order rules are listed: a URL
+matching several rules is credited to the first. Distributed crawl workers
+count separately, so their merged totals count a URL once per worker that
+found it.
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence
+from urllib.parse import quote_plus, urlsplit
+
+from .frontier import VisitedSet, canonicalize
+
+
+def _path_pattern(glob: str) -> str:
+    if not glob.startswith('/'):
+        glob = '/' + glob
+    tail = ''
+    if glob.endswith('/**'):
+        glob, tail = glob[:-3], '(?:/[^?]*)?'
+    elif glob != '/':
+        glob = glob.rstrip('/')  # Trailing slashes are folded, as in url_key()
+    parts = []
+    for piece in re.split(r'(\*\*|\*)', glob):
+        if piece == '**':
+            parts.append('[^?]*')
+        elif piece == '*':
+            parts.append('[^/?]*')
+        else:
+            parts.append(re.escape(piece))
+    return ''.join(parts) + tail
+
+
+def _query_pattern(param: str) -> str:
+    name, equals, value = param.partition('=')
+    if not name:
+        raise ValueError(f"Query rule without a parameter name: ?{param}")
+    name_re = re.escape(quote_plus(name))
+    if not equals or value in ('', '*'):
+        return f"{name_re}(?:=[^&]*)?"
+    value_re = '[^&]*'.join(re.escape(quote_plus(piece)) for piece in value.split('*'))
+    return f"{name_re}={value_re}"
+
+
+def compile_rule(rule: str) -> str:
+    """Regex (lookaheads only, matched at position 0 of "path[?query]") for one rule."""
+    rule = rule.strip()
+    if not rule:
+        raise ValueError("Empty URL rule")
+    if rule.startswith('re:'):
+        pattern = rule[3:]
+        re.compile(pattern)  # Report a bad expression against the rule that holds it
+        return f"(?=.*?(?:{pattern}))"
+
+    path, _, query = rule.partition('?')
+    checks = []
+    if path:
+        checks.append(f"(?={_path_pattern(path)}(?:\\?|$))")
+    for param in filter(None, query.split('&')):
+        checks.append(f"(?=[^?]*\\?(?:[^&]*&)*{_query_pattern(param)}(?:&|$))")
+    if not checks:
+        raise ValueError(f"URL rule matches nothing specific: {rule!r}")
+    return ''.join(checks)
+
+
+def _compile_all(rules: Sequence[str]) -> Optional['re.Pattern']:
+    if not rules:
+        return None
+    groups = []
+    for index, rule in enumerate(rules):
+        try:
+            groups.append(f"(?P<r{index}>{compile_rule(rule)})")
+        except re.error as e:
+            raise ValueError(f"Invalid URL rule {rule!r}: {e}")
+    return re.compile('|'.join(groups), re.DOTALL)
+
+
+class UrlRules:
+    """Compiled include/exclude rules with per-rule hit counts."""
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None):
+        self.include: List[str] = list(include or [])
+        self.exclude: List[str] = list(exclude or [])
+        self._include_re = _compile_all(self.include)
+        self._exclude_re = _compile_all(self.exclude)
+        self.include_hits = Counter()  # Include rule -> distinct URLs it admitted
+        self.exclude_hits = Counter()  # Exclude rule -> distinct URLs it rejected
+        self.not_included = 0  # Distinct URLs matching no include rule
+        self._seen = VisitedSet('hashed')  # Count each URL once, however often it is linked
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    @staticmethod
+    def _target(url: str) -> str:
+        parts = urlsplit(canonicalize(url) or url)
+        path = parts.path.rstrip('/') or '/'
+        return f"{path}?{parts.query}" if parts.query else path
+
+    def _decide(self, url: str):
+        """(allowed, counter to credit, rule) for url."""
+        target = self._target(url)
+        if self._exclude_re:
+            m = self._exclude_re.match(target)
+            if m:
+                return False, self.exclude_hits, self.exclude[int(m.lastgroup[1:])]
+        if self._include_re:
+            m = self._include_re.match(target)
+            if m is None:
+                return False, None, None
+            return True, self.include_hits, self.include[int(m.lastgroup[1:])]
+        return True, None, None
+
+    def allows(self, url: str) -> bool:
+        """Whether url may be crawled; counts the deciding rule the first time url is seen."""
+        allowed, hits, rule = self._decide(url)
+        if self._seen.add(url):
+            with self._lock:
+                if hits is not None:
+                    hits[rule] += 1
+                elif not allowed:
+                    self.not_included += 1
+        return allowed
+
+    def filter(self, urls: Iterable[str]) -> List[str]:
+        return [url for url in urls if self.allows(url)]
+
+    def clone(self) -> 'UrlRules':
+        """Same rules with fresh counters (for a forked worker's crawler)."""
+        return UrlRules(self.include, self.exclude)
+
+    def merge(self, counts: Dict):
+        """Add the as_dict() counts of another UrlRules (a worker process's)."""
+        with self._lock:
+            self.include_hits.update(counts.get('include', {}))
+            self.exclude_hits.update(counts.get('exclude', {}))
+            self.not_included += counts.get('not_included', 0)
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'include': {rule: self.include_hits[rule] for rule in self.include},
+                'exclude': {rule: self.exclude_hits[rule] for rule in self.exclude},
+                'not_included': self.not_included
+            }
@@ -0,0 +1,286 @@
+"""
+WARC recording and offline replay of crawl fetches.
+
+WarcWriter appends one gzip member per WARC/1.1 ``response`` record, so the
+archive is a standard .warc.gz that other tools can read. Bodies are stored
+as the crawler saw them: content-decoded, with Content-Encoding and
+Transfer-Encoding dropped and Content-Length rewritten. Fetches the crawler
+rejected (non-HTML, oversized) are recorded without a body and a
+``BiTB-Rejected`` field; redirects keep the requested URL as
+WARC-Target-URI and add ``BiTB-Final-URI``. Every record is written with a
+single O_APPEND write, so forked crawl workers can share one archive.
+
+ReplayFetcher has the HttpFetcher interface (get, fetch_html, stats,
+limiter, config) but serves responses from an archive: robots.txt,
+sitemaps and pages come back exactly as recorded, anything not in the
+archive is a 404, and nothing touches the network. Running the normal
+crawlers on a ReplayFetcher rebuilds a crawl for new chunking, extraction
+or embedding settings without re-fetching the site.
+"""
+
+import base64
+import hashlib
+import io
+import logging
+import os
+import threading
+import uuid
+import zlib
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from http import HTTPStatus
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .fetch import FetchConfig, FetchStats, HtmlResponse, decode_body
+
+logger = logging.getLogger(__name__)
+
+_DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+def _http_block(status: int, headers: Mapping[str, str], body: bytes) -> bytes:
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    lines = [f"HTTP/1.1 {status} {reason}".rstrip()]
+    lines += [f"{name}: {value}" for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS]
+    lines.append(f"Content-Length: {len(body)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', 'replace') + body
+
+
+class WarcWriter:
+    """Append-only .warc.gz writer, safe across threads and forked processes."""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if not append and os.path.exists(path):
+            os.remove(path)
+        open(path, 'ab').close()
+        self.records = 0
+        self._fd: Optional[int] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _descriptor(self) -> int:
+        # Reopened after fork: a child must not share the parent's descriptor state
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def write_response(self, url: str, status: int, headers: Mapping[str, str], body: bytes = b'',
+                       final_url: Optional[str] = None, rejected: Optional[str] = None):
+        """Record one HTTP response (body already content-decoded)."""
+        block = _http_block(status, headers, body)
+        digest = base64.b32encode(hashlib.sha1(body).digest()).decode('ascii')
+        fields = [
+            'WARC/1.1',
+            'WARC-Type: response',
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f"WARC-Target-URI: {url}",
+            f"WARC-Payload-Digest: sha1:{digest}",
+            'Content-Type: application/http;msgtype=response',
+            f"Content-Length: {len(block)}",
+        ]
+        if final_url and final_url != url:
+            fields.append(f"BiTB-Final-URI: {final_url}")
+        if rejected:
+            fields.append(f"BiTB-Rejected: {rejected}")
+        record = ('\r\n'.join(fields) + '\r\n\r\n').encode('utf-8') + block + b'\r\n\r\n'
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # One gzip member per record
+        member = compressor.compress(record) + compressor.flush()
+        with self._lock:
+            os.write(self._descriptor(), member)
+            self.records += 1
+
+    def reopen(self) -> 'WarcWriter':
+        """Writer on the same archive (for a forked worker's fetcher)."""
+        return WarcWriter(self.path, append=True)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+
+@dataclass
+class ArchivedResponse:
+    """One recorded response"""
+    url: str
+    status: int
+    headers: CaseInsensitiveDict
+    body: bytes
+    final_url: str
+    rejected: Optional[str] = None
+
+
+def _read_member(f, offset: int) -> Tuple[bytes, int]:
+    """Decompress the gzip member at offset; returns (data, offset of the next member)."""
+    f.seek(offset)
+    decompressor = zlib.decompressobj(31)
+    parts = []
+    consumed = 0
+    while not decompressor.eof:
+        chunk = f.read(64 * 1024)
+        if not chunk:
+            break
+        consumed += len(chunk)
+        parts.append(decompressor.decompress(chunk))
+    if not decompressor.eof:
+        raise EOFError(f"Truncated WARC record at offset {offset}")
+    return b''.join(parts), offset + consumed - len(decompressor.unused_data)
+
+
+def _parse_fields(block: bytes) -> Dict[str, str]:
+    fields = {}
+    for line in block.decode('utf-8', 'replace').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        if value:
+            fields[name.strip().lower()] = value.strip()
+    return fields
+
+
+def _parse_record(data: bytes) -> Optional[ArchivedResponse]:
+    head, _, rest = data.partition(b'\r\n\r\n')
+    fields = _parse_fields(head)
+    if fields.get('warc-type') != 'response' or 'warc-target-uri' not in fields:
+        return None
+    block = rest[:int(fields.get('content-length', len(rest)))]
+    http_head, _, body = block.partition(b'\r\n\r\n')
+    status_line, *header_lines = http_head.decode('latin-1').split('\r\n')
+    headers = CaseInsensitiveDict()
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        if name.lower() != 'content-length':
+            headers[name.strip()] = value.strip()
+    url = fields['warc-target-uri']
+    return ArchivedResponse(
+        url=url,
+        status=int(status_line.split()[1]),
+        headers=headers,
+        body=body,
+        final_url=fields.get('bitb-final-uri', url),
+        rejected=fields.get('bitb-rejected')
+    )
+
+
+def iter_records(path: str) -> Iterator[Tuple[int, ArchivedResponse]]:
+    """(offset, response) for every response record in a .warc.gz."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset < size:
+            try:
+                data, next_offset = _read_member(f, offset)
+            except (EOFError, zlib.error) as e:
+                logger.warning(f"Stopping at unreadable record in {path}: {e}")
+                return
+            record = _parse_record(data)
+            if record is not None:
+                yield offset, record
+            offset = next_offset
+
+
+@dataclass
+class ReplayStats:
+    """Archive lookups made by a ReplayFetcher"""
+    records: int = 0  # Distinct URLs in the archive
+    hits: int = 0
+    misses: int = 0  # URLs the replayed crawl asked for that were never recorded
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def add(self, **deltas):
+        """Thread-safe increment of one or more counters."""
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+class ReplayFetcher:
+    """HttpFetcher stand-in that answers from a WARC archive with no network I/O."""
+
+    def __init__(self, archive_path: str, config: Optional[FetchConfig] = None):
+        if not os.path.exists(archive_path):
+            raise FileNotFoundError(f"WARC archive not found: {archive_path}")
+        self.archive_path = archive_path
+        self.config = config or FetchConfig()
+        self.limiter = None  # Nothing to pace
+        self.recorder = None
+        self.offline = True
+        self.stats = FetchStats()
+        self.replay = ReplayStats()
+        self._offsets: Dict[str, int] = {}  # URL -> offset of its latest record
+        for offset, record in iter_records(archive_path):
+            self._offsets[record.url] = offset
+        self.replay.records = len(self._offsets)
+        self._local = threading.local()  # One file handle per crawl thread
+        self._files = []  # Every handle opened, by any thread, for close()
+        self._files_lock = threading.Lock()
+        logger.info(f"Replaying {len(self._offsets)} recorded URLs from {archive_path}")
+
+    def _lookup(self, url: str) -> Optional[ArchivedResponse]:
+        offset = self._offsets.get(url)
+        self.stats.add(requests=1)
+        if offset is None:
+            self.replay.add(misses=1)
+            return None
+        f = getattr(self._local, 'file', None)
+        if f is None:
+            f = self._local.file = open(self.archive_path, 'rb')
+            with self._files_lock:
+                self._files.append(f)
+        record = _parse_record(_read_member(f, offset)[0])
+        self.replay.add(hits=1)
+        self.stats.add(bytes_decoded=len(record.body))
+        return record
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Recorded response as a requests.Response (404 if never recorded)."""
+        record = self._lookup(url)
+        response = requests.Response()
+        response.url = url
+        response.status_code = 404
+        response._content = b''
+        if record is not None:
+            response.url = record.final_url
+            response.status_code = record.status
+            response.headers = record.headers
+            response._content = record.body
+        response.raw = io.BytesIO(response._content)
+        return response
+
+    def fetch_html(self, url: str, headers: Optional[dict] = None,
+                   max_bytes: Optional[int] = None) -> HtmlResponse:
+        """Recorded page, with the same rejections the live fetch applied."""
+        record = self._lookup(url)
+        if record is None:
+            return HtmlResponse(url, 404, CaseInsensitiveDict())
+        result = HtmlResponse(record.final_url, record.status, record.headers, rejected=record.rejected)
+        if record.status == 200 and not record.rejected:
+            result.html = decode_body(record.headers.get('Content-Type', ''), record.body)
+        return result
+
+    def clone(self) -> 'ReplayFetcher':
+        return ReplayFetcher(self.archive_path, self.config)
+
+    def close(self):
+        """Close the archive handles of all threads (a thread reading afterwards opens a new one)."""
+        with self._files_lock:
+            files, self._files = self._files, []
+        for f in files:
+            f.close()
+        self._local = threading.local()
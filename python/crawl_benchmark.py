@@ -0,0 +1,227 @@
+"""
+BiTB Crawl Benchmark - end-to-end ingestion against a synthetic site
+
+Serves a generated site on localhost (bitb_ingest.synthetic_site) with a
+configurable page count, link graph, page size, latency and error rate,
+then runs either worker's IngestionPipeline against it and reports:
+
+- pages/s and bytes/s (as served by the site)
+- CPU ms per page (this process plus crawl worker processes)
+- wall and CPU time per pipeline stage (gather, dedup, templates, chunk, embed, index)
+
+--crawl-only stops after the crawl. --embedder hash swaps the sentence
+embedding model for a feature-hashing embedder so crawl/parse/chunk cost
+can be measured without a model download or GPU.
+
+Usage:
+    python crawl_benchmark.py --pages 500 --latency-ms 30 --worker v2 --mode async --concurrency 16
+    python crawl_benchmark.py --pages 200 --graph tree --error-rate 0.05 --worker both --crawl-only
+    python crawl_benchmark.py --pages 1000 --worker v1 --mode distributed --workers 4 --embedder hash
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import resource
+import argparse
+import importlib.util
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from bitb_ingest.synthetic_site import GRAPHS, SiteSpec, SyntheticSite
+from bitb_ingest.timing import StageTimer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class HashEmbedder:
+    """Feature-hashing bag-of-words embedder (no model; for benchmarking only)"""
+
+    def __init__(self, *args, dimension: int = 384, **kwargs):
+        self.dimension = dimension
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode('utf-8')) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+    generate = embed_batch  # ingest-worker.py's name for it
+
+
+def load_worker(name: str):
+    """Import ingest_worker.py (v2) or ingest-worker.py (v1)."""
+    filename = 'ingest_worker.py' if name == 'v2' else 'ingest-worker.py'
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cpu_seconds() -> float:
+    """User + system CPU of this process and its reaped children."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def build_pipeline(worker: str, module, args, url: str, workdir: str):
+    if args.embedder == 'hash' or args.crawl_only:  # A crawl-only run never embeds: skip loading a model
+        module.EmbeddingGenerator = HashEmbedder
+    if worker == 'v2':
+        config = module.IngestConfig(
+            trial_token=f"bench-{worker}",
+            source_type='url',
+            source_url=url,
+            crawl_depth=args.depth,
+            max_pages=args.pages,
+            faiss_index_path=os.path.join(workdir, 'faiss'),
+            extraction=args.extraction,
+            initial_rate=args.max_rate,
+            max_rate=args.max_rate,
+            async_crawl=args.mode == 'async',
+            crawl_concurrency=args.concurrency,
+            per_host_concurrency=args.per_host,
+            parse_workers=args.parse_workers,
+            crawl_workers=args.workers if args.mode == 'distributed' else 1,
+            frontier_db=os.path.join(workdir, 'frontier-v2.sqlite')
+        )
+        return module.IngestionPipeline(config)
+
+    module.CONFIG['crawl_initial_rate'] = args.max_rate
+    module.CONFIG['crawl_max_rate'] = args.max_rate
+    module.CONFIG['faiss_dir'] = module.Path(workdir) / 'faiss'
+    module.CONFIG['faiss_dir'].mkdir(parents=True, exist_ok=True)
+    data_source = {
+        'type': 'url',
+        'url': url,
+        'crawl_depth': args.depth,
+        'max_pages': args.pages,
+        'extraction': 'density' if args.extraction == 'density' else 'full',
+        'async_crawl': args.mode == 'async',
+        'concurrency': args.concurrency,
+        'per_host': args.per_host,
+        'parse_workers': args.parse_workers,
+        'workers': args.workers if args.mode == 'distributed' else 1,
+        'frontier_db': os.path.join(workdir, 'frontier-v1.sqlite')
+    }
+    return module.IngestionPipeline(f"bench-{worker}", data_source)
+
+
+def run_one(worker: str, args, spec: SiteSpec, workdir: str) -> Dict:
+    module = load_worker(worker)
+    with SyntheticSite(spec) as site:
+        pipeline = build_pipeline(worker, module, args, site.base_url + '/', workdir)
+        before = site.counts()
+        cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+        if args.crawl_only:
+            timer = StageTimer()
+            with timer.stage('gather'):
+                pages = pipeline._crawl_website()
+            result = {'status': 'completed', 'pages': len(pages), 'timings': timer.as_dict()}
+        else:
+            result = pipeline.run()
+            result['pages'] = result.get('pages_crawled', result.get('pages_processed', 0))
+        wall = time.perf_counter() - wall_start
+        cpu = cpu_seconds() - cpu_start
+        served = {name: value - before[name] for name, value in site.counts().items()}
+
+    pages = result['pages']
+    report = {
+        'worker': worker,
+        'mode': args.mode,
+        'status': result['status'],
+        'pages': pages,
+        'chunks': result.get('chunks_created'),
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu, 3),
+        'pages_per_second': round(pages / wall, 2) if wall else 0.0,
+        'bytes_per_second': int(served['bytes'] / wall) if wall else 0,
+        'cpu_ms_per_page': round(1000 * cpu / pages, 2) if pages else None,
+        'served': served,
+        'timings': result.get('timings', {})
+    }
+    if result['status'] != 'completed':
+        report['error'] = result.get('error')
+    if 'fetch_stats' in result:
+        report['fetch_stats'] = result['fetch_stats']
+    return report
+
+
+def print_report(report: Dict):
+    print(f"\n[{report['worker']} / {report['mode']}] {report['status']}: {report['pages']} pages "
+          f"in {report['wall_seconds']}s")
+    print(f"  {report['pages_per_second']} pages/s | {report['bytes_per_second'] / 1024:.1f} KiB/s | "
+          f"{report['cpu_ms_per_page']} CPU ms/page")
+    served = report['served']
+    print(f"  served {served['requests']} requests ({served['pages']} pages, {served['errors']} errors, "
+          f"{served['not_found']} not found)")
+    for stage, timing in report['timings'].items():
+        print(f"  {stage:<10} wall {timing['wall_seconds']:>8.3f}s   cpu {timing['cpu_seconds']:>8.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crawl + ingestion against a synthetic site')
+    site_args = parser.add_argument_group('synthetic site')
+    site_args.add_argument('--pages', type=int, default=200, help='Pages on the site (also the crawl page cap)')
+    site_args.add_argument('--links', type=int, default=8, help='Outlinks per page')
+    site_args.add_argument('--graph', choices=GRAPHS, default='random', help='Link graph shape')
+    site_args.add_argument('--page-kb', type=float, default=20.0, help='Approximate HTML size per page')
+    site_args.add_argument('--latency-ms', type=float, default=20.0, help='Latency added to every response')
+    site_args.add_argument('--jitter-ms', type=float, default=10.0, help='Random extra latency, 0..jitter')
+    site_args.add_argument('--error-rate', type=float, default=0.0, help='Fraction of page requests answered 5xx')
+    site_args.add_argument('--broken-rate', type=float, default=0.0, help='Fraction of pages that are 404')
+    site_args.add_argument('--seed', type=int, default=42)
+
+    run_args = parser.add_argument_group('ingestion')
+    run_args.add_argument('--worker', choices=['v1', 'v2', 'both'], default='v2',
+                          help='ingest-worker.py (v1), ingest_worker.py (v2) or both')
+    run_args.add_argument('--mode', choices=['sync', 'async', 'distributed'], default='async')
+    run_args.add_argument('--concurrency', type=int, default=16, help='Max in-flight fetches (async)')
+    run_args.add_argument('--per-host', type=int, default=8, help='Max in-flight fetches per host')
+    run_args.add_argument('--parse-workers', type=int, default=0,
+                          help='Parse HTML in this many processes (async; 0 = in the fetch threads)')
+    run_args.add_argument('--workers', type=int, default=4, help='Crawl worker processes (distributed)')
+    run_args.add_argument('--depth', type=int, default=10, help='Max crawl depth')
+    run_args.add_argument('--max-rate', type=float, default=1000.0,
+                          help='Per-host requests/second for the adaptive rate limiter')
+    run_args.add_argument('--extraction', choices=['main', 'density'], default='main')
+    run_args.add_argument('--crawl-only', action='store_true', help='Stop after the crawl stage')
+    run_args.add_argument('--embedder', choices=['model', 'hash'], default='model',
+                          help="'model' (the worker's configured embedder) or 'hash' (no model)")
+    parser.add_argument('--output', help='Write the JSON report here')
+
+    args = parser.parse_args()
+    spec = SiteSpec(pages=args.pages, links=args.links, graph=args.graph, page_kb=args.page_kb,
+                    latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    broken_rate=args.broken_rate, seed=args.seed)
+
+    reports = []
+    workers = ['v1', 'v2'] if args.worker == 'both' else [args.worker]
+    with tempfile.TemporaryDirectory(prefix='bitb-bench-') as workdir:
+        for worker in workers:
+            reports.append(run_one(worker, args, spec, workdir))
+
+    for report in reports:
+        print_report(report)
+    output = {'site': SyntheticSite(spec).as_dict(), 'runs': reports}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\nReport: {args.output}")
+    else:
+        print(json.dumps(output, indent=2))
+
+    sys.exit(0 if all(report['status'] == 'completed' for report in reports) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,7 @@ Version: 1.0.0
 
 This worker handles the ingestion pipeline for BiTB RAG chatbots:
 1. Fetch content (crawl website or process uploaded files)
-2. Extract text from various formats (HTML, PDF, DOCX, TXT)
+2. Extract text from various formats (HTML, PDF, DOCX, TXT, JSON/JSONL/CSV records)
 3. Chunk text into manageable pieces (600 tokens, 100 overlap)
 4. Generate embeddings using sentence-transformers (local, free)
 5. Store vectors in FAISS index (per trial_token namespace)
@@ -16,28 +16,60 @@ Requirements:
 
 Usage:
     python ingest-worker.py --job-id <job_id>
+    python ingest-worker.py --trial-token <token> --data-source-file <json> --resume
+    python ingest-worker.py --trial-token <token> --data-source-file <json> --replay <warc>
 
 Environment Variables:
     EMBEDDING_MODE=local  # "local" or "huggingface"
     HF_API_KEY=           # Optional for HF fallback
     VECTOR_STORE=faiss    # "faiss", "pinecone", or "weaviate"
     MAX_FILE_SIZE_MB=10   # Max file size limit
+    FILE_WORKERS=4        # Uploaded files extracted concurrently
     MAX_TOKENS=100000     # Max tokens per file
+    PDF_WORKERS=0         # Processes extracting PDF pages, shared by the job's files (0 = one per CPU, 1 = in-process)
+    PDF_MAX_PAGES=0       # Extract at most this many pages per PDF (0 = all)
+    EXTRACT_CACHE_DIR=    # Cache extracted PDF/DOCX text here by file hash; re-uploads skip parsing
+    EXTRACT_CACHE_MAX_MB=512  # Compressed size cap; least recently used entries are evicted
     CRAWL_MAX_DEPTH=3     # Max crawl depth
+    CRAWL_ASYNC=false     # Fetch pages concurrently (overridable per data source)
+    CRAWL_CONCURRENCY=8   # Max in-flight fetches when crawling concurrently
+    CRAWL_PER_HOST=2      # Max in-flight fetches per host
+    CRAWL_PARSE_WORKERS=0 # >0 parses crawled HTML in this many processes when crawling concurrently
+    CRAWL_WORKERS=1       # >1 crawls with worker processes sharing a SQLite frontier
+    CRAWL_ADAPTIVE_RATE=true  # Per-host token bucket that adapts to latency and 429/503
+    CRAWL_INITIAL_RATE=2  # Starting requests/second per host
+    CRAWL_MAX_RATE=10     # Requests/second ceiling per host
+    CRAWL_CACHE_DIR=      # Revalidation cache dir; recrawls fetch only changed pages
+    CRAWL_DISCOVERY=links # "links" (BFS) or "sitemap" (sitemap first, BFS fallback)
+    CRAWL_VISITED=hashed  # Seen-URL store: "exact", "hashed" or "bloom" (fixed memory)
+    CRAWL_FRONTIER=priority  # "priority" (best-first by URL/link score) or "fifo" (BFS)
+    CRAWL_TRAP_DETECTION=true  # Skip calendar/pagination/session-id/looping URL spaces
+    CRAWL_TRAP_TEMPLATE_CAP=1000  # Max distinct URLs sharing one URL template
+    CRAWL_TRAP_SEQUENCE_CAP=200  # Max values of one pagination/date parameter per template
+    DEDUP_THRESHOLD=0.95  # SimHash similarity for dropping near-duplicate crawled pages (0 = off)
+    TEMPLATE_THRESHOLD=0.5  # Strip text repeated on this fraction of crawled pages before chunking (0 = off)
+    HTML_PARSER=auto      # "lxml" (fast, if installed), "html.parser" or "auto"
+    HTML_EXTRACTION=full  # "full" page text or "density" (readability-style boilerplate removal)
+    CRAWL_MAX_PAGE_MB=5   # Crawled pages larger than this are aborted mid-download (0 = no limit)
+    CRAWL_CHECKPOINT_DIR= # Journal crawl progress here; resume with --resume after a crash
+    CRAWL_CHECKPOINT_INTERVAL=30  # Max seconds between frontier snapshots
+    ROBOTS_CACHE_DIR=     # Keep fetched robots.txt files here (24h TTL) for later runs
+    CRAWL_WARC_DIR=       # Record crawl responses to <dir>/<trial_token>.warc.gz for replay
 """
 
 import os
 import sys
 import json
+import time
 import logging
+from functools import partial
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from pathlib import Path
 import argparse
 
 # Text processing
 import tiktoken
-from bs4 import BeautifulSoup
 import requests
 
 # Document parsers
@@ -65,14 +97,32 @@ except ImportError:
     faiss = None
     np = None
 
-# Robots.txt parser
-try:
-    from urllib.robotparser import RobotFileParser
-except ImportError:
-    RobotFileParser = None
+from urllib.parse import urlparse
 
-from urllib.parse import urljoin, urlparse
-from collections import deque
+# Shared crawl/ingest building blocks (python/bitb_ingest)
+from bitb_ingest.async_crawl import AsyncCrawlEngine
+from bitb_ingest.fetch import USER_AGENT, FetchConfig, HttpFetcher, get_default_fetcher
+from bitb_ingest.crawl_cache import CrawlCache, CacheEntry
+from bitb_ingest.checkpoint import CrawlCheckpoint
+from bitb_ingest import distributed, sitemap
+from bitb_ingest.frontier import Frontier, VisitedSet, canonicalize, url_key
+from bitb_ingest.dedup import NearDuplicateFilter
+from bitb_ingest.boilerplate import TemplateFilter
+from bitb_ingest.content import ExtractionReport
+from bitb_ingest.documents import Segment, docx_segments, extractor_version, pdf_segments, text_segments
+from bitb_ingest.extract_cache import ExtractionCache
+from bitb_ingest.file_batch import expand_inputs, map_ordered, plan_files
+from bitb_ingest.html_parse import ParsedHTML, extractor_version, parse_html
+from bitb_ingest.parse_pool import ParsePool
+from bitb_ingest.pdf_extract import resolve_workers, start_pool
+from bitb_ingest.priority import CrawlPrioritizer
+from bitb_ingest.robots import RobotsCache, get_robots_cache
+from bitb_ingest.ratelimit import AdaptiveRateLimiter
+from bitb_ingest.records import RecordMapping, RecordStats, iter_records
+from bitb_ingest.timing import StageTimer
+from bitb_ingest.traps import TrapDetector
+from bitb_ingest.url_rules import UrlRules
+from bitb_ingest.warc import ReplayFetcher, WarcWriter
 
 # Configure logging
 logging.basicConfig(
@@ -87,8 +137,35 @@ CONFIG = {
     'hf_api_key': os.getenv('HF_API_KEY', ''),
     'vector_store': os.getenv('VECTOR_STORE', 'faiss'),
     'max_file_size_mb': int(os.getenv('MAX_FILE_SIZE_MB', '10')),
+    'file_workers': int(os.getenv('FILE_WORKERS', '4')),
     'max_tokens': int(os.getenv('MAX_TOKENS', '100000')),
+    'pdf_workers': int(os.getenv('PDF_WORKERS', '0')),
+    'pdf_max_pages': int(os.getenv('PDF_MAX_PAGES', '0')),
+    'extract_cache_dir': os.getenv('EXTRACT_CACHE_DIR', ''),
+    'extract_cache_max_mb': float(os.getenv('EXTRACT_CACHE_MAX_MB', '512')),
     'crawl_max_depth': int(os.getenv('CRAWL_MAX_DEPTH', '3')),
+    'crawl_async': os.getenv('CRAWL_ASYNC', 'false').lower() == 'true',
+    'crawl_concurrency': int(os.getenv('CRAWL_CONCURRENCY', '8')),
+    'crawl_workers': int(os.getenv('CRAWL_WORKERS', '1')),
+    'crawl_adaptive_rate': os.getenv('CRAWL_ADAPTIVE_RATE', 'true').lower() == 'true',
+    'crawl_initial_rate': float(os.getenv('CRAWL_INITIAL_RATE', '2')),
+    'crawl_max_rate': float(os.getenv('CRAWL_MAX_RATE', '10')),
+    'crawl_per_host': int(os.getenv('CRAWL_PER_HOST', '2')),
+    'crawl_parse_workers': int(os.getenv('CRAWL_PARSE_WORKERS', '0')),
+    'crawl_cache_dir': os.getenv('CRAWL_CACHE_DIR', ''),
+    'crawl_discovery': os.getenv('CRAWL_DISCOVERY', 'links'),
+    'crawl_visited': os.getenv('CRAWL_VISITED', 'hashed'),
+    'crawl_frontier': os.getenv('CRAWL_FRONTIER', 'priority'),
+    'crawl_trap_detection': os.getenv('CRAWL_TRAP_DETECTION', 'true').lower() == 'true',
+    'crawl_trap_template_cap': int(os.getenv('CRAWL_TRAP_TEMPLATE_CAP', '1000')),
+    'crawl_trap_sequence_cap': int(os.getenv('CRAWL_TRAP_SEQUENCE_CAP', '200')),
+    'html_extraction': os.getenv('HTML_EXTRACTION', 'full'),
+    'dedup_threshold': float(os.getenv('DEDUP_THRESHOLD', '0.95')),
+    'template_threshold': float(os.getenv('TEMPLATE_THRESHOLD', '0.5')),
+    'crawl_max_page_mb': float(os.getenv('CRAWL_MAX_PAGE_MB', '5')),
+    'crawl_checkpoint_dir': os.getenv('CRAWL_CHECKPOINT_DIR', ''),
+    'crawl_checkpoint_interval': float(os.getenv('CRAWL_CHECKPOINT_INTERVAL', '30')),
+    'crawl_warc_dir': os.getenv('CRAWL_WARC_DIR', ''),
     'chunk_size': 600,
     'chunk_overlap': 100,
     'embedding_dim': 384,  # all-MiniLM-L6-v2
@@ -109,57 +186,46 @@ class TextExtractor:
     """Extract text from various file formats."""
     
     @staticmethod
-    def from_html(html_content: str) -> str:
-        """Extract text from HTML."""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text
+    def from_html(html_content: str, text_mode: str = 'full') -> str:
+        """Extract text from HTML ('density' drops menus, sidebars and banners)."""
+        return parse_html(html_content, text_mode=text_mode).text
     
     @staticmethod
-    def from_pdf(file_path: str) -> str:
-        """Extract text from PDF."""
-        if PdfReader is None:
-            raise ImportError("pypdf not installed")
-        
-        reader = PdfReader(file_path)
-        text = []
-        
-        for page in reader.pages:
-            text.append(page.extract_text())
-        
-        return '\n\n'.join(text)
+    def from_pdf(file_path: str, workers: int = 1, max_pages: int = 0) -> str:
+        """Extract text from PDF, page ranges split across `workers` processes (0 = one per CPU)."""
+        return '\n\n'.join(segment.text for segment in TextExtractor.iter_pdf(file_path, workers, max_pages))
     
     @staticmethod
     def from_docx(file_path: str) -> str:
         """Extract text from DOCX."""
-        if Document is None:
-            raise ImportError("python-docx not installed")
-        
-        doc = Document(file_path)
-        text = []
-        
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-        
-        return '\n\n'.join(text)
+        return '\n\n'.join(segment.text for segment in TextExtractor.iter_docx(file_path))
     
     @staticmethod
     def from_txt(file_path: str) -> str:
         """Extract text from TXT."""
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read()
+    
+    @staticmethod
+    def iter_pdf(file_path: str, workers: int = 1, max_pages: int = 0, pool=None) -> Iterator[Segment]:
+        """Yield PDF pages as they are extracted, each with its page number."""
+        if PdfReader is None:
+            raise ImportError("pypdf not installed")
+        
+        return pdf_segments(file_path, workers, max_pages, pool)
+    
+    @staticmethod
+    def iter_docx(file_path: str) -> Iterator[Segment]:
+        """Yield DOCX paragraphs, each with its (page-break counted) page number."""
+        if Document is None:
+            raise ImportError("python-docx not installed")
+        
+        return docx_segments(file_path)
+    
+    @staticmethod
+    def iter_txt(file_path: str) -> Iterator[Segment]:
+        """Yield TXT paragraphs, read line by line."""
+        return text_segments(file_path)
 
 
 # =============================================================================
@@ -169,94 +235,301 @@ class TextExtractor:
 class WebCrawler:
     """Crawl website respecting robots.txt."""
     
-    def __init__(self, start_url: str, max_depth: int = 2):
+    USER_AGENT = USER_AGENT
+    
+    def __init__(self, start_url: str, max_depth: int = 2, fetcher: Optional[HttpFetcher] = None,
+                 cache: Optional[CrawlCache] = None, lastmod: Optional[Dict[str, str]] = None,
+                 discovery: str = 'links', max_sitemap_urls: int = 10000,
+                 visited_mode: str = 'hashed', robots: Optional[RobotsCache] = None,
+                 checkpoint: Optional[CrawlCheckpoint] = None, resume: bool = False,
+                 frontier_mode: str = 'priority', extraction: str = 'full',
+                 url_rules: Optional[UrlRules] = None, traps: Optional[TrapDetector] = None):
         self.start_url = start_url
         self.max_depth = max_depth
-        self.visited = set()
-        self.base_domain = urlparse(start_url).netloc
-        self.robot_parser = self._init_robots_parser()
-    
-    def _init_robots_parser(self) -> Optional[RobotFileParser]:
-        """Initialize robots.txt parser."""
-        if RobotFileParser is None:
-            logger.warning("robotexclusionrulesparser not installed")
-            return None
+        self.visited = VisitedSet(visited_mode)  # Every URL ever enqueued (canonical keys)
+        self.base_domain = urlparse(canonicalize(start_url) or start_url).netloc
+        self.fetcher = fetcher or get_default_fetcher()
+        self.cache = cache  # Revalidation cache from previous crawls
+        self.lastmod = {url_key(url): value for url, value in (lastmod or {}).items()}  # Sitemap <lastmod>
+        self.discovery = discovery  # 'links' (BFS) or 'sitemap'
+        self.max_sitemap_urls = max_sitemap_urls
+        self.checkpoint = checkpoint  # Journal of crawl progress, for resuming
+        self.resume = resume
+        # 'priority' (best-first by URL/link score) or 'fifo' (plain BFS)
+        self.prioritizer = CrawlPrioritizer() if frontier_mode == 'priority' else None
+        self.extraction = extraction  # Text mode: 'full' or 'density' (boilerplate removal)
+        self.url_rules = url_rules if url_rules else None  # Tenant include/exclude rules, checked before enqueue
+        self.traps = traps  # Crawler trap heuristics applied as links are enqueued
+        self.parse_pool: Optional[ParsePool] = None  # Worker processes for parse_html, while crawl_async runs
+        # robots.txt rules, shared with other crawls of this host for the cache TTL
+        if robots is None and (self.fetcher.recorder or self.fetcher.offline):
+            robots = RobotsCache()  # Archive/replay robots.txt itself, not a shared cached copy
+        self.robots = (robots or get_robots_cache()).rules_for(start_url, self.fetcher, self.USER_AGENT)
+        self.crawl_delay = self.robots.crawl_delay or 0.0
+        if self.crawl_delay:
+            logger.info(f"Honouring Crawl-delay of {self.crawl_delay}s")
         
-        try:
-            rp = RobotFileParser()
-            rp.set_url(f"{urlparse(self.start_url).scheme}://{self.base_domain}/robots.txt")
-            rp.read()
-            return rp
-        except Exception as e:
-            logger.error(f"Failed to read robots.txt: {e}")
-            return None
+        # With an adaptive limiter the fetcher paces requests; Crawl-delay caps its rate.
+        # Without one, only throttle when robots.txt asks.
+        limiter = self.fetcher.limiter
+        if limiter and self.crawl_delay:
+            limiter.set_ceiling(self.base_domain, 1 / self.crawl_delay)
+        # Replaying an archive touches no server, so there is nothing to be polite to
+        self.request_delay = 0.0 if limiter or self.fetcher.offline else self.crawl_delay
     
     def can_fetch(self, url: str) -> bool:
         """Check if URL can be fetched according to robots.txt."""
-        if self.robot_parser is None:
-            return True
+        return self.robots.can_fetch(url)
+    
+    def _empty_frontier(self) -> Frontier:
+        if self.prioritizer:
+            return self.prioritizer.frontier(self.visited, self.traps)
+        return Frontier(self.visited, self.traps)
+    
+    def score_url(self, url: str, depth: int) -> float:
+        """Crawl priority of a canonical URL (higher is fetched sooner)."""
+        if self.prioritizer:
+            return self.prioritizer.score(url, depth)
+        return -depth
+    
+    def new_frontier(self) -> Frontier:
+        """Seeded frontier: the BFS start URL, then sitemap URLs."""
+        frontier = self._empty_frontier()
+        # Link-following picks up anything the sitemap missed (the start URL is exempt from URL rules).
+        # Pushed first: sitemaps usually list it, and a seen URL cannot be re-queued at depth 0
+        frontier.push(self.start_url, 0)
+        if self.discovery == 'sitemap':
+            entries = sitemap.discover(
+                self.fetcher,
+                self.start_url,
+                self.robots.site_maps(),
+                headers={'User-Agent': self.USER_AGENT}
+            )
+            for entry in entries:
+                if not self._same_domain(entry.loc):
+                    continue
+                if self.url_rules and not self.url_rules.allows(entry.loc):
+                    continue
+                if entry.lastmod:
+                    self.lastmod[url_key(entry.loc)] = entry.lastmod
+                if self.prioritizer:
+                    self.prioritizer.note_sitemap(entry.loc, entry.priority)
+                # Seeded at max depth so their links are not followed; scored as depth 1 (see priority.py)
+                frontier.push(entry.loc, self.max_depth)
+                if len(frontier) >= self.max_sitemap_urls:
+                    break
+            logger.info(f"Seeded {len(frontier) - 1} URLs from sitemaps")
         
-        try:
-            return self.robot_parser.can_fetch("BiTBBot", url)
-        except:
-            return True
+        return frontier
+    
+    def start_frontier(self) -> Tuple[Frontier, List[Dict[str, str]]]:
+        """Frontier and pages so far: restored from the checkpoint on resume, else freshly seeded."""
+        if self.checkpoint and self.resume and self.checkpoint.exists():
+            frontier = self._empty_frontier()
+            return frontier, self.checkpoint.restore(frontier)
+        
+        frontier = self.new_frontier()
+        if self.checkpoint:
+            self.checkpoint.start(frontier)
+        return frontier, []
+    
+    def _same_domain(self, url: Optional[str]) -> bool:
+        """Check a canonical URL against the crawl domain."""
+        return url is not None and urlparse(url).netloc == self.base_domain
+    
+    def follow(self, links: List[str]) -> List[str]:
+        """Links allowed by the tenant's URL rules (never requested otherwise)."""
+        return self.url_rules.filter(links) if self.url_rules else links
+    
+    def allow(self, url: str) -> bool:
+        """Check domain and robots.txt before scheduling a URL."""
+        if not self._same_domain(url):
+            return False
+        
+        if not self.can_fetch(url):
+            logger.info(f"Skipping {url} (robots.txt)")
+            return False
+        
+        return True
+    
+    def _parse(self, html: str, url: str) -> ParsedHTML:
+        if self.parse_pool:
+            return self.parse_pool.parse(html, url, self.extraction)
+        return parse_html(html, url, text_mode=self.extraction)
+    
+    def fetch_page(self, url: str, depth: int) -> Tuple[Optional[Dict[str, str]], List[str]]:
+        """Fetch one URL and return (page or None, links for the next depth)."""
+        headers = {'User-Agent': self.USER_AGENT}
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached:
+            if self.cache.is_unchanged(cached, self.lastmod.get(url_key(url))):
+                logger.info(f"Unchanged per sitemap {url} (depth {depth})")
+                return self._from_cache(cached, depth)
+            headers.update(self.cache.request_headers(cached))
+        
+        logger.info(f"Crawling {url} (depth {depth})")
+        response = self.fetcher.fetch_html(url, headers=headers)
+        
+        if response.status_code == 304 and cached:
+            self.cache.revalidated(cached)
+            return self._from_cache(cached, depth)
+        
+        if response.status_code >= 400:
+            raise requests.HTTPError(f"{response.status_code} Error for url: {url}")
+        
+        # Non-HTML and oversized bodies are rejected while streaming
+        if response.html is None:
+            if response.rejected:
+                logger.info(f"Skipping {url} ({response.rejected})")
+            return None, []
+        
+        # One parse for text, links and canonical
+        parsed = self._parse(response.html, url)
+        text = parsed.text
+        
+        page = None
+        if text.strip():
+            page = {
+                'url': url,
+                'text': text,
+                'depth': depth
+            }
+            if self.extraction == 'density':
+                page['chars_removed'] = parsed.removed_chars
+                logger.info(f"Extracted {len(text)} chars from {url}, removed {parsed.removed_chars} boilerplate")
+        
+        # Same-domain links for next depth (kept when caching too, for later deeper visits)
+        links = [next_url for next_url in parsed.links if self._same_domain(next_url)]
+        followed = self.follow(links) if depth < self.max_depth else []
+        if self.prioritizer and followed:
+            self.prioritizer.note_links(text, followed, parsed.anchors, self.visited)
+        
+        # A page whose <link rel=canonical> was already seen is a duplicate
+        canonical = parsed.canonical
+        if (page and self._same_domain(canonical) and url_key(canonical) != url_key(url)
+                and not self.visited.add(canonical)):
+            logger.info(f"Skipping {url} (duplicate of {canonical})")
+            page = None
+        
+        if self.cache:
+            self.cache.store(url, response.headers, page, links)  # Unfiltered: rules may change by the next run
+        
+        return page, followed
+    
+    def _from_cache(self, entry: CacheEntry, depth: int) -> Tuple[Optional[Dict[str, str]], List[str]]:
+        """Rebuild (page, links) from a cache entry without parsing."""
+        page = dict(entry.page, depth=depth) if entry.page else None
+        followed = self.follow(entry.links) if depth < self.max_depth else []
+        if self.prioritizer and followed:
+            self.prioritizer.note_links(page['text'] if page else '', followed, {}, self.visited)
+        return page, followed
     
     def crawl(self) -> List[Dict[str, str]]:
         """Crawl website and extract content."""
-        queue = deque([(self.start_url, 0)])  # (url, depth)
-        pages = []
+        frontier, pages = self.start_frontier()  # Deduplicated at enqueue time
         
-        while queue:
-            url, depth = queue.popleft()
+        while frontier:
+            url, depth = frontier.pop()
             
             if depth > self.max_depth:
                 continue
             
-            if url in self.visited:
-                continue
-            
-            if urlparse(url).netloc != self.base_domain:
-                continue
-            
-            if not self.can_fetch(url):
-                logger.info(f"Skipping {url} (robots.txt)")
+            if not self.allow(url):
                 continue
             
             try:
-                logger.info(f"Crawling {url} (depth {depth})")
-                response = requests.get(url, timeout=10, headers={
-                    'User-Agent': 'BiTBBot/1.0'
-                })
-                response.raise_for_status()
+                page, links = self.fetch_page(url, depth)
                 
-                if 'text/html' not in response.headers.get('Content-Type', ''):
-                    continue
-                
-                # Extract text
-                text = TextExtractor.from_html(response.text)
+                if page:
+                    pages.append(page)
                 
-                if text.strip():
-                    pages.append({
-                        'url': url,
-                        'text': text,
-                        'depth': depth
-                    })
+                for next_url in links:
+                    frontier.push(next_url, depth + 1)
                 
-                self.visited.add(url)
-                
-                # Find links for next depth
-                if depth < self.max_depth:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    for link in soup.find_all('a', href=True):
-                        next_url = urljoin(url, link['href'])
-                        if next_url not in self.visited:
-                            queue.append((next_url, depth + 1))
+                if self.request_delay:
+                    time.sleep(self.request_delay)
                 
             except Exception as e:
                 logger.error(f"Error crawling {url}: {e}")
+                page, links = None, []
+            
+            if self.checkpoint:
+                self.checkpoint.record(url, depth, page, links)
+                self.checkpoint.maybe_snapshot(frontier)
         
         logger.info(f"Crawled {len(pages)} pages")
         return pages
+    
+    def crawl_async(self, concurrency: int = 8, per_host: int = 2,
+                    max_pages: Optional[int] = None, parse_workers: int = 0) -> List[Dict[str, str]]:
+        """Crawl website with concurrent fetches; same page dicts as crawl()."""
+        # Fork the parse pool before the engine starts its fetch threads
+        self.parse_pool = ParsePool(parse_workers) if parse_workers > 0 else None
+        engine = AsyncCrawlEngine(
+            self.fetch_page,
+            self.allow,
+            max_depth=self.max_depth,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            # A declared Crawl-delay means one request at a time per host
+            per_host=1 if self.crawl_delay else per_host,
+            host_delay=self.request_delay,
+            checkpoint=self.checkpoint
+        )
+        try:
+            pages = engine.run(*self.start_frontier())
+        finally:
+            if self.parse_pool:
+                self.parse_pool.close()
+                logger.info(f"Parsed {self.parse_pool.stats.pages} pages in {parse_workers} processes")
+                self.parse_pool = None
+        
+        logger.info(f"Crawled {len(pages)} pages ({concurrency} concurrent, {per_host} per host)")
+        return pages
+    
+    def _worker_crawler(self) -> 'WebCrawler':
+        """Crawler for a forked worker process, with its own connection pool and cache handle."""
+        cache = CrawlCache(str(self.cache.path.parent), self.cache.path.stem,
+                           self.cache.extractor) if self.cache else None
+        return WebCrawler(
+            self.start_url,
+            max_depth=self.max_depth,
+            fetcher=self.fetcher.clone(),
+            cache=cache,
+            lastmod=self.lastmod,
+            visited_mode=self.visited.mode,
+            frontier_mode='priority' if self.prioritizer else 'fifo',
+            extraction=self.extraction,
+            url_rules=self.url_rules.clone() if self.url_rules else None,
+            traps=self.traps.clone() if self.traps else None
+        )
+    
+    def crawl_distributed(self, workers: int, frontier_db: str, per_host: int = 2,
+                          max_pages: Optional[int] = None) -> List[Dict[str, str]]:
+        """Crawl with worker processes sharing a SQLite frontier; same page dicts as crawl()."""
+        Path(frontier_db).parent.mkdir(parents=True, exist_ok=True)
+        pages, worker_stats = distributed.crawl_distributed(
+            frontier_db,
+            self.new_frontier().pending(),
+            self._worker_crawler,
+            workers=workers,
+            score=self.score_url,
+            max_depth=self.max_depth,
+            max_pages=max_pages,
+            # Politeness is enforced across all workers through the shared frontier (and, with an
+            # adaptive limiter, its shared rate state): the same delay crawl() sleeps, per host slot
+            per_host=1 if self.crawl_delay else per_host,
+            host_delay=self.request_delay
+        )
+        for stats in worker_stats:
+            self.fetcher.stats.add(**stats['fetch'])
+            if self.url_rules and 'url_rules' in stats:
+                self.url_rules.merge(stats['url_rules'])
+            if self.traps and 'traps' in stats:
+                self.traps.merge(stats['traps'])
+        
+        logger.info(f"Crawled {len(pages)} pages ({workers} worker processes)")
+        return pages
 
 
 # =============================================================================
@@ -273,25 +546,50 @@ class TextChunker:
     
     def chunk_text(self, text: str, metadata: Dict = None) -> List[Dict]:
         """Chunk text into smaller pieces with overlap."""
-        tokens = self.encoder.encode(text)
+        return list(self.chunk_segments([Segment(text)], metadata))
+    
+    def chunk_segments(self, segments: Iterable[Segment], metadata: Dict = None) -> Iterator[Dict]:
+        """Chunk a stream of document segments, holding one chunk's tokens at a time.
         
-        if len(tokens) > CONFIG['max_tokens']:
-            logger.warning(f"Text too long ({len(tokens)} tokens), truncating")
-            tokens = tokens[:CONFIG['max_tokens']]
+        Chunks cut from paged segments carry metadata 'page' (and 'page_end' when they span pages).
+        """
+        stride = self.chunk_size - self.overlap
+        tokens, pages = [], []  # Window of tokens, with each token's page
+        total = 0
+        chunk_index = 0
         
-        chunks = []
-        for i in range(0, len(tokens), self.chunk_size - self.overlap):
-            chunk_tokens = tokens[i:i + self.chunk_size]
-            chunk_text = self.encoder.decode(chunk_tokens)
-            
-            chunk_data = {
-                'text': chunk_text,
-                'metadata': metadata or {},
-                'chunk_index': len(chunks)
+        def cut() -> Dict:
+            count = min(len(tokens), self.chunk_size)
+            chunk_metadata = dict(metadata or {})
+            if pages[0] is not None:
+                chunk_metadata['page'] = pages[0]
+                if pages[count - 1] != pages[0]:
+                    chunk_metadata['page_end'] = pages[count - 1]
+            return {
+                'text': self.encoder.decode(tokens[:count]),
+                'metadata': chunk_metadata,
+                'chunk_index': chunk_index
             }
-            chunks.append(chunk_data)
         
-        return chunks
+        for number, segment in enumerate(segments):
+            segment_tokens = self.encoder.encode(segment.text if number == 0 else '\n\n' + segment.text)
+            if total + len(segment_tokens) > CONFIG['max_tokens']:
+                logger.warning(f"Text too long (over {CONFIG['max_tokens']} tokens), truncating")
+                segment_tokens = segment_tokens[:CONFIG['max_tokens'] - total]
+            total += len(segment_tokens)
+            tokens.extend(segment_tokens)
+            pages.extend([segment.page] * len(segment_tokens))
+            while len(tokens) >= self.chunk_size:
+                yield cut()
+                chunk_index += 1
+                del tokens[:stride], pages[:stride]
+            if total >= CONFIG['max_tokens']:
+                break
+        
+        while tokens:
+            yield cut()
+            chunk_index += 1
+            del tokens[:stride], pages[:stride]
 
 
 # =============================================================================
@@ -431,41 +729,157 @@ class IngestionPipeline:
         )
         self.embedder = EmbeddingGenerator(mode=CONFIG['embedding_mode'])
         self.vector_store = FAISSVectorStore(trial_token)
+        fetch_config = FetchConfig(
+            max_body_bytes=int(CONFIG['crawl_max_page_mb'] * 1024 * 1024),
+            # Enough pooled connections for every concurrent fetch to one host
+            per_host_connections=max(FetchConfig.per_host_connections,
+                                     data_source.get('per_host', CONFIG['crawl_per_host']))
+        )
+        if data_source['type'] == 'replay':
+            # Re-crawl data_source['url'] from a recorded archive, no network I/O
+            self.fetcher = ReplayFetcher(data_source['archive'], fetch_config)
+        else:
+            warc_path = data_source.get('warc_path')
+            if not warc_path and CONFIG['crawl_warc_dir'] and data_source['type'] == 'url':
+                warc_path = str(Path(CONFIG['crawl_warc_dir']) / f"{trial_token}.warc.gz")
+            self.fetcher = HttpFetcher(
+                fetch_config,
+                limiter=AdaptiveRateLimiter(
+                    initial_rate=CONFIG['crawl_initial_rate'],
+                    max_rate=CONFIG['crawl_max_rate']
+                ) if CONFIG['crawl_adaptive_rate'] else None,
+                # A resumed crawl keeps the responses recorded before the interruption
+                recorder=WarcWriter(warc_path, append=data_source.get('resume', False)) if warc_path else None
+            )
+        # data_source 'include'/'exclude': URL rule lists, compiled once before any request
+        self.url_rules = UrlRules(data_source.get('include'), data_source.get('exclude'))
+        self.traps = None
+        if data_source.get('trap_detection', CONFIG['crawl_trap_detection']):
+            self.traps = TrapDetector(
+                data_source.get('trap_template_cap', CONFIG['crawl_trap_template_cap']),
+                data_source.get('trap_sequence_cap', CONFIG['crawl_trap_sequence_cap'])
+            )
+        self.crawl_cache = None
+        self.checkpoint = None
+        self.record_stats = RecordStats()
+        # Extracted text of uploads, by file content hash; re-uploads skip parsing
+        self.extraction_cache = None
+        extract_cache_dir = data_source.get('extract_cache_dir', CONFIG['extract_cache_dir'])
+        if data_source['type'] == 'files' and extract_cache_dir:
+            self.extraction_cache = ExtractionCache(
+                extract_cache_dir,
+                max_bytes=int(data_source.get('extract_cache_max_mb', CONFIG['extract_cache_max_mb']) * 1024 * 1024)
+            )
     
     def run(self) -> Dict:
         """Run the ingestion pipeline."""
         logger.info(f"Starting ingestion for trial {self.trial_token}")
         
+        timer = StageTimer()
         try:
-            # Step 1: Fetch content
-            pages = self._fetch_content()
-            logger.info(f"Fetched {len(pages)} pages/files")
+            # Step 1: Fetch content (uploads and records are chunked as they are read)
+            pages, all_chunks = [], None
+            with timer.stage('gather'):
+                if self.data_source['type'] in ('url', 'replay'):
+                    pages = self._crawl_website()
+                    page_count = len(pages)
+                else:
+                    page_count, all_chunks = self._read_documents()
+            logger.info(f"Fetched {page_count} pages/records")
+            
+            extraction_report = None
+            if self.data_source['type'] in ('url', 'replay') and any('chars_removed' in page for page in pages):
+                extraction_report = ExtractionReport.from_pages('density', pages)
+                logger.info(f"Removed {extraction_report.chars_removed} boilerplate chars "
+                            f"from {extraction_report.pages} pages")
+            
+            # Step 1b: Drop near-duplicate crawled pages before they are chunked and embedded
+            # (similar uploaded pages or records are content, not mirrors)
+            dedup_report = None
+            threshold = self.data_source.get('dedup_threshold', CONFIG['dedup_threshold'])
+            if self.data_source['type'] in ('url', 'replay') and threshold:
+                with timer.stage('dedup'):
+                    pages, dedup_report = NearDuplicateFilter(threshold).filter(pages)
+                # Roughly 0.75 words per cl100k token
+                dedup_report.estimate_chunks((self.chunker.chunk_size - self.chunker.overlap) * 0.75)
+                logger.info(f"Dropped {dedup_report.pages_dropped} near-duplicate pages "
+                            f"(~{dedup_report.chunks_avoided} chunks not embedded)")
+            
+            # Step 1c: Strip site-wide header/footer/CTA text repeated across crawled pages
+            # (a line repeated across PDF pages or records may well be content)
+            template_report = None
+            template_threshold = self.data_source.get('template_threshold', CONFIG['template_threshold'])
+            if self.data_source['type'] in ('url', 'replay') and template_threshold:
+                with timer.stage('templates'):
+                    pages, template_report = TemplateFilter(template_threshold).filter(pages)
+                template_report.estimate_chunks((self.chunker.chunk_size - self.chunker.overlap) * 0.75)
+                logger.info(f"Removed {template_report.chars_removed} chars of cross-page template text "
+                            f"(~{template_report.chunks_avoided} chunks not embedded)")
+                if not pages:
+                    raise ValueError("No content left after template removal")
             
-            # Step 2: Chunk text
-            all_chunks = []
-            for page in pages:
-                chunks = self.chunker.chunk_text(
-                    page['text'],
-                    metadata={'url': page.get('url', ''), 'source': page.get('source', '')}
-                )
-                all_chunks.extend(chunks)
+            # Step 2: Chunk crawled pages
+            if all_chunks is None:
+                all_chunks = []
+                with timer.stage('chunk'):
+                    for page in pages:
+                        chunks = self.chunker.chunk_text(
+                            page['text'],
+                            metadata={'url': page.get('url', ''), 'source': page.get('source', '')}
+                        )
+                        all_chunks.extend(chunks)
+                page_count = len(pages)
+            if not all_chunks:
+                raise ValueError("No content extracted")
             
             logger.info(f"Created {len(all_chunks)} chunks")
             
             # Step 3: Generate embeddings
             texts = [chunk['text'] for chunk in all_chunks]
-            embeddings = self.embedder.generate(texts)
+            with timer.stage('embed'):
+                embeddings = self.embedder.generate(texts)
             
             # Step 4: Store in FAISS
-            self.vector_store.create_index(embeddings, all_chunks)
-            self.vector_store.save()
+            with timer.stage('index'):
+                self.vector_store.create_index(embeddings, all_chunks)
+                self.vector_store.save()
             
-            return {
+            # Indexed: nothing left to resume
+            if self.checkpoint:
+                self.checkpoint.clear()
+            
+            result = {
                 'status': 'completed',
-                'pages_processed': len(pages),
+                'pages_processed': page_count,
                 'chunks_created': len(all_chunks),
-                'trial_token': self.trial_token
+                'trial_token': self.trial_token,
+                'timings': timer.as_dict()
             }
+            if extraction_report:
+                result['extraction'] = extraction_report.as_dict()
+            if dedup_report:
+                result['dedup'] = dedup_report.as_dict()
+            if template_report:
+                result['templates'] = template_report.as_dict()
+            if self.extraction_cache:
+                result['extraction_cache'] = self.extraction_cache.stats.as_dict()
+            if self.data_source['type'] == 'records':
+                result['records'] = self.record_stats.as_dict()
+            if self.data_source['type'] == 'replay':
+                result['replay'] = self.fetcher.replay.as_dict()
+            elif self.fetcher.recorder:
+                result['warc'] = {'path': self.fetcher.recorder.path, 'bytes': os.path.getsize(self.fetcher.recorder.path)}
+            if self.data_source['type'] in ('url', 'replay'):
+                result['fetch_stats'] = self.fetcher.stats.as_dict()
+                if self.fetcher.limiter:
+                    result['rate_limits'] = self.fetcher.limiter.as_dict()
+                if self.crawl_cache:
+                    result['crawl_cache'] = self.crawl_cache.stats.as_dict()
+                if self.url_rules:
+                    result['url_rules'] = self.url_rules.as_dict()
+                if self.traps:
+                    result['traps'] = self.traps.as_dict()
+            return result
             
         except Exception as e:
             logger.error(f"Ingestion failed: {e}", exc_info=True)
@@ -474,12 +888,12 @@ class IngestionPipeline:
                 'error': str(e)
             }
     
-    def _fetch_content(self) -> List[Dict]:
-        """Fetch content based on data source type."""
-        if self.data_source['type'] == 'url':
-            return self._crawl_website()
-        elif self.data_source['type'] == 'files':
+    def _read_documents(self) -> Tuple[int, List[Dict]]:
+        """(pages or records read, chunks) of an uploaded files or records data source."""
+        if self.data_source['type'] == 'files':
             return self._process_files()
+        elif self.data_source['type'] == 'records':
+            return self._process_records()
         else:
             raise ValueError(f"Invalid data source type: {self.data_source['type']}")
     
@@ -488,45 +902,151 @@ class IngestionPipeline:
         url = self.data_source.get('url')
         depth = self.data_source.get('crawl_depth', 2)
         
-        crawler = WebCrawler(url, max_depth=depth)
+        # Recording needs full responses (no 304s); a replay is served from the archive
+        extraction = self.data_source.get('extraction', CONFIG['html_extraction'])
+        cache_dir = self.data_source.get('crawl_cache_dir', CONFIG['crawl_cache_dir'])
+        if cache_dir and not self.fetcher.recorder and not self.fetcher.offline:
+            self.crawl_cache = CrawlCache(cache_dir, urlparse(url).netloc, extractor_version(extraction))
+        
+        checkpoint_dir = self.data_source.get('checkpoint_dir', CONFIG['crawl_checkpoint_dir'])
+        if checkpoint_dir:
+            self.checkpoint = CrawlCheckpoint(
+                checkpoint_dir,
+                f"{self.trial_token}-{urlparse(url).netloc}",
+                interval=CONFIG['crawl_checkpoint_interval']
+            )
+        
+        crawler = WebCrawler(
+            url,
+            max_depth=depth,
+            fetcher=self.fetcher,
+            cache=self.crawl_cache,
+            discovery=self.data_source.get('discovery', CONFIG['crawl_discovery']),
+            visited_mode=self.data_source.get('visited', CONFIG['crawl_visited']),
+            checkpoint=self.checkpoint,
+            resume=self.data_source.get('resume', False),
+            frontier_mode=self.data_source.get('frontier', CONFIG['crawl_frontier']),
+            extraction=extraction,
+            url_rules=self.url_rules,
+            traps=self.traps
+        )
+        workers = self.data_source.get('workers', CONFIG['crawl_workers'])
+        if workers > 1:
+            return crawler.crawl_distributed(
+                workers,
+                self.data_source.get('frontier_db') or str(CONFIG['data_dir'] / 'frontier' / f"{self.trial_token}.sqlite"),
+                per_host=self.data_source.get('per_host', CONFIG['crawl_per_host']),
+                max_pages=self.data_source.get('max_pages')
+            )
+        if self.data_source.get('async_crawl', CONFIG['crawl_async']):
+            return crawler.crawl_async(
+                concurrency=self.data_source.get('concurrency', CONFIG['crawl_concurrency']),
+                per_host=self.data_source.get('per_host', CONFIG['crawl_per_host']),
+                max_pages=self.data_source.get('max_pages'),
+                parse_workers=self.data_source.get('parse_workers', CONFIG['crawl_parse_workers'])
+            )
         return crawler.crawl()
     
-    def _process_files(self) -> List[Dict]:
-        """Process uploaded files."""
-        files = self.data_source.get('files', [])
-        pages = []
+    def _process_files(self) -> Tuple[int, List[Dict]]:
+        """Extract and chunk uploaded files (paths, directories or globs), several at a time; (pages, chunks)."""
+        files, skipped = plan_files(
+            expand_inputs(self.data_source.get('files', [])),
+            max_bytes=int(CONFIG['max_file_size_mb'] * 1024 * 1024)
+        )
+        for file_path, reason in skipped:
+            logger.warning(f"Skipping {file_path}: {reason}")
+        
+        workers = max(1, min(self.data_source.get('file_workers', CONFIG['file_workers']), len(files)))
+        logger.info(f"Processing {len(files)} files ({workers} at a time)")
+        # Files in flight share one pool of PDF page workers, forked before the file threads start
+        pdf_workers = resolve_workers(self.data_source.get('pdf_workers', CONFIG['pdf_workers']))
+        has_pdfs = PdfReader is not None and any(Path(file_path).suffix.lower() == '.pdf' for file_path in files)
+        pdf_pool = start_pool(pdf_workers) if has_pdfs else None
+        pages, chunks = 0, []
+        
+        try:
+            work = partial(self._process_file, pdf_workers=pdf_workers, pdf_pool=pdf_pool)
+            for file_path, result, error in map_ordered(work, files, workers):
+                if error is not None:
+                    logger.error(f"Error processing {file_path}: {error}")
+                elif result is not None:
+                    pages += result[0]
+                    chunks.extend(result[1])
+        finally:
+            if pdf_pool:
+                pdf_pool.shutdown(cancel_futures=True)
+        
+        return pages, chunks
+    
+    def _process_records(self) -> Tuple[int, List[Dict]]:
+        """Stream records from JSON array / JSONL / CSV files into the chunker; (records, chunks).
+        
+        data_source: 'files', plus optional 'format', 'text_fields', 'title_field',
+        'url_field' and 'metadata_fields' (see bitb_ingest.records.RecordMapping).
+        """
+        files = list(expand_inputs(self.data_source.get('files', [])))
+        mapping = RecordMapping(
+            self.data_source.get('text_fields'),
+            self.data_source.get('title_field'),
+            self.data_source.get('url_field', 'url'),
+            self.data_source.get('metadata_fields')
+        )
+        chunks = []
         
         for file_path in files:
             try:
-                path = Path(file_path)
-                
-                # Check file size
-                size_mb = path.stat().st_size / (1024 * 1024)
-                if size_mb > CONFIG['max_file_size_mb']:
-                    logger.warning(f"File too large: {file_path} ({size_mb:.1f}MB)")
-                    continue
-                
-                # Extract text based on extension
-                ext = path.suffix.lower()
-                if ext == '.pdf':
-                    text = TextExtractor.from_pdf(str(path))
-                elif ext == '.docx':
-                    text = TextExtractor.from_docx(str(path))
-                elif ext in ['.txt', '.html']:
-                    text = TextExtractor.from_txt(str(path))
-                else:
-                    logger.warning(f"Unsupported file type: {ext}")
-                    continue
-                
-                pages.append({
-                    'text': text,
-                    'source': path.name
-                })
-                
+                for number, record in enumerate(iter_records(file_path, self.data_source.get('format'), self.record_stats)):
+                    mapped = mapping.apply(record)
+                    if mapped is None:
+                        self.record_stats.add(skipped_empty=1)
+                        continue
+                    self.record_stats.add(ingested=1)
+                    # Each record is chunked on its own as it is read, even when records share a URL
+                    metadata = {'title': mapped.title, **mapped.metadata} if mapped.title else mapped.metadata
+                    chunks.extend(self.chunker.chunk_segments(
+                        [Segment(mapped.text)],
+                        metadata={'url': mapped.url, 'source': os.path.basename(file_path), **metadata}
+                    ))
             except Exception as e:
-                logger.error(f"Error processing {file_path}: {e}")
+                logger.error(f"Error reading records from {file_path}: {e}")
         
-        return pages
+        logger.info(f"{self.record_stats.ingested} of {self.record_stats.records} records from {len(files)} files have text")
+        return self.record_stats.ingested, chunks
+    
+    def _process_file(self, file_path: str, pdf_workers: int, pdf_pool=None) -> Optional[Tuple[int, List[Dict]]]:
+        """(pages, chunks) of one file (None if its type is unsupported)."""
+        path = Path(file_path)
+        
+        # Stream segments based on extension
+        ext = path.suffix.lower()
+        extractor = None  # Set for the formats worth caching
+        if ext == '.pdf':
+            max_pages = self.data_source.get('pdf_max_pages', CONFIG['pdf_max_pages'])
+            segments = TextExtractor.iter_pdf(str(path), workers=pdf_workers, max_pages=max_pages, pool=pdf_pool)
+            extractor = extractor_version('pdf', max_pages=max_pages)
+        elif ext == '.docx':
+            segments = TextExtractor.iter_docx(str(path))
+            extractor = extractor_version('docx')
+        elif ext in ['.txt', '.html']:
+            segments = TextExtractor.iter_txt(str(path))
+        else:
+            logger.warning(f"Unsupported file type: {ext}")
+            return None
+        
+        # An unchanged file seen before is not parsed at all
+        if self.extraction_cache and extractor:
+            segments = self.extraction_cache.segments(str(path), extractor, segments)
+        
+        # Segments go straight into the chunker: only the file's chunks are held, never its text
+        pages = set()
+        
+        def counted():
+            for segment in segments:
+                pages.add(segment.page)
+                yield segment
+        
+        chunks = list(self.chunker.chunk_segments(counted(), metadata={'url': '', 'source': path.name}))
+        return len(pages), chunks
 
 
 # =============================================================================
@@ -571,6 +1091,8 @@ def main():
     parser.add_argument('--job-id', type=str, help='Job ID')
     parser.add_argument('--trial-token', type=str, help='Trial token')
     parser.add_argument('--data-source-file', type=str, help='Path to data source JSON')
+    parser.add_argument('--resume', action='store_true', help='Resume an interrupted crawl from CRAWL_CHECKPOINT_DIR')
+    parser.add_argument('--replay', type=str, help='Re-crawl the data source URL from this .warc.gz archive')
     parser.add_argument('--purge', action='store_true', help='Purge expired trials')
     
     args = parser.parse_args()
@@ -586,6 +1108,10 @@ def main():
     # Load data source
     with open(args.data_source_file, 'r') as f:
         data_source = json.load(f)
+    if args.resume:
+        data_source['resume'] = True
+    if args.replay:
+        data_source.update(type='replay', archive=args.replay)
     
     # Run ingestion
     pipeline = IngestionPipeline(args.trial_token, data_source)
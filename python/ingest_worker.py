@@ -12,7 +12,14 @@ This worker handles:
 
 Usage:
     python ingest_worker.py --url https://bitb.ltd --token preview --depth 2
+    python ingest_worker.py --url https://bitb.ltd --token preview --async-crawl --concurrency 16
+    python ingest_worker.py --url https://bitb.ltd --token preview --workers 4 --frontier-db ./data/frontier/preview.sqlite
+    python ingest_worker.py --url https://bitb.ltd --token preview --join --frontier-db ./data/frontier/preview.sqlite
+    python ingest_worker.py --url https://bitb.ltd --token preview --checkpoint-dir ./data/checkpoints --resume
+    python ingest_worker.py --url https://bitb.ltd --token preview --include '/docs/**' --exclude '?sort'
     python ingest_worker.py --files doc1.pdf doc2.txt --token tr_abc123
+    python ingest_worker.py --records ../data/bitb-knowledge.json --token preview
+    python ingest_worker.py --records faq.csv --text-field question --text-field answer --token tr_abc123
 """
 
 import os
@@ -20,18 +27,44 @@ import sys
 import json
 import time
 import hashlib
+import socket
 import argparse
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
-from urllib.parse import urljoin, urlparse
-from urllib.robotparser import RobotFileParser
+from functools import partial
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+from dataclasses import dataclass
+from urllib.parse import urlparse
 
 # Core dependencies
 import requests
-from bs4 import BeautifulSoup
 import numpy as np
 import faiss
 
+# Shared crawl/ingest building blocks (python/bitb_ingest)
+from bitb_ingest.async_crawl import AsyncCrawlEngine
+from bitb_ingest.fetch import USER_AGENT, FetchConfig, HttpFetcher, get_default_fetcher
+from bitb_ingest.crawl_cache import CrawlCache, CacheEntry
+from bitb_ingest.checkpoint import CrawlCheckpoint
+from bitb_ingest import distributed, sitemap
+from bitb_ingest.frontier import Frontier, VisitedSet, canonicalize, url_key
+from bitb_ingest.dedup import NearDuplicateFilter
+from bitb_ingest.boilerplate import TemplateFilter
+from bitb_ingest.content import ExtractionReport
+from bitb_ingest import documents, pdf_extract
+from bitb_ingest.documents import Segment, docx_segments, extractor_version, pdf_segments, text_segments
+from bitb_ingest.extract_cache import ExtractionCache
+from bitb_ingest.file_batch import expand_inputs, map_ordered, plan_files
+from bitb_ingest.html_parse import ParsedHTML, extractor_version, parse_html
+from bitb_ingest.parse_pool import ParsePool
+from bitb_ingest.pdf_extract import resolve_workers, start_pool
+from bitb_ingest.priority import CrawlPrioritizer
+from bitb_ingest.robots import RobotsCache, get_robots_cache
+from bitb_ingest.ratelimit import AdaptiveRateLimiter
+from bitb_ingest.records import RECORD_FORMATS, RecordMapping, RecordStats, iter_records
+from bitb_ingest.timing import StageTimer
+from bitb_ingest.traps import TrapDetector
+from bitb_ingest.url_rules import UrlRules
+from bitb_ingest.warc import ReplayFetcher, WarcWriter
+
 # Embedding - sentence-transformers (local) or HF API (fallback)
 try:
     from sentence_transformers import SentenceTransformer
@@ -40,14 +73,13 @@ except ImportError:
     print("[Warning] sentence-transformers not installed. Will use HF API fallback.")
     HAS_LOCAL_EMBEDDINGS = False
 
-# Document parsing
-try:
-    import PyPDF2
-    from docx import Document
-    HAS_DOC_PARSING = True
-except ImportError:
-    print("[Warning] PyPDF2 or python-docx not installed. PDF/DOCX parsing disabled.")
-    HAS_DOC_PARSING = False
+# Document parsing (pypdf / python-docx, imported by bitb_ingest)
+HAS_PDF_PARSING = pdf_extract.PdfReader is not None
+HAS_DOCX_PARSING = documents.Document is not None
+if not HAS_PDF_PARSING:
+    print("[Warning] pypdf not installed. PDF parsing disabled.")
+if not HAS_DOCX_PARSING:
+    print("[Warning] python-docx not installed. DOCX parsing disabled.")
 
 
 # =============================================================================
@@ -58,9 +90,20 @@ except ImportError:
 class IngestConfig:
     """Configuration for ingestion job"""
     trial_token: str
-    source_type: str  # 'url' or 'files'
+    source_type: str  # 'url', 'files', 'records' (JSON/JSONL/CSV in source_files) or 'replay' (re-crawl source_url from warc_path)
     source_url: Optional[str] = None
-    source_files: Optional[List[str]] = None
+    source_files: Optional[List[str]] = None  # Paths, directories or glob patterns
+    file_workers: int = 4  # Files extracted concurrently
+    max_file_mb: float = 0.0  # Uploaded files larger than this are skipped (0 = no limit)
+    records_format: Optional[str] = None  # 'json' (array), 'jsonl' or 'csv' for 'records' (default: by extension)
+    record_text_fields: Optional[List[str]] = None  # Joined into chunk text (default: first of content/text/body/answer)
+    record_title_field: Optional[str] = None  # Chunk title (default: first of title/question/name)
+    record_url_field: str = 'url'  # Citation URL
+    record_metadata_fields: Optional[List[str]] = None  # Kept on chunks (default: other short scalar fields)
+    pdf_workers: int = 0  # Processes extracting PDF pages, shared by the job's files (0 = one per CPU, 1 = in-process)
+    pdf_max_pages: int = 0  # Extract at most this many pages per PDF (0 = all)
+    extract_cache_dir: Optional[str] = None  # Cache extracted PDF/DOCX text here by file hash
+    extract_cache_max_mb: float = 512.0  # Compressed size cap for extract_cache_dir (LRU eviction)
     crawl_depth: int = 2
     max_pages: int = 50
     chunk_size: int = 600  # tokens
@@ -69,6 +112,32 @@ class IngestConfig:
     use_hf_api: bool = False
     hf_api_key: Optional[str] = None
     faiss_index_path: str = "./data/faiss_indices"
+    crawl_cache_dir: Optional[str] = None  # Enables conditional recrawls when set
+    discovery: str = 'links'  # 'links' (BFS) or 'sitemap' (sitemap first, BFS fallback)
+    visited_mode: str = 'hashed'  # Seen-URL store: 'exact', 'hashed' or 'bloom'
+    dedup_threshold: float = 0.95  # SimHash similarity for dropping near-duplicate crawled pages (0 = off)
+    template_threshold: float = 0.5  # Strip lines found on this fraction of crawled pages (0 = off)
+    max_page_mb: float = 5.0  # Crawled pages larger than this are aborted mid-download (0 = no limit)
+    checkpoint_dir: Optional[str] = None  # Journal crawl progress here so a crash can be resumed
+    checkpoint_interval: float = 30.0  # Max seconds between frontier snapshots
+    resume: bool = False  # Continue from the checkpoint left by an interrupted run
+    crawl_workers: int = 1  # >1 crawls with worker processes sharing a SQLite frontier
+    frontier_db: Optional[str] = None  # Shared frontier file (default ./data/frontier/<token>.sqlite)
+    frontier: str = 'priority'  # 'priority' (best-first) or 'fifo' (breadth-first)
+    warc_path: Optional[str] = None  # WARC archive: recorded when crawling, read when replaying
+    extraction: str = 'main'  # Page text: 'main' (main/article/body) or 'density' (readability-style)
+    include_urls: Optional[List[str]] = None  # Only crawl URLs matching one of these rules (e.g. '/docs/**')
+    exclude_urls: Optional[List[str]] = None  # Never request URLs matching these (e.g. '/cart', '?sort')
+    trap_detection: bool = True  # Skip calendar/pagination/session-id/looping URL spaces
+    trap_template_cap: int = 1000  # Max distinct URLs sharing one URL template (trap_detection)
+    trap_sequence_cap: int = 200  # Max values of one pagination/date parameter per template (trap_detection)
+    adaptive_rate: bool = True  # Per-host adaptive rate limit instead of a fixed 0.5s delay
+    initial_rate: float = 2.0  # Starting requests/second per host (adaptive_rate)
+    max_rate: float = 10.0  # Requests/second ceiling per host (adaptive_rate)
+    async_crawl: bool = False  # Use the concurrent crawl engine
+    crawl_concurrency: int = 8  # Max in-flight fetches (async_crawl)
+    per_host_concurrency: int = 2  # Max in-flight fetches per host (async_crawl, crawl_workers)
+    parse_workers: int = 0  # >0 parses crawled HTML in this many processes (async_crawl)
 
 
 # =============================================================================
@@ -78,139 +147,333 @@ class IngestConfig:
 class WebsiteCrawler:
     """Crawls websites respecting robots.txt"""
     
-    def __init__(self, base_url: str, max_depth: int = 2, max_pages: int = 50):
+    USER_AGENT = USER_AGENT
+    DEFAULT_DELAY = 0.5  # Seconds between requests when robots.txt sets no Crawl-delay
+    
+    def __init__(self, base_url: str, max_depth: int = 2, max_pages: int = 50,
+                 fetcher: Optional[HttpFetcher] = None, cache: Optional[CrawlCache] = None,
+                 lastmod: Optional[Dict[str, str]] = None, discovery: str = 'links',
+                 visited_mode: str = 'hashed', robots: Optional[RobotsCache] = None,
+                 checkpoint: Optional[CrawlCheckpoint] = None, resume: bool = False,
+                 frontier_mode: str = 'priority', extraction: str = 'main',
+                 url_rules: Optional[UrlRules] = None, traps: Optional[TrapDetector] = None):
         self.base_url = base_url
+        self.base_domain = urlparse(canonicalize(base_url) or base_url).netloc
         self.max_depth = max_depth
         self.max_pages = max_pages
-        self.visited = set()
-        self.robot_parser = RobotFileParser()
+        self.visited = VisitedSet(visited_mode)  # Every URL ever enqueued (canonical keys)
+        self.fetcher = fetcher or get_default_fetcher()
+        self.cache = cache  # Revalidation cache from previous crawls
+        self.lastmod = {url_key(url): value for url, value in (lastmod or {}).items()}  # Sitemap <lastmod>
+        self.discovery = discovery  # 'links' (BFS) or 'sitemap'
+        self.checkpoint = checkpoint  # Journal of crawl progress, for resuming
+        self.resume = resume
+        # 'priority' (best-first by URL/link score) or 'fifo' (plain BFS)
+        self.prioritizer = CrawlPrioritizer() if frontier_mode == 'priority' else None
+        self.extraction = extraction  # Text mode: 'main' (main/article/body) or 'density' (boilerplate removal)
+        self.url_rules = url_rules if url_rules else None  # Tenant include/exclude rules, checked before enqueue
+        self.traps = traps  # Crawler trap heuristics applied as links are enqueued
+        self.parse_pool: Optional[ParsePool] = None  # Worker processes for parse_html, while crawl_async runs
         
-        # Initialize robots.txt parser
-        try:
-            robots_url = urljoin(base_url, '/robots.txt')
-            self.robot_parser.set_url(robots_url)
-            self.robot_parser.read()
-        except Exception as e:
-            print(f"[Warning] Could not read robots.txt: {e}")
+        # robots.txt rules, shared with other crawls of this host for the cache TTL
+        if robots is None and (self.fetcher.recorder or self.fetcher.offline):
+            robots = RobotsCache()  # Archive/replay robots.txt itself, not a shared cached copy
+        self.robots = (robots or get_robots_cache()).rules_for(base_url, self.fetcher, self.USER_AGENT)
+        
+        # Declared Crawl-delay replaces the default politeness delay
+        self.crawl_delay = self.robots.crawl_delay if self.robots.crawl_delay is not None else self.DEFAULT_DELAY
+        if self.robots.crawl_delay is not None:
+            print(f"[Robots] Crawl-delay: {self.crawl_delay}s")
+        
+        # With an adaptive limiter the fetcher paces requests; Crawl-delay caps its rate
+        limiter = self.fetcher.limiter
+        if limiter and self.robots.crawl_delay:
+            limiter.set_ceiling(self.base_domain, 1 / self.robots.crawl_delay)
+        # Replaying an archive touches no server, so there is nothing to be polite to
+        self.request_delay = 0.0 if limiter or self.fetcher.offline else self.crawl_delay
     
     def can_fetch(self, url: str) -> bool:
         """Check if URL can be fetched according to robots.txt"""
-        try:
-            return self.robot_parser.can_fetch("BitBBot", url)
-        except:
-            return True  # If error, allow fetch
+        return self.robots.can_fetch(url)
     
     def is_same_domain(self, url: str) -> bool:
         """Check if URL belongs to same domain"""
-        base_domain = urlparse(self.base_url).netloc
-        url_domain = urlparse(url).netloc
-        return base_domain == url_domain
+        canonical = canonicalize(url)
+        return canonical is not None and urlparse(canonical).netloc == self.base_domain
     
     def extract_links(self, html: str, current_url: str) -> List[str]:
-        """Extract all valid links from HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
-        links = []
-        
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-            absolute_url = urljoin(current_url, href)
-            
-            # Filter valid links
-            if (self.is_same_domain(absolute_url) and 
-                absolute_url.startswith('http') and
-                '#' not in absolute_url.split('/')[-1]):
-                links.append(absolute_url)
-        
-        return list(set(links))  # Remove duplicates
+        """Extract all valid links from HTML as canonical URLs"""
+        links = parse_html(html, current_url).links
+        return [link for link in links if urlparse(link).netloc == self.base_domain]
     
     def extract_text(self, html: str) -> str:
         """Extract main content text from HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Try to find main content area
-        main_content = (
-            soup.find('main') or 
-            soup.find('article') or 
-            soup.find('div', class_='content') or 
-            soup.find('body')
-        )
+        return parse_html(html, text_mode=self.extraction).text
+    
+    def follow(self, links: List[str]) -> List[str]:
+        """Links allowed by the tenant's URL rules (never requested otherwise)"""
+        return self.url_rules.filter(links) if self.url_rules else links
+    
+    def _empty_frontier(self) -> Frontier:
+        if self.prioritizer:
+            return self.prioritizer.frontier(self.visited, self.traps)
+        return Frontier(self.visited, self.traps)
+    
+    def score_url(self, url: str, depth: int) -> float:
+        """Crawl priority of a canonical URL (higher is fetched sooner)"""
+        if self.prioritizer:
+            return self.prioritizer.score(url, depth)
+        return -depth
+    
+    def new_frontier(self) -> Frontier:
+        """Seeded frontier: the BFS start URL, then sitemap URLs"""
+        frontier = self._empty_frontier()
+        # Link-following fills whatever budget the sitemap leaves (the start URL is exempt from URL rules).
+        # Pushed first: sitemaps usually list it, and a seen URL cannot be re-queued at depth 0
+        frontier.push(self.base_url, 0)
+        if self.discovery == 'sitemap':
+            entries = sitemap.discover(
+                self.fetcher,
+                self.base_url,
+                self.robots.site_maps(),
+                headers={'User-Agent': self.USER_AGENT}
+            )
+            for entry in entries:
+                if not self.is_same_domain(entry.loc):
+                    continue
+                if self.url_rules and not self.url_rules.allows(entry.loc):
+                    continue
+                if entry.lastmod:
+                    self.lastmod[url_key(entry.loc)] = entry.lastmod
+                if self.prioritizer:
+                    self.prioritizer.note_sitemap(entry.loc, entry.priority)
+                # Seeded at max depth so their links are not followed; scored as depth 1 (see priority.py)
+                frontier.push(entry.loc, self.max_depth)
+                if len(frontier) >= self.max_pages * 2:  # Headroom for thin/blocked pages
+                    break
+            print(f"[Sitemap] Seeded {len(frontier) - 1} URLs")
         
-        if main_content:
-            text = main_content.get_text(separator='\n', strip=True)
-        else:
-            text = soup.get_text(separator='\n', strip=True)
+        return frontier
+    
+    def start_frontier(self) -> Tuple[Frontier, List[Dict]]:
+        """Frontier and pages so far: restored from the checkpoint on resume, else freshly seeded"""
+        if self.checkpoint and self.resume and self.checkpoint.exists():
+            frontier = self._empty_frontier()
+            pages = self.checkpoint.restore(frontier)
+            print(f"[Resume] {len(pages)} pages from checkpoint, {len(frontier)} URLs queued")
+            return frontier, pages
+        
+        frontier = self.new_frontier()
+        if self.checkpoint:
+            self.checkpoint.start(frontier)
+        return frontier, []
+    
+    def allow(self, url: str) -> bool:
+        """Check robots.txt before scheduling a URL"""
+        if not self.can_fetch(url):
+            print(f"[Skip] Robots.txt disallows: {url}")
+            return False
+        return True
+    
+    def _parse(self, html: str, url: str) -> ParsedHTML:
+        if self.parse_pool:
+            return self.parse_pool.parse(html, url, self.extraction)
+        return parse_html(html, url, text_mode=self.extraction)
+    
+    def fetch_page(self, url: str, depth: int) -> Tuple[Optional[Dict], List[str]]:
+        """Fetch one URL and return (page data or None, links for next level)"""
+        headers = {'User-Agent': self.USER_AGENT}
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached:
+            if self.cache.is_unchanged(cached, self.lastmod.get(url_key(url))):
+                print(f"[Cache] {url} unchanged per sitemap (depth: {depth})")
+                return self._from_cache(cached, depth)
+            headers.update(self.cache.request_headers(cached))
+        
+        print(f"[Crawl] {url} (depth: {depth})")
+        response = self.fetcher.fetch_html(url, headers=headers)
         
-        # Clean up whitespace
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        return '\n'.join(lines)
+        if response.status_code == 304 and cached:
+            self.cache.revalidated(cached)
+            return self._from_cache(cached, depth)
+        
+        # Non-200, non-HTML or oversized bodies are never parsed
+        if response.html is None:
+            if response.rejected:
+                print(f"[Skip] {url} ({response.rejected})")
+            return None, []
+        
+        # One parse for text, title, links and canonical
+        parsed = self._parse(response.html, url)
+        text = parsed.text
+        if self.extraction == 'density':
+            print(f"[Extract] {url}: kept {len(text)} chars, removed {parsed.removed_chars} boilerplate")
+        
+        page = None
+        if text and len(text) > 100:  # Minimum content threshold
+            page = {
+                'url': url,
+                'title': parsed.title or 'Untitled',
+                'text': text,
+                'depth': depth,
+                'timestamp': int(time.time())
+            }
+            if self.extraction == 'density':
+                page['chars_removed'] = parsed.removed_chars
+        
+        # Honour <link rel=canonical>: a page whose canonical was already seen is a duplicate
+        canonical = parsed.canonical
+        if (page and canonical and self.is_same_domain(canonical)
+                and url_key(canonical) != url_key(url) and not self.visited.add(canonical)):
+            print(f"[Skip] Duplicate of canonical {canonical}: {url}")
+            page = None
+        
+        # Same-domain links (kept when caching too, for later deeper visits)
+        links = [link for link in parsed.links if urlparse(link).netloc == self.base_domain]
+        if self.cache:
+            self.cache.store(url, response.headers, page, links)  # Unfiltered: rules may change by the next run
+        if depth >= self.max_depth:
+            return page, []
+        
+        links = self.follow(links)
+        if self.prioritizer:
+            self.prioritizer.note_links(text, links, parsed.anchors, self.visited)
+        return page, links
+    
+    def _from_cache(self, entry: CacheEntry, depth: int) -> Tuple[Optional[Dict], List[str]]:
+        """Rebuild (page data, links) from a cache entry without parsing"""
+        page = None
+        if entry.page:
+            page = dict(entry.page, depth=depth, timestamp=int(time.time()))
+        if depth >= self.max_depth:
+            return page, []
+        
+        links = self.follow(entry.links)
+        if self.prioritizer:
+            self.prioritizer.note_links(page['text'] if page else '', links, {}, self.visited)
+        return page, links
     
     def crawl(self) -> List[Dict]:
         """Crawl website and return list of page data"""
-        to_visit = [(self.base_url, 0)]  # (url, depth)
-        crawled_pages = []
+        frontier, crawled_pages = self.start_frontier()  # Deduplicated at enqueue time
         
-        while to_visit and len(crawled_pages) < self.max_pages:
-            url, depth = to_visit.pop(0)
+        while frontier and len(crawled_pages) < self.max_pages:
+            url, depth = frontier.pop()
             
-            # Skip if already visited or max depth exceeded
-            if url in self.visited or depth > self.max_depth:
+            # Skip if max depth exceeded
+            if depth > self.max_depth:
                 continue
             
             # Check robots.txt
-            if not self.can_fetch(url):
-                print(f"[Skip] Robots.txt disallows: {url}")
+            if not self.allow(url):
                 continue
             
-            self.visited.add(url)
-            
             try:
-                print(f"[Crawl] {url} (depth: {depth})")
-                response = requests.get(url, timeout=10, headers={
-                    'User-Agent': 'BitBBot/2.0 (+https://bitb.ltd)'
-                })
-                
-                if response.status_code != 200:
-                    continue
-                
-                html = response.text
-                text = self.extract_text(html)
+                page, links = self.fetch_page(url, depth)
                 
                 # Store page data
-                if text and len(text) > 100:  # Minimum content threshold
-                    crawled_pages.append({
-                        'url': url,
-                        'title': self._extract_title(html),
-                        'text': text,
-                        'depth': depth,
-                        'timestamp': int(time.time())
-                    })
+                if page:
+                    crawled_pages.append(page)
                 
-                # Extract links for next level
-                if depth < self.max_depth:
-                    links = self.extract_links(html, url)
-                    for link in links:
-                        if link not in self.visited:
-                            to_visit.append((link, depth + 1))
+                for link in links:
+                    frontier.push(link, depth + 1)
                 
-                # Rate limiting
-                time.sleep(0.5)
+                # Rate limiting (adaptive limiters wait inside the fetcher instead)
+                if self.request_delay:
+                    time.sleep(self.request_delay)
                 
             except Exception as e:
                 print(f"[Error] Failed to crawl {url}: {e}")
-                continue
+                page, links = None, []
+            
+            if self.checkpoint:
+                self.checkpoint.record(url, depth, page, links)
+                self.checkpoint.maybe_snapshot(frontier)
         
         print(f"[Done] Crawled {len(crawled_pages)} pages")
         return crawled_pages
     
+    def crawl_async(self, concurrency: int = 8, per_host: int = 2, parse_workers: int = 0) -> List[Dict]:
+        """Crawl website with concurrent fetches; returns the same page data as crawl()"""
+        # Fork the parse pool before the engine starts its fetch threads
+        self.parse_pool = ParsePool(parse_workers) if parse_workers > 0 else None
+        engine = AsyncCrawlEngine(
+            self.fetch_page,
+            self.allow,
+            max_depth=self.max_depth,
+            max_pages=self.max_pages,
+            concurrency=concurrency,
+            # A declared Crawl-delay means one request at a time per host
+            per_host=1 if self.robots.crawl_delay is not None else per_host,
+            host_delay=self.request_delay,  # Same politeness delay as crawl(), per host slot
+            checkpoint=self.checkpoint
+        )
+        try:
+            crawled_pages = engine.run(*self.start_frontier())
+        finally:
+            if self.parse_pool:
+                self.parse_pool.close()
+                print(f"[Parse] {self.parse_pool.stats.pages} pages parsed in {parse_workers} processes")
+                self.parse_pool = None
+        
+        print(f"[Done] Crawled {len(crawled_pages)} pages ({concurrency} concurrent, {per_host} per host)")
+        return crawled_pages
+    
+    def _worker_crawler(self) -> 'WebsiteCrawler':
+        """Crawler for a forked worker process, with its own connection pool and cache handle"""
+        cache = CrawlCache(str(self.cache.path.parent), self.cache.path.stem,
+                           self.cache.extractor) if self.cache else None
+        return WebsiteCrawler(
+            self.base_url,
+            self.max_depth,
+            self.max_pages,
+            fetcher=self.fetcher.clone(),
+            cache=cache,
+            lastmod=self.lastmod,
+            visited_mode=self.visited.mode,
+            frontier_mode='priority' if self.prioritizer else 'fifo',
+            extraction=self.extraction,
+            url_rules=self.url_rules.clone() if self.url_rules else None,
+            traps=self.traps.clone() if self.traps else None
+        )
+    
+    def crawl_distributed(self, workers: int, frontier_db: str, per_host: int = 2) -> List[Dict]:
+        """Crawl with worker processes sharing a SQLite frontier; returns the same page data as crawl()"""
+        os.makedirs(os.path.dirname(os.path.abspath(frontier_db)), exist_ok=True)
+        crawled_pages, worker_stats = distributed.crawl_distributed(
+            frontier_db,
+            self.new_frontier().pending(),
+            self._worker_crawler,
+            workers=workers,
+            score=self.score_url,
+            max_depth=self.max_depth,
+            max_pages=self.max_pages,
+            # Politeness is enforced across all workers through the shared frontier (and, with an
+            # adaptive limiter, its shared rate state): the same delay crawl() sleeps, per host slot
+            per_host=1 if self.robots.crawl_delay is not None else per_host,
+            host_delay=self.request_delay
+        )
+        for stats in worker_stats:
+            self.fetcher.stats.add(**stats['fetch'])
+            if self.url_rules and 'url_rules' in stats:
+                self.url_rules.merge(stats['url_rules'])
+            if self.traps and 'traps' in stats:
+                self.traps.merge(stats['traps'])
+        
+        print(f"[Done] Crawled {len(crawled_pages)} pages ({workers} worker processes)")
+        return crawled_pages
+    
+    def join_distributed(self, frontier_db: str) -> int:
+        """Work on a distributed crawl started elsewhere until its frontier is drained"""
+        frontier = distributed.SharedFrontier(frontier_db)
+        try:
+            return distributed.run_worker(frontier, self, f"{socket.gethostname()}-{os.getpid()}")
+        finally:
+            frontier.close()
+    
     def _extract_title(self, html: str) -> str:
         """Extract page title"""
-        soup = BeautifulSoup(html, 'html.parser')
-        title_tag = soup.find('title')
-        return title_tag.get_text().strip() if title_tag else 'Untitled'
+        return parse_html(html).title or 'Untitled'
 
 
 # =============================================================================
@@ -226,28 +489,59 @@ class TextChunker:
     
     def chunk_text(self, text: str, source_url: str, metadata: Dict = None) -> List[Dict]:
         """Split text into chunks with metadata"""
+        return list(self.chunk_segments([Segment(text)], source_url, metadata))
+    
+    def chunk_segments(self, segments: Iterable[Segment], source_url: str,
+                       metadata: Dict = None, key: Optional[str] = None,
+                       keep_short: bool = False) -> Iterator[Dict]:
+        """Chunk a stream of document segments, holding one chunk's words at a time.
+        
+        Chunks cut from paged segments carry metadata 'page' (and 'page_end' when they span pages).
+        Chunk ids derive from key, the document's unique name, when source_url is shared.
+        keep_short keeps a whole document under 50 words as one chunk (e.g. a FAQ record).
+        """
         # Simple word-based chunking (approximates tokens)
-        words = text.split()
-        chunks = []
+        stride = self.chunk_size - self.overlap
+        words, pages = [], []  # Window from word offset i on, with each word's page
+        i = 0
+        chunk_index = 0
         
-        for i in range(0, len(words), self.chunk_size - self.overlap):
-            chunk_words = words[i:i + self.chunk_size]
-            chunk_text = ' '.join(chunk_words)
-            
-            if len(chunk_words) < 50:  # Skip very small chunks
-                continue
-            
-            chunk_id = hashlib.md5(f"{source_url}:{i}".encode()).hexdigest()
-            
-            chunks.append({
-                'id': chunk_id,
-                'text': chunk_text,
+        def cut():
+            chunk_words = words[:self.chunk_size]
+            if len(chunk_words) < 50 and not (keep_short and i == 0):  # Skip very small chunks
+                return None
+            chunk_metadata = dict(metadata or {})
+            if pages[0] is not None:
+                chunk_metadata['page'] = pages[0]
+                if pages[len(chunk_words) - 1] != pages[0]:
+                    chunk_metadata['page_end'] = pages[len(chunk_words) - 1]
+            return {
+                'id': hashlib.md5(f"{key or source_url}:{i}".encode()).hexdigest(),
+                'text': ' '.join(chunk_words),
                 'source_url': source_url,
-                'chunk_index': len(chunks),
-                'metadata': metadata or {}
-            })
+                'chunk_index': chunk_index,
+                'metadata': chunk_metadata
+            }
+        
+        for segment in segments:
+            segment_words = segment.text.split()
+            words.extend(segment_words)
+            pages.extend([segment.page] * len(segment_words))
+            while len(words) >= self.chunk_size:
+                chunk = cut()
+                if chunk:
+                    chunk_index += 1
+                    yield chunk
+                del words[:stride], pages[:stride]
+                i += stride
         
-        return chunks
+        while words:
+            chunk = cut()
+            if chunk:
+                chunk_index += 1
+                yield chunk
+            del words[:stride], pages[:stride]
+            i += stride
 
 
 # =============================================================================
@@ -373,6 +667,36 @@ class IngestionPipeline:
             config.hf_api_key
         )
         self.index_manager = FAISSIndexManager(config.faiss_index_path)
+        fetch_config = FetchConfig(
+            max_body_bytes=int(config.max_page_mb * 1024 * 1024),
+            # Enough pooled connections for every concurrent fetch to one host
+            per_host_connections=max(FetchConfig.per_host_connections, config.per_host_concurrency)
+        )
+        if config.source_type == 'replay':
+            self.fetcher = ReplayFetcher(config.warc_path, fetch_config)
+        else:
+            self.fetcher = HttpFetcher(
+                fetch_config,
+                limiter=AdaptiveRateLimiter(
+                    initial_rate=config.initial_rate,
+                    max_rate=config.max_rate
+                ) if config.adaptive_rate else None,
+                # A resumed crawl keeps the responses recorded before the interruption
+                recorder=WarcWriter(config.warc_path, append=config.resume) if config.warc_path else None
+            )
+        # Compiled once up front, so a bad rule fails the job before any request
+        self.url_rules = UrlRules(config.include_urls, config.exclude_urls)
+        self.traps = TrapDetector(config.trap_template_cap, config.trap_sequence_cap) if config.trap_detection else None
+        self.crawl_cache = None
+        self.checkpoint = None
+        self.record_stats = RecordStats()
+        # Extracted text of uploads, by file content hash; re-uploads skip parsing
+        self.extraction_cache = None
+        if config.source_type == 'files' and config.extract_cache_dir:
+            self.extraction_cache = ExtractionCache(
+                config.extract_cache_dir,
+                max_bytes=int(config.extract_cache_max_mb * 1024 * 1024)
+            )
     
     def run(self) -> Dict:
         """Execute full ingestion pipeline"""
@@ -381,60 +705,131 @@ class IngestionPipeline:
         print(f"Trial Token: {self.config.trial_token}")
         print(f"Source Type: {self.config.source_type}")
         print(f"{'='*60}\n")
+        timer = StageTimer()
         
-        # Step 1: Gather content
-        if self.config.source_type == 'url':
-            pages = self._crawl_website()
-        else:
-            pages = self._process_files()
+        # Step 1: Gather content (uploads and records are chunked as they are read)
+        pages, all_chunks, page_count = [], None, 0
+        with timer.stage('gather'):
+            if self.config.source_type in ('url', 'replay'):
+                pages = self._crawl_website()
+            elif self.config.source_type == 'records':
+                page_count, all_chunks = self._process_records()
+            else:
+                page_count, all_chunks = self._process_files()
         
-        if not pages:
+        if not (pages or all_chunks):
             return {'status': 'failed', 'error': 'No content extracted'}
         
-        # Step 2: Chunk text
-        print("\n[Step 2] Chunking text...")
-        all_chunks = []
-        for page in pages:
-            chunks = self.chunker.chunk_text(
-                page['text'], 
-                page['url'], 
-                {'title': page.get('title', '')}
-            )
-            all_chunks.extend(chunks)
+        extraction_report = None
+        if self.config.source_type in ('url', 'replay') and self.config.extraction == 'density':
+            extraction_report = ExtractionReport.from_pages(self.config.extraction, pages)
+            print(f"[Extract] Removed {extraction_report.chars_removed} boilerplate chars "
+                  f"from {extraction_report.pages} pages")
+        
+        # Step 1b: Drop near-duplicate crawled pages before they are chunked and embedded
+        # (similar uploaded pages or records are content, not mirrors)
+        dedup_report = None
+        if self.config.source_type in ('url', 'replay') and self.config.dedup_threshold:
+            print("\n[Step 1b] Removing near-duplicate pages...")
+            with timer.stage('dedup'):
+                pages, dedup_report = NearDuplicateFilter(self.config.dedup_threshold).filter(pages)
+            dedup_report.estimate_chunks(self.config.chunk_size - self.config.chunk_overlap)
+            print(f"[Done] Dropped {dedup_report.pages_dropped} near-duplicates "
+                  f"(~{dedup_report.chunks_avoided} chunks not embedded)")
+        
+        # Step 1c: Strip site-wide header/footer/CTA lines repeated across crawled pages
+        # (a line repeated across PDF pages or records may well be content)
+        template_report = None
+        if self.config.source_type in ('url', 'replay') and self.config.template_threshold:
+            print("\n[Step 1c] Removing cross-page template text...")
+            with timer.stage('templates'):
+                pages, template_report = TemplateFilter(self.config.template_threshold).filter(pages)
+            template_report.estimate_chunks(self.config.chunk_size - self.config.chunk_overlap)
+            print(f"[Done] Removed {template_report.template_lines} template lines "
+                  f"({template_report.chars_removed} chars, ~{template_report.chunks_avoided} chunks not embedded)")
+            if not pages:
+                return {'status': 'failed', 'error': 'No content left after template removal'}
+        
+        # Step 2: Chunk crawled pages
+        if all_chunks is None:
+            print("\n[Step 2] Chunking text...")
+            all_chunks = []
+            with timer.stage('chunk'):
+                for page in pages:
+                    chunks = self.chunker.chunk_text(
+                        page['text'], 
+                        page['url'], 
+                        {'title': page.get('title', '')}
+                    )
+                    all_chunks.extend(chunks)
+            page_count = len(pages)
+            if not all_chunks:
+                return {'status': 'failed', 'error': 'No content extracted'}
         
         print(f"[Done] Created {len(all_chunks)} chunks")
         
         # Step 3: Generate embeddings
         print("\n[Step 3] Generating embeddings...")
         chunk_texts = [chunk['text'] for chunk in all_chunks]
-        embeddings = self.embedder.embed_batch(chunk_texts)
+        with timer.stage('embed'):
+            embeddings = self.embedder.embed_batch(chunk_texts)
         print(f"[Done] Generated {embeddings.shape[0]} embeddings (dim: {embeddings.shape[1]})")
         
         # Step 4: Create FAISS index
         print("\n[Step 4] Building FAISS index...")
-        index, index_path = self.index_manager.create_index(
-            self.config.trial_token, 
-            dimension=embeddings.shape[1]
-        )
-        index.add(embeddings.astype('float32'))
-        
-        # Prepare metadata
-        for i, chunk in enumerate(all_chunks):
-            chunk['embedding_index'] = i
+        with timer.stage('index'):
+            index, index_path = self.index_manager.create_index(
+                self.config.trial_token, 
+                dimension=embeddings.shape[1]
+            )
+            index.add(embeddings.astype('float32'))
+            
+            # Prepare metadata
+            for i, chunk in enumerate(all_chunks):
+                chunk['embedding_index'] = i
+            
+            self.index_manager.save_index(index, index_path, all_chunks)
         
-        self.index_manager.save_index(index, index_path, all_chunks)
+        # Indexed: nothing left to resume
+        if self.checkpoint:
+            self.checkpoint.clear()
         
         # Summary
         summary = {
             'status': 'completed',
             'trial_token': self.config.trial_token,
             'source_type': self.config.source_type,
-            'pages_crawled': len(pages),
+            'pages_crawled': page_count,
             'chunks_created': len(all_chunks),
             'embeddings_generated': embeddings.shape[0],
             'index_path': index_path,
+            'timings': timer.as_dict(),
             'timestamp': int(time.time())
         }
+        if extraction_report:
+            summary['extraction'] = extraction_report.as_dict()
+        if dedup_report:
+            summary['dedup'] = dedup_report.as_dict()
+        if template_report:
+            summary['templates'] = template_report.as_dict()
+        if self.extraction_cache:
+            summary['extraction_cache'] = self.extraction_cache.stats.as_dict()
+        if self.config.source_type == 'records':
+            summary['records'] = self.record_stats.as_dict()
+        if self.config.source_type == 'replay':
+            summary['replay'] = self.fetcher.replay.as_dict()
+        elif self.fetcher.recorder:
+            summary['warc'] = {'path': self.fetcher.recorder.path, 'bytes': os.path.getsize(self.fetcher.recorder.path)}
+        if self.config.source_type in ('url', 'replay'):
+            summary['fetch_stats'] = self.fetcher.stats.as_dict()
+            if self.fetcher.limiter:
+                summary['rate_limits'] = self.fetcher.limiter.as_dict()
+            if self.crawl_cache:
+                summary['crawl_cache'] = self.crawl_cache.stats.as_dict()
+            if self.url_rules:
+                summary['url_rules'] = self.url_rules.as_dict()
+            if self.traps:
+                summary['traps'] = self.traps.as_dict()
         
         print(f"\n{'='*60}")
         print(f"Ingestion Complete!")
@@ -447,54 +842,150 @@ class IngestionPipeline:
     def _crawl_website(self) -> List[Dict]:
         """Crawl website and extract content"""
         print(f"\n[Step 1] Crawling website: {self.config.source_url}")
+        if self.config.checkpoint_dir:
+            self.checkpoint = CrawlCheckpoint(
+                self.config.checkpoint_dir,
+                f"{self.config.trial_token}-{urlparse(self.config.source_url).netloc}",
+                interval=self.config.checkpoint_interval
+            )
+        # Recording needs full responses (no 304s); a replay is served from the archive
+        if self.config.crawl_cache_dir and not self.config.warc_path:
+            self.crawl_cache = CrawlCache(
+                self.config.crawl_cache_dir,
+                urlparse(self.config.source_url).netloc,
+                extractor_version(self.config.extraction)
+            )
         crawler = WebsiteCrawler(
             self.config.source_url, 
             self.config.crawl_depth, 
-            self.config.max_pages
+            self.config.max_pages,
+            fetcher=self.fetcher,
+            cache=self.crawl_cache,
+            discovery=self.config.discovery,
+            visited_mode=self.config.visited_mode,
+            checkpoint=self.checkpoint,
+            resume=self.config.resume,
+            frontier_mode=self.config.frontier,
+            extraction=self.config.extraction,
+            url_rules=self.url_rules,
+            traps=self.traps
         )
+        if self.config.crawl_workers > 1:
+            return crawler.crawl_distributed(
+                self.config.crawl_workers,
+                self.config.frontier_db or f"./data/frontier/{self.config.trial_token}.sqlite",
+                self.config.per_host_concurrency
+            )
+        if self.config.async_crawl:
+            return crawler.crawl_async(
+                self.config.crawl_concurrency,
+                self.config.per_host_concurrency,
+                self.config.parse_workers
+            )
         return crawler.crawl()
     
-    def _process_files(self) -> List[Dict]:
-        """Process uploaded files"""
-        print(f"\n[Step 1] Processing {len(self.config.source_files)} files")
-        pages = []
+    def _process_files(self) -> Tuple[int, List[Dict]]:
+        """Extract and chunk uploaded files (paths, directories or globs), several at a time; returns (pages, chunks)"""
+        max_bytes = int(self.config.max_file_mb * 1024 * 1024) if self.config.max_file_mb else None
+        files, skipped = plan_files(expand_inputs(self.config.source_files), max_bytes)
+        workers = max(1, min(self.config.file_workers, len(files)))
+        print(f"\n[Step 1] Processing {len(files)} files ({workers} at a time)")
+        for file_path, reason in skipped:
+            print(f"[Skip] {file_path}: {reason}")
         
-        for file_path in self.config.source_files:
-            try:
-                if file_path.endswith('.txt'):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                elif file_path.endswith('.pdf') and HAS_DOC_PARSING:
-                    text = self._extract_pdf_text(file_path)
-                elif file_path.endswith('.docx') and HAS_DOC_PARSING:
-                    text = self._extract_docx_text(file_path)
-                else:
+        # Files in flight share one pool of PDF page workers, forked before the file threads start
+        pdf_workers = resolve_workers(self.config.pdf_workers)
+        has_pdfs = HAS_PDF_PARSING and any(file_path.endswith('.pdf') for file_path in files)
+        pdf_pool = start_pool(pdf_workers) if has_pdfs else None
+        pages, chunks = 0, []
+        
+        try:
+            work = partial(self._process_file, pdf_workers=pdf_workers, pdf_pool=pdf_pool)
+            for file_path, result, error in map_ordered(work, files, workers):
+                if error is not None:
+                    print(f"[Error] Failed to process {file_path}: {error}")
+                elif result is None:
                     print(f"[Skip] Unsupported file type: {file_path}")
-                    continue
-                
-                pages.append({
-                    'url': f"file://{file_path}",
-                    'title': os.path.basename(file_path),
-                    'text': text,
-                    'timestamp': int(time.time())
-                })
-                
+                else:
+                    pages += result[0]
+                    chunks.extend(result[1])
+        finally:
+            if pdf_pool:
+                pdf_pool.shutdown(cancel_futures=True)
+        
+        print(f"[Done] {pages} pages from {len(files)} files")
+        return pages, chunks
+    
+    def _process_records(self) -> Tuple[int, List[Dict]]:
+        """Stream JSON array / JSONL / CSV records into the chunker, each on its own; returns (records, chunks)"""
+        files = list(expand_inputs(self.config.source_files))
+        print(f"\n[Step 1] Reading records from {len(files)} files")
+        mapping = RecordMapping(
+            self.config.record_text_fields,
+            self.config.record_title_field,
+            self.config.record_url_field,
+            self.config.record_metadata_fields
+        )
+        chunks = []
+        
+        for file_path in files:
+            try:
+                for number, record in enumerate(iter_records(file_path, self.config.records_format, self.record_stats)):
+                    mapped = mapping.apply(record)
+                    if mapped is None:
+                        self.record_stats.add(skipped_empty=1)
+                        continue
+                    self.record_stats.add(ingested=1)
+                    chunks.extend(self.chunker.chunk_segments(
+                        [Segment(mapped.text)],
+                        mapped.url or f"file://{file_path}#{number}",
+                        {'title': mapped.title or os.path.basename(file_path), **mapped.metadata},
+                        key=f"{file_path}#{number}",  # Unique even when records share a URL
+                        keep_short=True
+                    ))
             except Exception as e:
-                print(f"[Error] Failed to process {file_path}: {e}")
+                print(f"[Error] Failed to read records from {file_path}: {e}")
         
-        return pages
+        print(f"[Done] {self.record_stats.ingested} of {self.record_stats.records} records have text")
+        return self.record_stats.ingested, chunks
     
-    def _extract_pdf_text(self, file_path: str) -> str:
-        """Extract text from PDF"""
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            text = '\n'.join([page.extract_text() for page in reader.pages])
-        return text
+    def _process_file(self, file_path: str, pdf_workers: int, pdf_pool=None) -> Optional[Tuple[int, List[Dict]]]:
+        """(pages, chunks) of one file (None if its type is unsupported)"""
+        segments = self._file_segments(file_path, pdf_workers, pdf_pool)
+        if segments is None:
+            return None
+        
+        # Segments go straight into the chunker: only the file's chunks are held, never its text
+        pages = set()
+        
+        def counted():
+            for segment in segments:
+                pages.add(segment.page)
+                yield segment
+        
+        chunks = list(self.chunker.chunk_segments(
+            counted(),
+            f"file://{file_path}",
+            {'title': os.path.basename(file_path)}
+        ))
+        return len(pages), chunks
     
-    def _extract_docx_text(self, file_path: str) -> str:
-        """Extract text from DOCX"""
-        doc = Document(file_path)
-        return '\n'.join([para.text for para in doc.paragraphs])
+    def _file_segments(self, file_path: str, pdf_workers: int, pdf_pool=None) -> Optional[Iterator[Segment]]:
+        """Streaming extractor for a supported file: pages (PDF) or paragraphs (DOCX, text)"""
+        if file_path.endswith('.txt'):
+            return text_segments(file_path)
+        if file_path.endswith('.pdf') and HAS_PDF_PARSING:
+            segments = pdf_segments(file_path, pdf_workers, self.config.pdf_max_pages, pdf_pool)
+            extractor = extractor_version('pdf', max_pages=self.config.pdf_max_pages)
+        elif file_path.endswith('.docx') and HAS_DOCX_PARSING:
+            segments = docx_segments(file_path)
+            extractor = extractor_version('docx')
+        else:
+            return None
+        # An unchanged file seen before is not parsed at all
+        if self.extraction_cache:
+            return self.extraction_cache.segments(file_path, extractor, segments)
+        return segments
 
 
 # =============================================================================
@@ -504,28 +995,121 @@ class IngestionPipeline:
 def main():
     parser = argparse.ArgumentParser(description='BiTB Ingestion Worker')
     parser.add_argument('--url', type=str, help='Website URL to crawl')
-    parser.add_argument('--files', nargs='+', help='Files to process')
+    parser.add_argument('--files', nargs='+', help="Files to process: paths, directories or quoted globs like 'docs/**/*.pdf'")
+    parser.add_argument('--records', nargs='+', help='Ingest structured records from JSON arrays, JSON Lines or CSV files (paths, directories or globs)')
+    parser.add_argument('--records-format', choices=RECORD_FORMATS, help='Format of --records files (default: by extension)')
+    parser.add_argument('--text-field', action='append', help='Record field for chunk text, joined in order (repeatable; default: content/text/body/answer)')
+    parser.add_argument('--title-field', type=str, help='Record field for the title (default: title/question/name)')
+    parser.add_argument('--url-field', type=str, default='url', help="Record field for the citation URL (default: 'url')")
+    parser.add_argument('--metadata-field', action='append', help='Record field kept as chunk metadata (repeatable; default: other short fields)')
+    parser.add_argument('--file-workers', type=int, default=4, help='Files extracted concurrently (default: 4)')
+    parser.add_argument('--max-file-mb', type=float, default=0.0, help='Skip uploaded files larger than this; 0 disables (default: 0)')
+    parser.add_argument('--pdf-workers', type=int, default=0, help='Processes extracting one PDF (default: 0, one per CPU)')
+    parser.add_argument('--pdf-max-pages', type=int, default=0, help='Extract at most this many pages per PDF (default: 0, all)')
+    parser.add_argument('--extract-cache', type=str, help='Directory caching extracted PDF/DOCX text by file hash (re-uploads skip parsing)')
+    parser.add_argument('--extract-cache-max-mb', type=float, default=512.0, help='Size cap for --extract-cache, least recently used evicted first (default: 512)')
     parser.add_argument('--token', type=str, required=True, help='Trial token')
     parser.add_argument('--depth', type=int, default=2, help='Crawl depth (default: 2)')
     parser.add_argument('--max-pages', type=int, default=50, help='Max pages (default: 50)')
+    parser.add_argument('--async-crawl', action='store_true', help='Fetch pages concurrently')
+    parser.add_argument('--concurrency', type=int, default=8, help='Max in-flight fetches with --async-crawl (default: 8)')
+    parser.add_argument('--per-host', type=int, default=2, help='Max in-flight fetches per host with --async-crawl or --workers (default: 2)')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Parse crawled HTML in this many processes with --async-crawl (default: 0, in-process)')
+    parser.add_argument('--workers', type=int, default=1, help='Crawl with this many worker processes sharing one frontier (default: 1)')
+    parser.add_argument('--frontier-db', type=str, help='Shared frontier SQLite file for --workers/--join')
+    parser.add_argument('--join', action='store_true', help='Only work on the distributed crawl in --frontier-db, then exit')
+    parser.add_argument('--fixed-delay', action='store_true', help='Wait a fixed 0.5s (or Crawl-delay) between requests instead of adapting the rate per host')
+    parser.add_argument('--max-rate', type=float, default=10.0, help='Max requests/second per host with adaptive rate limiting (default: 10)')
+    parser.add_argument('--record-warc', type=str, help='Also write every crawl response to this .warc.gz archive')
+    parser.add_argument('--replay', type=str, help='Re-crawl --url from this .warc.gz archive instead of the network')
+    parser.add_argument('--crawl-cache', type=str, help='Directory for the revalidation cache (recrawl only changed pages)')
+    parser.add_argument('--discovery', choices=['links', 'sitemap'], default='links', help='URL discovery: follow links (default) or seed from sitemaps')
+    parser.add_argument('--frontier', choices=['priority', 'fifo'], default='priority', help='Crawl order: best-first by URL/link score (default) or plain breadth-first')
+    parser.add_argument('--extraction', choices=['main', 'density'], default='main', help='Page text: main/article/body element (default) or text/link density boilerplate removal')
+    parser.add_argument('--include', action='append', metavar='RULE', help="Only crawl URLs matching this rule, e.g. '/docs/**' (repeatable)")
+    parser.add_argument('--exclude', action='append', metavar='RULE', help="Never request URLs matching this rule, e.g. '/blog/tag/*' or '?sort' (repeatable)")
+    parser.add_argument('--no-trap-detection', action='store_true', help='Follow calendar/pagination/session-id URL spaces without limits')
+    parser.add_argument('--trap-template-cap', type=int, default=1000, help='Max distinct URLs per URL template before it is treated as a trap (default: 1000)')
+    parser.add_argument('--trap-sequence-cap', type=int, default=200, help='Max pages/dates walked through one pagination or calendar parameter (default: 200)')
+    parser.add_argument('--visited', choices=VisitedSet.MODES, default='hashed', help='Seen-URL store; bloom keeps memory fixed on huge sites (default: hashed)')
+    parser.add_argument('--dedup-threshold', type=float, default=0.95, help='Similarity above which crawled pages are dropped as near-duplicates; 0 disables (default: 0.95)')
+    parser.add_argument('--template-threshold', type=float, default=0.5, help='Strip lines repeated on at least this fraction of crawled pages; 0 disables (default: 0.5)')
+    parser.add_argument('--checkpoint-dir', type=str, help='Journal crawl progress here so an interrupted crawl can be resumed')
+    parser.add_argument('--resume', action='store_true', help='Continue the interrupted crawl for this token/URL from --checkpoint-dir')
+    parser.add_argument('--max-page-mb', type=float, default=5.0, help='Abort crawled pages larger than this; 0 disables (default: 5)')
     parser.add_argument('--use-hf-api', action='store_true', help='Use HuggingFace API instead of local model')
     parser.add_argument('--hf-api-key', type=str, help='HuggingFace API key')
     
     args = parser.parse_args()
     
     # Validate input
-    if not args.url and not args.files:
-        print("Error: Must provide either --url or --files")
+    if not args.url and not args.files and not args.records:
+        print("Error: Must provide --url, --files or --records")
+        sys.exit(1)
+    
+    if args.replay and not args.url:
+        print("Error: --replay requires --url")
         sys.exit(1)
     
+    if args.resume and not args.checkpoint_dir:
+        print("Error: --resume requires --checkpoint-dir")
+        sys.exit(1)
+    
+    # Extra worker for a distributed crawl running elsewhere
+    if args.join:
+        if not args.url or not args.frontier_db:
+            print("Error: --join requires --url and --frontier-db")
+            sys.exit(1)
+        crawler = WebsiteCrawler(args.url, args.depth, args.max_pages, frontier_mode=args.frontier,
+                                 url_rules=UrlRules(args.include, args.exclude),
+                                 traps=None if args.no_trap_detection else TrapDetector(args.trap_template_cap, args.trap_sequence_cap))
+        processed = crawler.join_distributed(args.frontier_db)
+        print(f"[Done] Processed {processed} URLs")
+        return
+    
     # Create config
     config = IngestConfig(
         trial_token=args.token,
-        source_type='url' if args.url else 'files',
+        source_type=('replay' if args.replay else 'url') if args.url else ('records' if args.records else 'files'),
         source_url=args.url,
-        source_files=args.files,
+        source_files=args.records or args.files,
+        records_format=args.records_format,
+        record_text_fields=args.text_field,
+        record_title_field=args.title_field,
+        record_url_field=args.url_field,
+        record_metadata_fields=args.metadata_field,
+        file_workers=args.file_workers,
+        max_file_mb=args.max_file_mb,
+        pdf_workers=args.pdf_workers,
+        pdf_max_pages=args.pdf_max_pages,
+        extract_cache_dir=args.extract_cache,
+        extract_cache_max_mb=args.extract_cache_max_mb,
         crawl_depth=args.depth,
         max_pages=args.max_pages,
+        async_crawl=args.async_crawl,
+        crawl_concurrency=args.concurrency,
+        per_host_concurrency=args.per_host,
+        parse_workers=args.parse_workers,
+        crawl_cache_dir=args.crawl_cache,
+        discovery=args.discovery,
+        visited_mode=args.visited,
+        frontier=args.frontier,
+        extraction=args.extraction,
+        include_urls=args.include,
+        exclude_urls=args.exclude,
+        trap_detection=not args.no_trap_detection,
+        trap_template_cap=args.trap_template_cap,
+        trap_sequence_cap=args.trap_sequence_cap,
+        warc_path=args.replay or args.record_warc,
+        dedup_threshold=args.dedup_threshold,
+        template_threshold=args.template_threshold,
+        max_page_mb=args.max_page_mb,
+        adaptive_rate=not args.fixed_delay,
+        max_rate=args.max_rate,
+        crawl_workers=args.workers,
+        frontier_db=args.frontier_db,
+        checkpoint_dir=args.checkpoint_dir,
+        resume=args.resume,
         use_hf_api=args.use_hf_api,
         hf_api_key=args.hf_api_key
     )